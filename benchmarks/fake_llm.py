@@ -0,0 +1,135 @@
+# benchmarks/fake_llm.py
+"""OpenAI-compatible chat completions stub with configurable latency, token rate and errors
+
+Run standalone with ``python -m benchmarks.fake_llm --port 9100`` and point
+the app at it with OPENAI_BASE_URL=http://127.0.0.1:9100/v1.
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from src.core.serialization import dumps
+
+WORDS = (
+    "once upon a time a curious fox found a lantern in the forest and learned "
+    "that sharing light with friends makes every path less dark"
+).split()
+
+@dataclass
+class FakeLLMSettings:
+    """Behaviour of the stub, shared by every request"""
+    latency: float = 0.2
+    jitter: float = 0.05
+    tokens_per_second: float = 200.0
+    completion_tokens: int = 64
+    error_rate: float = 0.0
+    seed: int = 0
+
+def _completion_text(tokens: int, rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(tokens))
+
+def create_app(settings: FakeLLMSettings) -> FastAPI:
+    """Create the stub app serving POST /v1/chat/completions"""
+    app = FastAPI(title="Fake LLM")
+    rng = random.Random(settings.seed)
+    app.state.requests = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body: Dict[str, Any] = await request.json()
+        app.state.requests += 1
+        if settings.error_rate and rng.random() < settings.error_rate:
+            return JSONResponse(
+                {"error": {"message": "Simulated overload", "type": "server_error"}},
+                status_code=rng.choice((429, 500, 503))
+            )
+
+        # Time to first token, then tokens emitted at the configured rate
+        await asyncio.sleep(max(0.0, rng.gauss(settings.latency, settings.jitter)))
+        tokens = settings.completion_tokens
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        model = body.get("model", "fake-model")
+        text = _completion_text(tokens, rng)
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in body.get("messages", []))
+
+        if not body.get("stream"):
+            await asyncio.sleep(tokens / settings.tokens_per_second)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop"
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": tokens,
+                    "total_tokens": prompt_tokens + tokens
+                }
+            }
+
+        async def chunks():
+            interval = 1.0 / settings.tokens_per_second
+            for i, word in enumerate(text.split(" ")):
+                await asyncio.sleep(interval)
+                delta = {"content": word if i == 0 else " " + word}
+                yield "data: " + dumps({
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": None}]
+                }) + "\n\n"
+            yield "data: " + dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+            }) + "\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    return app
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the stub's behaviour options to a parser"""
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Mean seconds to first token")
+    parser.add_argument("--llm-jitter", type=float, default=0.05, help="Standard deviation of the latency")
+    parser.add_argument("--llm-token-rate", type=float, default=200.0, help="Completion tokens per second")
+    parser.add_argument("--llm-tokens", type=int, default=64, help="Completion tokens per response")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Fraction of requests failing")
+
+def settings_from_args(args: argparse.Namespace) -> FakeLLMSettings:
+    """Build stub settings from parsed add_arguments options"""
+    return FakeLLMSettings(
+        latency=args.llm_latency,
+        jitter=args.llm_jitter,
+        tokens_per_second=args.llm_token_rate,
+        completion_tokens=args.llm_tokens,
+        error_rate=args.llm_error_rate
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(settings_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == '__main__':
+    main()
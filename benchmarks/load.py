@@ -0,0 +1,91 @@
+# benchmarks/load.py
+"""Closed-loop HTTP load generator reporting throughput and latency percentiles"""
+import asyncio
+import math
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+@dataclass
+class Scenario:
+    """One endpoint under load
+
+    ``request`` builds the (path, JSON body) of each request from a random
+    generator; the body is None for requests without one.
+    """
+    name: str
+    method: str
+    request: Callable[[random.Random], Tuple[str, Optional[Dict[str, Any]]]]
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Get the q-th percentile (0-100) of sorted values by nearest rank"""
+    if not sorted_values:
+        return float("nan")
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    """Summarize successful request latencies (seconds) into a result record"""
+    latencies = sorted(latencies)
+    ms = lambda value: round(value * 1000, 3) if not math.isnan(value) else None
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(latencies[-1]) if latencies else None
+    }
+
+async def run_scenario(
+    base_url: str,
+    scenario: Scenario,
+    concurrency: int,
+    duration: float,
+    warmup: float = 1.0,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """Drive one scenario with ``concurrency`` workers for ``duration`` seconds
+
+    Each worker sends its next request as soon as the previous one returns.
+    Requests finishing during the warmup are not counted. Responses with a
+    status of 400 or above count as errors and are left out of the latency
+    percentiles.
+
+    Returns:
+        The summary from summarize, plus the scenario's concurrency
+    """
+    latencies: List[float] = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        loop = asyncio.get_running_loop()
+        measure_from = loop.time() + warmup
+        deadline = measure_from + duration
+
+        async def worker(index: int) -> None:
+            nonlocal errors
+            rng = random.Random(seed * 1000 + index)
+            while loop.time() < deadline:
+                path, body = scenario.request(rng)
+                start = time.perf_counter()
+                try:
+                    response = await client.request(scenario.method, path, json=body)
+                    failed = response.status_code >= 400
+                except httpx.HTTPError:
+                    failed = True
+                if loop.time() < measure_from:
+                    continue
+                if failed:
+                    errors += 1
+                else:
+                    latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return {**summarize(latencies, errors, duration), "concurrency": concurrency}
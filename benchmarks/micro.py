@@ -0,0 +1,96 @@
+# benchmarks/micro.py
+"""In-process micro-benchmarks of hot-path building blocks"""
+import asyncio
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict
+
+from src.core.metrics import Histogram
+from src.core.serialization import dumps, loads
+from src.core.tracing import RunTrace, current_trace, span
+from src.database.db_setup import Database
+from src.database.run_journal import RunJournal
+
+RUN = {
+    "run_id": str(uuid.uuid4()),
+    "task": {"task": "generate_story", "params": {"theme": "friendship"}},
+    "status": "completed",
+    "result": {"result": "Once upon a time " * 40},
+    "started_at": "2024-01-01 00:00:00",
+    "completed_at": "2024-01-01 00:00:02"
+}
+
+def _timed(operation: Callable[[], Any], min_seconds: float = 0.2) -> Dict[str, float]:
+    """Call operation in batches until min_seconds have passed"""
+    operations, batch = 0, 100
+    start = time.perf_counter()
+    while True:
+        for _ in range(batch):
+            operation()
+        operations += batch
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            break
+        batch *= 2
+    return {
+        "ops_per_sec": round(operations / elapsed, 1),
+        "ns_per_op": round(elapsed / operations * 1e9, 1)
+    }
+
+def _enter_span() -> None:
+    with span("stage", model="fake"):
+        pass
+
+def _bench_span_in_trace() -> Dict[str, float]:
+    token = current_trace.set(RunTrace())
+    try:
+        def operation():
+            # Keep the span list small so appends stay comparable
+            current_trace.get().spans.clear()
+            _enter_span()
+        return _timed(operation)
+    finally:
+        current_trace.reset(token)
+
+async def _bench_journal(runs: int = 5000) -> Dict[str, float]:
+    """Record and flush runs through the write-behind journal"""
+    database = Database(":memory:")
+    with database.get_conn() as conn:
+        conn.execute("""
+            INSERT INTO agents (agent_id, name, config, status)
+            VALUES ('agent-0', 'agent 0', '{}', 'inactive')
+        """)
+    journal = RunJournal(database, flush_interval=60, max_batch=runs + 1)
+    task = dumps(RUN["task"])
+    result = dumps(RUN["result"])
+    start = time.perf_counter()
+    for i in range(runs):
+        now = datetime.utcnow().isoformat(" ")
+        journal.record_start(f"run-{i}", "agent-0", task, now)
+        journal.record_finish(f"run-{i}", "agent-0", "completed", result, now)
+    await journal.flush()
+    elapsed = time.perf_counter() - start
+    await journal.close()
+    await database.close()
+    return {
+        "ops_per_sec": round(runs / elapsed, 1),
+        "ns_per_op": round(elapsed / runs * 1e9, 1)
+    }
+
+def run_micro() -> Dict[str, Dict[str, float]]:
+    """Run every micro-benchmark
+
+    Returns:
+        Operations per second and nanoseconds per operation by benchmark name
+    """
+    encoded = dumps(RUN)
+    child = Histogram("bench_seconds", "Benchmark histogram").labels()
+    return {
+        "serialization.dumps_run": _timed(lambda: dumps(RUN)),
+        "serialization.loads_run": _timed(lambda: loads(encoded)),
+        "metrics.histogram_observe": _timed(lambda: child.observe(0.0123)),
+        "tracing.span_untraced": _timed(_enter_span),
+        "tracing.span_traced": _bench_span_in_trace(),
+        "run_journal.record_and_flush": asyncio.run(_bench_journal())
+    }
@@ -0,0 +1,234 @@
+# benchmarks/run.py
+"""Boot the app against the fake LLM, load-test its endpoints and write JSON results
+
+Usage:
+    python -m benchmarks.run --scale small --output data/benchmarks/baseline.json
+    python -m benchmarks.run --scale small --compare data/benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import logging
+import os
+import platform
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+import yaml
+
+from src.config.app_config import BASE_DIR, load_app_config
+from src.core.serialization import dumps, loads
+from . import fake_llm
+from .load import Scenario, run_scenario
+from .micro import run_micro
+from .seed import seed
+
+logger = logging.getLogger(__name__)
+
+# Database sizes: agents and total runs
+SCALES = {
+    "tiny": (1_000, 50_000),
+    "small": (10_000, 1_000_000),
+    "large": (100_000, 5_000_000)
+}
+
+# Percentile and throughput changes larger than this are flagged by --compare
+REGRESSION_THRESHOLD = 0.10
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _wait_until_ready(url: str, process: subprocess.Popen, timeout: float = 60.0) -> None:
+    """Poll url until it answers, failing early if the process exits"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{process.args} exited with code {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"{url} did not become ready within {timeout}s")
+
+def _start(args: List[str], cwd: Path, env: Dict[str, str], log_path: Path) -> subprocess.Popen:
+    """Start a Python subprocess logging to a file, so a full pipe never stalls it"""
+    with open(log_path, "wb") as log:
+        return subprocess.Popen(
+            [sys.executable, *args], cwd=cwd, env=env,
+            stdout=log, stderr=subprocess.STDOUT
+        )
+
+def _stop(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+def _write_config(workdir: Path) -> Path:
+    """Copy the app config with background work that would skew results turned off"""
+    config = dict(load_app_config())
+    config["archive"] = {**config.get("archive", {}), "enabled": False}
+    config["tracing"] = {**config.get("tracing", {}), "export_path": None}
+    path = workdir / "config.yaml"
+    path.write_text(yaml.safe_dump(config))
+    return path
+
+def _agent_ids(db_path: Path, limit: int) -> List[str]:
+    with sqlite3.connect(db_path) as conn:
+        return [row[0] for row in conn.execute("SELECT agent_id FROM agents LIMIT ?", (limit,))]
+
+def build_scenarios(agent_ids: List[str]) -> List[Scenario]:
+    """The endpoints the suite measures, each hitting random seeded agents"""
+    task = {"task": "generate_story", "params": {"theme": "friendship"}}
+    pick = lambda rng: rng.choice(agent_ids)
+    return [
+        Scenario("POST /agents/{id}/tasks", "POST", lambda rng: (f"/api/agents/{pick(rng)}/tasks", task)),
+        Scenario("GET /agents", "GET", lambda rng: ("/api/agents?limit=50", None)),
+        Scenario("GET /agents/{id}/runs", "GET", lambda rng: (f"/api/agents/{pick(rng)}/runs?limit=50", None)),
+        Scenario("GET /agents/{id}/output", "GET", lambda rng: (f"/api/agents/{pick(rng)}/output", None)),
+    ]
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(previous: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    """Describe how each endpoint's throughput and p95/p99 moved since a previous run
+
+    Returns:
+        One line per endpoint; lines for changes beyond REGRESSION_THRESHOLD
+        in the wrong direction start with "REGRESSION"
+    """
+    lines = []
+    for name, result in current.get("endpoints", {}).items():
+        before = previous.get("endpoints", {}).get(name)
+        if not before:
+            continue
+        changes, regressed = [], False
+        for key, higher_is_better in (("rps", True), ("p95_ms", False), ("p99_ms", False)):
+            if not before.get(key) or result.get(key) is None:
+                continue
+            change = (result[key] - before[key]) / before[key]
+            changes.append(f"{key} {before[key]} -> {result[key]} ({change:+.1%})")
+            if (-change if higher_is_better else change) > REGRESSION_THRESHOLD:
+                regressed = True
+        lines.append(f"{'REGRESSION ' if regressed else ''}{name}: {', '.join(changes)}")
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=SCALES, default="small", help="Seeded database size")
+    parser.add_argument("--agents", type=int, help="Override the number of seeded agents")
+    parser.add_argument("--runs", type=int, help="Override the number of seeded runs")
+    parser.add_argument("--db", type=Path, help="Reuse an already seeded agents.db instead of seeding")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per endpoint")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds per endpoint")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients per endpoint")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes serving the app")
+    parser.add_argument("--skip-micro", action="store_true", help="Skip the in-process micro-benchmarks")
+    parser.add_argument("--output", type=Path, help="Results file (default: data/benchmarks/<timestamp>.json)")
+    parser.add_argument("--compare", type=Path, help="Previous results file to compare against")
+    fake_llm.add_arguments(parser)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    agents, runs = SCALES[args.scale]
+    agents = args.agents or agents
+    runs = args.runs if args.runs is not None else runs
+
+    with tempfile.TemporaryDirectory(prefix="agents-bench-") as tmp:
+        workdir = Path(tmp)
+        db_path = workdir / "agents.db"
+        seed_seconds = None
+        if args.db is not None:
+            os.symlink(args.db.resolve(), db_path)
+        else:
+            logger.info(f"Seeding {agents} agents and {runs} runs")
+            seed_seconds = seed(str(db_path), agents, runs)["seconds"]
+
+        llm_port, app_port = _free_port(), _free_port()
+        env = {
+            **os.environ,
+            "PYTHONPATH": str(BASE_DIR),
+            "CONFIG_PATH": str(_write_config(workdir)),
+            "OPENAI_BASE_URL": f"http://127.0.0.1:{llm_port}/v1",
+            "OPENAI_API_KEY": "sk-benchmark"
+        }
+        llm = _start([
+            "-m", "benchmarks.fake_llm", "--port", str(llm_port),
+            "--llm-latency", str(args.llm_latency), "--llm-jitter", str(args.llm_jitter),
+            "--llm-token-rate", str(args.llm_token_rate), "--llm-tokens", str(args.llm_tokens),
+            "--llm-error-rate", str(args.llm_error_rate)
+        ], BASE_DIR, env, workdir / "fake_llm.log")
+        # The app opens agents.db relative to its working directory
+        app = _start([
+            "-m", "uvicorn", "src.main:app", "--port", str(app_port), "--log-level", "warning",
+            "--workers", str(args.workers)
+        ], workdir, env, workdir / "app.log")
+        base_url = f"http://127.0.0.1:{app_port}"
+        endpoints = {}
+        try:
+            try:
+                _wait_until_ready(f"http://127.0.0.1:{llm_port}/docs", llm)
+                _wait_until_ready(f"{base_url}/api/stats/tasks", app)
+            except (RuntimeError, TimeoutError):
+                for log in ("fake_llm.log", "app.log"):
+                    logger.error(f"--- {log}\n{(workdir / log).read_text()[-4000:]}")
+                raise
+            agent_ids = _agent_ids(db_path, 10_000)
+            for scenario in build_scenarios(agent_ids):
+                logger.info(f"Benchmarking {scenario.name}")
+                endpoints[scenario.name] = asyncio.run(run_scenario(
+                    base_url, scenario, args.concurrency, args.duration, args.warmup
+                ))
+                logger.info(f"  {dumps(endpoints[scenario.name])}")
+        finally:
+            _stop(app)
+            _stop(llm)
+
+    results = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "agents": agents if args.db is None else None,
+            "runs": runs if args.db is None else None,
+            "seed_seconds": seed_seconds,
+            "duration": args.duration,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "llm": vars(fake_llm.settings_from_args(args))
+        },
+        "endpoints": endpoints,
+        "micro": {} if args.skip_micro else run_micro()
+    }
+    output = args.output or BASE_DIR / "data" / "benchmarks" / f"{datetime.utcnow():%Y%m%dT%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(dumps(results))
+    logger.info(f"Wrote {output}")
+
+    if args.compare is not None:
+        for line in compare(loads(args.compare.read_text()), results):
+            logger.info(line)
+
+if __name__ == '__main__':
+    main()
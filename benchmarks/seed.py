@@ -0,0 +1,121 @@
+# benchmarks/seed.py
+"""Seed an agents database with many agents and runs for load testing"""
+import argparse
+import itertools
+import logging
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Tuple
+
+from src.agents.storyteller import StorytellerAgent
+from src.core.serialization import dumps
+from src.database.db_setup import Database
+
+logger = logging.getLogger(__name__)
+
+# Rows per executemany; large enough to amortize the call, small enough to stream
+CHUNK_SIZE = 50_000
+
+def _chunks(rows: Iterator[Tuple], size: int = CHUNK_SIZE) -> Iterator[List[Tuple]]:
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+def seed(
+    db_path: str,
+    agents: int,
+    runs: int,
+    model_name: str = "gpt-3.5-turbo",
+    days: float = 7.0,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """Fill a database with storyteller agents and finished runs
+
+    Runs are spread round-robin over the agents, with start times spread
+    over the last ``days`` days so the archiver leaves them in place.
+
+    Args:
+        db_path: Path of the SQLite file; created and migrated if needed
+        agents: Number of agents to create
+        runs: Total number of runs to create
+        model_name: Model the agents are configured to call
+        days: Age in days of the oldest run
+        seed: Random seed, so two seeded databases are identical
+
+    Returns:
+        The created agent IDs and the time seeding took
+    """
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    database = Database(db_path)
+    conn = database.get_conn()
+    # Bulk load without per-commit syncing; the file is disposable
+    conn.execute("PRAGMA synchronous = OFF")
+
+    config = dumps({
+        **StorytellerAgent.DEFAULT_CONFIG,
+        "model_name": model_name,
+        "temperature": 0.7
+    })
+    agent_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(agents)]
+    created = datetime.utcnow() - timedelta(days=days)
+    with conn:
+        conn.executemany("""
+            INSERT INTO agents (agent_id, name, config, status, type, created_at)
+            VALUES (?, ?, ?, 'inactive', 'storyteller', ?)
+        """, [
+            (agent_id, f"agent {i}", config, (created + timedelta(seconds=i)).isoformat(" "))
+            for i, agent_id in enumerate(agent_ids)
+        ])
+        conn.executemany(
+            "INSERT INTO agent_states (agent_id, memory) VALUES (?, '{}')",
+            [(agent_id,) for agent_id in agent_ids]
+        )
+
+    now = datetime.utcnow()
+    span = days * 24 * 3600
+    task = dumps({"task": "generate_story", "params": {"theme": "friendship"}})
+
+    def run_rows() -> Iterator[Tuple]:
+        for i in range(runs):
+            started = now - timedelta(seconds=span * (runs - i) / runs)
+            failed = rng.random() < 0.02
+            yield (
+                str(uuid.UUID(int=rng.getrandbits(128))),
+                agent_ids[i % agents],
+                task,
+                "failed" if failed else "completed",
+                dumps("Failed to generate story" if failed else {"result": f"story {i}"}),
+                started.isoformat(" "),
+                (started + timedelta(seconds=2)).isoformat(" ")
+            )
+
+    for chunk in _chunks(run_rows()):
+        with conn:
+            conn.executemany("""
+                INSERT INTO agent_runs (run_id, agent_id, task, status, result, started_at, completed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, chunk)
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("ANALYZE")
+    conn.close()
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"Seeded {agents} agents and {runs} runs in {elapsed:.1f}s")
+    return {"agent_ids": agent_ids, "seconds": elapsed}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("db_path")
+    parser.add_argument("--agents", type=int, default=10_000)
+    parser.add_argument("--runs", type=int, default=1_000_000)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    seed(args.db_path, args.agents, args.runs)
+
+if __name__ == '__main__':
+    main()
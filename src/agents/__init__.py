@@ -1,4 +1,22 @@
+import importlib
+from typing import Any
+
 from src.core.agent import Agent
-from .storyteller import StorytellerAgent
 
-__all__ = ['Agent', 'StorytellerAgent'] 
\ No newline at end of file
+# Agent types and the classes implementing them, as "module:Class". Classes
+# are imported when an agent of their type is first loaded, so starting the
+# server doesn't pay for every agent's dependencies.
+AGENT_TYPES = {
+    "storyteller": "src.agents.storyteller:StorytellerAgent",
+    "chat": "src.agents.chat:ChatAgent",
+}
+
+__all__ = ['Agent', 'AGENT_TYPES', 'ChatAgent', 'StorytellerAgent']
+
+def __getattr__(name: str) -> Any:
+    """Import agent classes named in __all__ on first access"""
+    for path in AGENT_TYPES.values():
+        module, _, class_name = path.partition(":")
+        if class_name == name:
+            return getattr(importlib.import_module(module), class_name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,204 @@
+from typing import Optional, Dict, Any, Awaitable, Callable, List, Tuple
+import uuid
+
+from src.core.agent import Agent
+from src.core.config_manager import ConfigManager
+from src.core.conversation_memory import estimate_tokens
+from src.core.tracing import span
+from src.llm.client_registry import get_llm_registry
+from src.llm.providers import CompletionRequest
+from src.llm.resilience import call_with_policy, chunks_with_timeout, get_policy
+
+class ChatAgent(Agent):
+    """A conversational agent that remembers earlier turns within a token budget"""
+
+    AGENT_TYPE = "chat"
+
+    DEFAULT_CONFIG = {
+        'system_prompt': "You are a friendly, helpful assistant.",
+        'summary_prompt': (
+            "Update the summary of a conversation with its newest turns. Keep names, "
+            "facts, decisions and open questions; drop small talk. Answer with the "
+            "summary only, in at most {max_words} words."
+        ),
+        # Tokens reserved for each reply when scheduling the request
+        'reply_tokens': 500
+    }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Merged config and the config version it was built from
+        self._merged_config: Optional[Tuple[Optional[int], Dict[str, Any]]] = None
+        self.config_manager = None
+        if self.database is not None:
+            self.config_manager = ConfigManager(
+                agent_id=self.id,
+                agent_type=self.AGENT_TYPE,
+                database=self.database
+            )
+
+    async def prepare(self) -> None:
+        """Load the stored configuration"""
+        if self.config_manager is not None:
+            await self.config_manager.load()
+
+    def get_config(self) -> Dict[str, Any]:
+        """Get this agent's configuration merged over the defaults, once per config version"""
+        if self.config_manager is None:
+            return self.DEFAULT_CONFIG
+        stored = self.config_manager.get_config()
+        version = self.config_manager.version
+        if self._merged_config is None or self._merged_config[0] != version:
+            merged = {key: stored.get(key, default) for key, default in self.DEFAULT_CONFIG.items()}
+            self._merged_config = (version, merged)
+        return self._merged_config[1]
+
+    async def _complete(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: Optional[int] = None,
+        on_delta: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> str:
+        """Send messages to the agent's model under the chat resilience policy"""
+        registry = get_llm_registry()
+        provider = registry.get_provider(self.provider)
+        pieces = []
+
+        async def call(limits) -> str:
+            request = CompletionRequest(
+                model=self.model_name,
+                messages=messages,
+                temperature=self.temperature,
+                max_tokens=max_tokens,
+                timeout=limits.timeout
+            )
+            if on_delta is None:
+                return (await provider.complete(request)).text
+            async for delta in chunks_with_timeout(provider.stream(request), limits.timeout):
+                pieces.append(delta)
+                await on_delta(delta)
+            return "".join(pieces)
+
+        with span("llm_call", model=self.model_name, provider=provider.name, stream=on_delta is not None):
+            return await call_with_policy(
+                registry, self.model_name, call, get_policy(self.AGENT_TYPE),
+                tokens=estimate_tokens(*(message["content"] for message in messages))
+                + (max_tokens or self.get_config()['reply_tokens']),
+                can_retry=lambda: not pieces,
+                hedge=on_delta is None,
+                provider=provider.name,
+                stream=on_delta is not None
+            )
+
+    async def summarize(self, summary: str, turns: List[Dict[str, Any]], max_tokens: int) -> str:
+        """Fold conversation turns into the running summary with the agent's model
+
+        Args:
+            summary: Summary of the turns folded in before
+            turns: Turns to add, oldest first
+            max_tokens: Longest summary allowed
+
+        Returns:
+            The updated summary
+        """
+        config = self.get_config()
+        transcript = "\n".join(
+            f"User: {turn['user_message']}\nAssistant: {turn['agent_response']}" for turn in turns
+        )
+        messages = [{
+            "role": "system",
+            "content": config['summary_prompt'].format(max_words=int(max_tokens * 0.75))
+        }, {
+            "role": "user",
+            "content": f"Summary so far:\n{summary or '(none)'}\n\nNewest turns:\n{transcript}"
+        }]
+        with span("summarize", turns=len(turns)):
+            return await self._complete(messages, max_tokens=max_tokens)
+
+    async def chat(
+        self,
+        message: str,
+        on_delta: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> str:
+        """Answer a message in the context of the conversation so far
+
+        Args:
+            message: The user's message
+            on_delta: Optional coroutine function; when given, the reply is
+                streamed and each piece is passed to it as it arrives
+
+        Returns:
+            The reply
+
+        Raises:
+            ValueError: If the agent has no conversation memory
+        """
+        if self.memory is None:
+            raise ValueError("Conversation memory is required for ChatAgent")
+        config = self.get_config()
+        with span("load_memory"):
+            messages = await self.memory.messages(self.id, config['system_prompt'], message)
+        reply = await self._complete(messages, on_delta=on_delta)
+        with span("save_turn"):
+            await self.memory.append(self.id, message, reply, summarize=self.summarize)
+        return reply
+
+    @staticmethod
+    def _message(task: Dict[str, Any]) -> str:
+        """Get the message of a chat task
+
+        Raises:
+            ValueError: If the task has no params.message string
+        """
+        params = task.get("params")
+        message = params.get("message") if isinstance(params, dict) else None
+        if not isinstance(message, str) or not message:
+            raise ValueError("Chat tasks require params.message")
+        return message
+
+    async def execute_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute a task specific to the chat agent
+
+        Args:
+            task: Dictionary containing task details
+
+        Returns:
+            Dictionary containing task results
+
+        Raises:
+            ValueError: If a chat task has no params.message
+        """
+        if task.get("task") == "chat":
+            reply = await self.chat(self._message(task))
+            return {
+                "run_id": str(uuid.uuid4()),
+                "result": reply
+            }
+
+        return await super().execute_task(task)
+
+    async def stream_task(
+        self,
+        task: Dict[str, Any],
+        emit: Callable[[str], Awaitable[None]]
+    ) -> Dict[str, Any]:
+        """Execute a task, streaming the reply to emit as it is generated
+
+        Args:
+            task: Dictionary containing task details
+            emit: Coroutine function called with each text delta
+
+        Returns:
+            Dictionary containing task results
+
+        Raises:
+            ValueError: If a chat task has no params.message
+        """
+        if task.get("task") == "chat":
+            reply = await self.chat(self._message(task), on_delta=emit)
+            return {
+                "run_id": str(uuid.uuid4()),
+                "result": reply
+            }
+
+        return await super().stream_task(task, emit)
@@ -1,11 +1,14 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Awaitable, Callable, Tuple
 from dataclasses import dataclass
-import openai
 import uuid
-from openai import AsyncOpenAI
 
 from src.core.agent import Agent
 from src.core.config_manager import ConfigManager
+from src.core.run_context import get_current_run
+from src.core.tracing import span
+from src.llm.client_registry import get_llm_registry
+from src.llm.providers import CompletionRequest
+from src.llm.resilience import call_with_policy, chunks_with_timeout, get_policy
 
 @dataclass
 class StorytellerConfig:
@@ -54,24 +57,28 @@ class StorytellerAgent(Agent):
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        if not hasattr(self, 'db_conn') or self.db_conn is None:
-            raise ValueError("Database connection is required for StorytellerAgent")
+        if self.database is None:
+            raise ValueError("Database is required for StorytellerAgent")
         self.config_manager = ConfigManager(
             agent_id=self.id,
-            db_conn=self.db_conn,
-            agent_type=self.AGENT_TYPE
+            agent_type=self.AGENT_TYPE,
+            database=self.database
         )
-        self._ensure_default_config()
+        # Typed config and the config version it was built from
+        self._typed_config: Optional[Tuple[Optional[int], StorytellerConfig]] = None
     
-    def _ensure_default_config(self) -> None:
-        """Ensure default configuration exists in database"""
-        config = self.config_manager.get_config()
+    async def prepare(self) -> None:
+        """Load the configuration, storing the defaults if there is none"""
+        config = await self.config_manager.load()
         if not config:
-            self.config_manager.update_config(self.DEFAULT_CONFIG)
+            await self.config_manager.update_config(self.DEFAULT_CONFIG)
     
     def get_config(self) -> StorytellerConfig:
-        """Get the typed configuration for this agent"""
+        """Get the typed configuration for this agent, built once per config version"""
         config_dict = self.config_manager.get_config()
+        version = self.config_manager.version
+        if self._typed_config is not None and self._typed_config[0] == version:
+            return self._typed_config[1]
         # Merge with defaults to ensure all required fields exist
         config_dict = {**self.DEFAULT_CONFIG, **config_dict}
         # Only pass the fields that StorytellerConfig expects
@@ -82,40 +89,109 @@ class StorytellerAgent(Agent):
             'story_prompt_template': config_dict.get('story_prompt_template', self.DEFAULT_CONFIG['story_prompt_template']),
             'theme_prompt_template': config_dict.get('theme_prompt_template', self.DEFAULT_CONFIG['theme_prompt_template'])
         }
-        return StorytellerConfig(**storyteller_config)
+        self._typed_config = (version, StorytellerConfig(**storyteller_config))
+        return self._typed_config[1]
     
-    async def generate_story(self, theme: Optional[str] = None) -> str:
+    @staticmethod
+    def estimate_tokens(messages, config: StorytellerConfig) -> int:
+        """Estimate the prompt plus completion tokens of a story request
+
+        Uses ~4 characters per prompt token and ~1.4 tokens per story word.
+        """
+        prompt_chars = sum(len(message["content"]) for message in messages)
+        return prompt_chars // 4 + int(config.story_length * 1.4)
+    
+    async def generate_story(
+        self,
+        theme: Optional[str] = None,
+        use_cache: Optional[bool] = None,
+        on_delta: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> str:
         """Generate a children's story
         
         Args:
             theme: Optional theme or topic for the story
+            use_cache: Whether to reuse a cached response for an identical
+                request. Defaults to caching only when temperature is 0.
+            on_delta: Optional coroutine function; when given, the story is
+                streamed and each piece is passed to it as it arrives
             
         Returns:
             The generated story as a string
         """
-        config = self.get_config()
+        with span("get_config"):
+            config = self.get_config()
         
         # Format theme prompt if theme is provided
         theme_prompt = config.format_theme(theme) if theme else ""
         
         # Format main prompt using configuration
         prompt = config.format_story_prompt(theme_prompt)
+        messages = [{
+            "role": "system",
+            "content": config.system_prompt
+        }, {
+            "role": "user",
+            "content": prompt
+        }]
             
         try:
-            client = AsyncOpenAI()
-            response = await client.chat.completions.create(
-                model=self.model_name,
-                messages=[{
-                    "role": "system",
-                    "content": config.system_prompt
-                }, {
-                    "role": "user",
-                    "content": prompt
-                }],
-                temperature=self.temperature
-            )
+            registry = get_llm_registry()
+            provider = registry.get_provider(self.provider)
+            cache = registry.response_cache
+            if use_cache is None:
+                use_cache = self.temperature == 0
+            cache_key = None
+            if cache is not None and use_cache:
+                params = {"temperature": self.temperature}
+                if self.provider is not None:
+                    params["provider"] = self.provider
+                cache_key = cache.make_key(self.model_name, messages, params)
+                with span("cache_lookup") as lookup:
+                    story = await cache.get(cache_key)
+                    if lookup is not None:
+                        lookup.attributes["hit"] = story is not None
+                if story is not None:
+                    run = get_current_run()
+                    if run is not None:
+                        run.cache_hit = True
+                    if on_delta is not None:
+                        await on_delta(story)
+                    return story
+
+            pieces = []
+
+            async def call(limits) -> str:
+                request = CompletionRequest(
+                    model=self.model_name,
+                    messages=messages,
+                    temperature=self.temperature,
+                    timeout=limits.timeout
+                )
+                if on_delta is None:
+                    return (await provider.complete(request)).text
+                async for delta in chunks_with_timeout(provider.stream(request), limits.timeout):
+                    pieces.append(delta)
+                    await on_delta(delta)
+                return "".join(pieces)
+
+            with span("llm_call", model=self.model_name, provider=provider.name, stream=on_delta is not None):
+                # Failed calls are retried (and rate-limited ones requeued) unless
+                # part of the story has already been streamed; streamed calls are
+                # never hedged, as both copies would reach on_delta
+                story = await call_with_policy(
+                    registry, self.model_name, call, get_policy(self.AGENT_TYPE),
+                    tokens=self.estimate_tokens(messages, config),
+                    can_retry=lambda: not pieces,
+                    hedge=on_delta is None,
+                    provider=provider.name,
+                    stream=on_delta is not None
+                )
             
-            return response.choices[0].message.content
+            if cache_key is not None and story is not None:
+                with span("cache_store"):
+                    await cache.put(cache_key, self.model_name, story)
+            return story
             
         except Exception as e:
             raise Exception(f"Failed to generate story: {str(e)}")
@@ -132,11 +208,36 @@ class StorytellerAgent(Agent):
         task_type = task.get("task")
         
         if task_type == "generate_story":
-            story = await self.generate_story(task.get("params", {}).get("theme"))
+            params = task.get("params", {})
+            story = await self.generate_story(params.get("theme"), params.get("cache"))
             return {
                 "run_id": str(uuid.uuid4()),
                 "result": story
             }
             
         # For unknown task types, fall back to parent class implementation
-        return await super().execute_task(task)
\ No newline at end of file
+        return await super().execute_task(task)
+
+    async def stream_task(
+        self,
+        task: Dict[str, Any],
+        emit: Callable[[str], Awaitable[None]]
+    ) -> Dict[str, Any]:
+        """Execute a task, streaming story text to emit as it is generated
+        
+        Args:
+            task: Dictionary containing task details
+            emit: Coroutine function called with each text delta
+            
+        Returns:
+            Dictionary containing task results
+        """
+        if task.get("task") == "generate_story":
+            params = task.get("params", {})
+            story = await self.generate_story(params.get("theme"), params.get("cache"), on_delta=emit)
+            return {
+                "run_id": str(uuid.uuid4()),
+                "result": story
+            }
+            
+        return await super().stream_task(task, emit)
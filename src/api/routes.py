@@ -1,12 +1,25 @@
 # src/api/routes.py
-from fastapi import APIRouter, HTTPException
-from typing import Dict, Any, Optional
+from fastapi import APIRouter, Header, HTTPException, Query, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from typing import Dict, Any, AsyncIterator, Optional
+import hashlib
 import logging
-import json
 
+from src.config.app_config import BASE_DIR, get_section
 from src.core.agent_manager import AgentManager
+from src.core.conversation_memory import ConversationMemory
+from src.core.metrics import REGISTRY, EventLoopMonitor
+from src.core.serialization import decode_column, dumps
+from src.core.startup import STARTUP
+from src.core.task_queue import TaskQueue, TaskQueueFullError
+from src.core.tracing import SpanFileExporter
+from src.database.coordination import InvalidationChannel, Lease
 from src.database.db_setup import Database
-from src.agents.storyteller import StorytellerAgent
+from src.database.run_archive import RunArchive, TraceNotArchivedError
+from src.database.run_journal import RunJournal
+from src.agents import AGENT_TYPES
+from src.llm.client_registry import get_llm_registry
+from src.llm.response_cache import ResponseCache
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -15,12 +28,186 @@ logger = logging.getLogger(__name__)
 # Create router
 router = APIRouter()
 
-# Initialize database and agent manager
-db = Database("agents.db")
-agent_manager = AgentManager(database=db)
+# Upper bound for ?limit= on paginated endpoints
+MAX_PAGE_SIZE = 1000
+# Seconds between keepalive comments on idle GET /events streams
+EVENT_KEEPALIVE_INTERVAL = 15
 
-# Register available agent types
-agent_manager.register_agent_class(StorytellerAgent)
+# Operator settings, read once at import
+database_settings = get_section("database")
+task_settings = get_section("tasks")
+archive_settings = get_section("archive")
+ARCHIVE_INTERVAL = float(archive_settings.get("interval", 3600))
+tracing_settings = get_section("tracing")
+cache_settings = get_section("llm_cache")
+coordination_settings = get_section("coordination")
+memory_settings = get_section("memory")
+
+# Limits for the batch endpoints
+MAX_BATCH_SIZE = int(task_settings.get("max_batch_size", 5000))
+DEFAULT_BATCH_CONCURRENCY = int(task_settings.get("default_batch_concurrency", 8))
+MAX_BATCH_CONCURRENCY = int(task_settings.get("max_batch_concurrency", 64))
+
+# Per-worker resources. They are created by startup() from the app's
+# lifespan rather than at import, so each `uvicorn --workers N` process
+# opens its own connections, pools and background tasks.
+db: Optional[Database] = None
+run_journal: Optional[RunJournal] = None
+task_queue: Optional[TaskQueue] = None
+run_archive: Optional[RunArchive] = None
+invalidations: Optional[InvalidationChannel] = None
+memory: Optional[ConversationMemory] = None
+agent_manager: Optional[AgentManager] = None
+
+def startup(database_path: Optional[str] = None, background_jobs: bool = True) -> None:
+    """Create this worker's database pool, agent manager and background tasks
+
+    Args:
+        database_path: Database to open instead of the configured one
+        background_jobs: Whether to start the invalidation poller, the run
+            archiver and the event loop monitor; off when only timing startup
+    """
+    global db, run_journal, task_queue, run_archive, invalidations, agent_manager
+    with STARTUP.stage("database"):
+        db = Database(
+            database_path or database_settings.get("path", "agents.db"),
+            pool_size=int(database_settings.get("pool_size", 4)),
+            busy_timeout=float(database_settings.get("busy_timeout", 30))
+        )
+    with STARTUP.stage("services"):
+        _create_services()
+    if background_jobs:
+        with STARTUP.stage("background_tasks"):
+            invalidations.start()
+            if run_archive is not None:
+                run_archive.start(ARCHIVE_INTERVAL)
+            event_loop_monitor.start()
+    logger.info(f"Worker {invalidations.origin} started in {STARTUP.total() * 1000:.0f}ms")
+
+def _create_services() -> None:
+    """Create the per-worker services sharing the database pool"""
+    global run_journal, task_queue, run_archive, invalidations, memory, agent_manager
+    run_journal = RunJournal(db)
+    task_queue = TaskQueue(
+        workers=int(task_settings.get("workers", 8)),
+        max_queue=int(task_settings.get("max_queue", 1000))
+    )
+    invalidations = InvalidationChannel(
+        db, interval=float(coordination_settings.get("poll_interval", 0.5))
+    )
+    run_archive = None
+    if archive_settings.get("enabled", True):
+        run_archive = RunArchive(
+            db,
+            directory=BASE_DIR / archive_settings.get("directory", "data/archive"),
+            retention=float(archive_settings.get("retention_days", 30)) * 24 * 3600,
+            batch_size=int(archive_settings.get("batch_size", 5000)),
+            segment_max_bytes=int(archive_settings.get("segment_max_bytes", 64 * 1024 * 1024)),
+            # One worker archives at a time; another takes over if it dies
+            lease=Lease(db, "run_archive", ttl=2 * ARCHIVE_INTERVAL, owner=invalidations.origin)
+        )
+    memory = ConversationMemory(
+        db,
+        max_tokens=int(memory_settings.get("max_tokens", 2000)),
+        summary_tokens=int(memory_settings.get("summary_tokens", 500)),
+        max_turns=int(memory_settings.get("max_turns", 50))
+    )
+    span_exporter = None
+    if tracing_settings.get("export_path"):
+        span_exporter = SpanFileExporter(BASE_DIR / tracing_settings["export_path"])
+    agent_manager = AgentManager(
+        database=db,
+        run_journal=run_journal,
+        task_queue=task_queue,
+        run_archive=run_archive,
+        tracing=bool(tracing_settings.get("enabled", True)),
+        span_exporter=span_exporter,
+        coalesce_agent_types=task_settings.get("coalesce_agent_types"),
+        invalidations=invalidations,
+        memory=memory
+    )
+    if cache_settings.get("enabled", True):
+        get_llm_registry().response_cache = ResponseCache(
+            db,
+            max_bytes=int(cache_settings.get("max_bytes", 64 * 1024 * 1024)),
+            ttl=float(cache_settings.get("ttl", 7 * 24 * 3600))
+        )
+
+    # Register available agent types; each class is imported when an agent
+    # of its type is first loaded
+    for agent_type, class_path in AGENT_TYPES.items():
+        agent_manager.register_agent_type(agent_type, class_path)
+
+async def shutdown() -> None:
+    """Stop background work, then release this worker's resources"""
+    await event_loop_monitor.close()
+    await invalidations.close()
+    # Finish background runs, then write any queued run bookkeeping before
+    # releasing the connection pool
+    if run_archive is not None:
+        await run_archive.close()
+    await agent_manager.close()
+    await memory.close()
+    await run_journal.close()
+    await db.close()
+    await get_llm_registry().close()
+
+# Scrape-time gauges for GET /metrics, read from the existing stats counters
+REGISTRY.gauge(
+    "agent_tasks", "Background task jobs by state", ("state",)
+).set_function(lambda: {
+    ("queued",): task_queue.stats()["queued"],
+    ("active",): task_queue.stats()["active"]
+})
+REGISTRY.gauge(
+    "agent_cache_hit_ratio", "Agent instance cache hit ratio"
+).set_function(lambda: agent_manager.agent_cache.stats()["hit_ratio"])
+REGISTRY.gauge(
+    "llm_response_cache_hit_ratio", "LLM response cache hit ratio"
+).set_function(lambda: (
+    get_llm_registry().response_cache.stats()["hit_ratio"]
+    if get_llm_registry().response_cache is not None else 0.0
+))
+REGISTRY.gauge(
+    "llm_concurrency_limit", "Current adaptive concurrency limit per model", ("model",)
+).set_function(lambda: {
+    (model,): stats["concurrency_limit"] for model, stats in get_llm_registry().stats()["models"].items()
+})
+REGISTRY.gauge(
+    "llm_queue_depth", "LLM calls waiting for their model's scheduler", ("model",)
+).set_function(lambda: {
+    (model,): stats["waiting"] for model, stats in get_llm_registry().stats()["models"].items()
+})
+REGISTRY.gauge(
+    "event_subscribers", "Open GET /events subscriptions"
+).set_function(lambda: agent_manager.event_hub.stats()["subscribers"])
+event_loop_monitor = EventLoopMonitor(
+    REGISTRY.gauge("event_loop_lag_seconds", "Delay of a periodic timer on the event loop")
+)
+
+# Clients may reuse a response, but must revalidate it with If-None-Match
+REVALIDATE = "no-cache"
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header lists etag, compared weakly"""
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+def _not_modified(etag: str) -> Response:
+    """Answer a conditional GET whose cached copy is current"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": REVALIDATE})
+
+def _conditional_json(content: Any, if_none_match: Optional[str], headers: Optional[Dict[str, str]] = None) -> Response:
+    """Render content as JSON tagged with a digest of the body, or 304 if the client has it"""
+    response = ORJSONResponse(content, headers=headers)
+    etag = f'"{hashlib.blake2b(response.body, digest_size=16).hexdigest()}"'
+    if _etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = REVALIDATE
+    return response
 
 @router.post("/agents")
 async def create_agent(agent_data: Dict[str, Any]):
@@ -37,9 +224,27 @@ async def create_agent(agent_data: Dict[str, Any]):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/agents/{agent_id}/tasks")
-async def execute_task(agent_id: str, task: Dict[str, Any]):
-    """Execute a task with specified agent"""
+async def execute_task(
+    agent_id: str,
+    task: Dict[str, Any],
+    response: Response,
+    mode: str = Query("sync", pattern="^(sync|async)$")
+):
+    """Execute a task with specified agent
+    
+    With ?mode=async the task is queued instead and 202 is returned with
+    the run ID; poll GET /runs/{run_id} for the result.
+    """
     try:
+        if mode == "async":
+            run_id = await agent_manager.submit_task(agent_id, task)
+            response.status_code = 202
+            response.headers["Location"] = f"/api/runs/{run_id}"
+            return {
+                "status": "queued",
+                "agent_id": agent_id,
+                "run_id": run_id
+            }
         result = await agent_manager.run_task(agent_id, task)
         return {
             "status": "completed",
@@ -48,17 +253,242 @@ async def execute_task(agent_id: str, task: Dict[str, Any]):
         }
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except TaskQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Task execution failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _sse(name: str, data: Dict[str, Any], event_id: Optional[Any] = None) -> str:
+    """Format one server-sent event"""
+    lines = [f"event: {name}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+def _sse_response(run_id: str, offset: int) -> StreamingResponse:
+    """Stream a run's events from an offset as text/event-stream
+    
+    Delta events carry their end offset as the event ID, so a reconnecting
+    EventSource resumes from Last-Event-ID.
+    """
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for event in agent_manager.follow_run(run_id, offset):
+                yield _sse(event["event"], event, event.get("offset"))
+        except Exception as e:
+            logger.error(f"Run stream {run_id} failed: {e}")
+            yield _sse("error", {"event": "error", "run_id": run_id, "error": str(e)})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "X-Run-Id": run_id
+        }
+    )
+
+@router.post("/agents/{agent_id}/tasks:stream")
+async def stream_task(agent_id: str, task: Dict[str, Any]):
+    """Execute a task, streaming its output as server-sent events
+    
+    Events are 'delta' ({"offset", "text"}) as output arrives, then one
+    'done' ({"status", "result"}). The run continues if the client
+    disconnects; resume with GET /runs/{run_id}/stream.
+    """
+    try:
+        run_id = await agent_manager.start_stream(agent_id, task)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to start streaming task: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return _sse_response(run_id, 0)
+
+@router.get("/runs/{run_id}/stream")
+async def stream_run(
+    run_id: str,
+    offset: int = Query(0, ge=0),
+    last_event_id: Optional[str] = Header(None)
+):
+    """Follow a run's output as server-sent events from a character offset
+    
+    The Last-Event-ID header sent by a reconnecting EventSource takes
+    precedence over ?offset=.
+    """
+    if last_event_id is not None:
+        if not last_event_id.isdigit():
+            raise HTTPException(status_code=400, detail="Last-Event-ID must be an offset")
+        offset = int(last_event_id)
+    try:
+        await agent_manager.get_run(run_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return _sse_response(run_id, offset)
+
+@router.websocket("/ws/agents/{agent_id}")
+async def agent_socket(websocket: WebSocket, agent_id: str):
+    """Stream task output for an agent over a WebSocket
+    
+    Each message from the client is either a task, which is started and
+    streamed, or {"resume": run_id, "offset": n} to follow an existing run.
+    The server replies with the same events as the SSE endpoints, plus a
+    'start' event carrying the run ID.
+    """
+    await websocket.accept()
+    try:
+        while True:
+            message = await websocket.receive_json()
+            if not isinstance(message, dict):
+                await websocket.send_json({"event": "error", "error": "Message must be an object"})
+                continue
+            try:
+                if "resume" in message:
+                    run_id = str(message["resume"])
+                    offset = int(message.get("offset", 0))
+                    await agent_manager.get_run(run_id)
+                else:
+                    run_id = await agent_manager.start_stream(agent_id, message)
+                    offset = 0
+                await websocket.send_json({"event": "start", "run_id": run_id, "offset": offset})
+                async for event in agent_manager.follow_run(run_id, offset):
+                    await websocket.send_json(event)
+            except (ValueError, TypeError) as e:
+                await websocket.send_json({"event": "error", "error": str(e)})
+    except WebSocketDisconnect:
+        logger.debug(f"WebSocket for agent {agent_id} disconnected")
+
+@router.get("/events")
+async def subscribe_events(agent_id: Optional[str] = None):
+    """Push run and agent changes as server-sent events
+    
+    Event types are run.created, run.status, agent.created, agent.updated
+    and agent.deleted, optionally limited to one agent. A 'resync' event
+    means the subscriber fell behind and should reload what it shows.
+    """
+    hub = agent_manager.event_hub
+    
+    async def events() -> AsyncIterator[str]:
+        with hub.subscribe(agent_id) as subscription:
+            # Tell the client it is connected, so it can reload what it shows
+            yield _sse("resync", {"type": "resync"})
+            while True:
+                event = await subscription.next(timeout=EVENT_KEEPALIVE_INTERVAL)
+                if event is None:
+                    # Comment line keeps idle connections open through proxies
+                    yield ": keepalive\n\n"
+                else:
+                    yield _sse(event["type"], event, event["seq"])
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _batch_concurrency(batch: Dict[str, Any]) -> int:
+    """Read and validate the caller's concurrency cap for a batch"""
+    concurrency = batch.get("concurrency", DEFAULT_BATCH_CONCURRENCY)
+    if not isinstance(concurrency, int) or not 1 <= concurrency <= MAX_BATCH_CONCURRENCY:
+        raise HTTPException(
+            status_code=400,
+            detail=f"concurrency must be an integer between 1 and {MAX_BATCH_CONCURRENCY}"
+        )
+    return concurrency
+
+async def _run_batch(items, concurrency: int):
+    """Validate batch items and run them, reporting per-item outcomes"""
+    if not items:
+        raise HTTPException(status_code=400, detail="Batch must contain at least one task")
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch is limited to {MAX_BATCH_SIZE} tasks")
+    if not all(isinstance(task, dict) for _, task in items):
+        raise HTTPException(status_code=400, detail="Every task must be an object")
+    try:
+        results = await agent_manager.run_batch(items, concurrency=concurrency)
+    except Exception as e:
+        logger.error(f"Batch execution failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "total": len(results),
+        "completed": sum(item["status"] == "completed" for item in results),
+        "failed": sum(item["status"] == "failed" for item in results),
+        "items": results
+    }
+
+@router.post("/agents/{agent_id}/tasks:batch")
+async def execute_task_batch(agent_id: str, batch: Dict[str, Any]):
+    """Execute many tasks with one agent
+    
+    Body: {"tasks": [task, ...], "concurrency": 8}
+    """
+    tasks = batch.get("tasks")
+    if not isinstance(tasks, list):
+        raise HTTPException(status_code=400, detail="tasks must be a list")
+    return await _run_batch([(agent_id, task) for task in tasks], _batch_concurrency(batch))
+
+@router.post("/tasks:batch")
+async def execute_cross_agent_batch(batch: Dict[str, Any]):
+    """Execute many tasks across agents
+    
+    Body: {"items": [{"agent_id": ..., "task": {...}}, ...], "concurrency": 8}
+    """
+    items = batch.get("items")
+    if not isinstance(items, list) or not all(
+        isinstance(item, dict) and isinstance(item.get("agent_id"), str) for item in items
+    ):
+        raise HTTPException(status_code=400, detail="items must be a list of {agent_id, task} objects")
+    return await _run_batch(
+        [(item["agent_id"], item.get("task")) for item in items],
+        _batch_concurrency(batch)
+    )
+
+@router.get("/runs/{run_id}")
+async def get_run(run_id: str, wait: float = Query(0, ge=0, le=60)):
+    """Get a run's status and result
+    
+    With ?wait=N the request waits up to N seconds for a queued or running
+    run to finish before responding.
+    """
+    try:
+        # Task and result are sent as stored, without a decode/encode round trip
+        return ORJSONResponse(await agent_manager.wait_for_run(run_id, wait, raw=True))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to get run: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/agents/{agent_id}/runs/{run_id}/trace")
+async def get_run_trace(agent_id: str, run_id: str):
+    """Get a run's stages as a waterfall of spans with millisecond offsets"""
+    try:
+        trace = await agent_manager.get_run_trace(run_id, agent_id=agent_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except TraceNotArchivedError as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to get run trace: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if trace["agent_id"] != agent_id:
+        raise HTTPException(status_code=404, detail=f"Run {run_id} not found for agent {agent_id}")
+    return trace
+
 @router.put("/agents/{agent_id}/config")
 async def update_agent_config(agent_id: str, config_updates: Dict[str, Any]):
     """Update an agent's configuration"""
     try:
         agent = await agent_manager.get_agent(agent_id)
-        agent.config_manager.update_config(config_updates)
-        return {"status": "updated", "agent_id": agent_id}
+        await agent.config_manager.update_config(config_updates)
+        version = agent.config_manager.version
+        return ORJSONResponse(
+            {"status": "updated", "agent_id": agent_id, "config_version": version},
+            headers={"ETag": f'"{version}"'}
+        )
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -66,23 +496,55 @@ async def update_agent_config(agent_id: str, config_updates: Dict[str, Any]):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/agents")
-async def get_agents():
-    """Get all agents"""
+async def get_agents(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    status: Optional[str] = None,
+    agent_type: Optional[str] = Query(None, alias="type"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Get agents, optionally paginated with ?limit=&after=
+    
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    Responses carry an ETag; an unchanged page is answered with 304.
+    """
     try:
-        agents = await agent_manager.get_all_agents()
-        return agents
+        agents, next_cursor = await agent_manager.list_agents(
+            limit=limit,
+            after=after,
+            fields=fields,
+            status=status,
+            agent_type=agent_type,
+            raw=True
+        )
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+        return _conditional_json(agents, if_none_match, headers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to get agents: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/agents/{agent_id}")
-async def get_agent(agent_id: str):
-    """Get a specific agent by ID"""
+async def get_agent(agent_id: str, if_none_match: Optional[str] = Header(None)):
+    """Get a specific agent by ID
+    
+    The ETag is the agent's config_version. A client polling with the
+    current one gets 304 without the agent being built or serialized.
+    """
     try:
+        if if_none_match:
+            etag = f'"{await agent_manager.get_agent_version(agent_id)}"'
+            if _etag_matches(if_none_match, etag):
+                return _not_modified(etag)
         agent = await agent_manager.get_agent(agent_id)
         # Convert agent to dict, excluding non-serializable fields
         agent_dict = agent.to_dict()
-        return agent_dict
+        return ORJSONResponse(agent_dict, headers={
+            "ETag": f'"{agent.config_version}"',
+            "Cache-Control": REVALIDATE
+        })
     except ValueError as e:
         logger.error(f"Agent not found: {agent_id}")
         raise HTTPException(status_code=404, detail=str(e))
@@ -94,14 +556,15 @@ async def get_agent(agent_id: str):
 async def get_agent_types():
     """Get all available agent types"""
     try:
-        agent_types = [
-            {
+        agent_types = []
+        for agent_type in list(agent_manager._agent_classes):
+            # Imports the classes of types no agent has used yet
+            agent_class = agent_manager._agent_class(agent_type)
+            agent_types.append({
                 "type": agent_type,
                 "name": agent_class.__name__,
                 "description": agent_class.__doc__ or "No description available"
-            }
-            for agent_type, agent_class in agent_manager._agent_classes.items()
-        ]
+            })
         # Add default agent type
         agent_types.append({
             "type": "default",
@@ -113,12 +576,49 @@ async def get_agent_types():
         logger.error(f"Failed to get agent types: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/stats/agent-cache")
+async def get_agent_cache_stats():
+    """Get hit/miss counters for the agent instance cache"""
+    return agent_manager.agent_cache.stats()
+
+@router.get("/stats/llm")
+async def get_llm_stats():
+    """Get LLM connection pool, per-model limits, queue depth and response cache counters"""
+    return get_llm_registry().stats()
+
+@router.get("/stats/tasks")
+async def get_task_stats():
+    """Get background task worker and queue depth counters"""
+    return task_queue.stats()
+
+@router.get("/stats/archive")
+async def get_archive_stats():
+    """Get run archive counters"""
+    if run_archive is None:
+        return {"enabled": False}
+    return {"enabled": True, **run_archive.stats()}
+
+@router.get("/stats/events")
+async def get_event_stats():
+    """Get event subscriber and delivery counters"""
+    return agent_manager.event_hub.stats()
+
+@router.get("/stats/worker")
+async def get_worker_stats():
+    """Get the ID of the worker process serving the request and its cache invalidation counters"""
+    return invalidations.stats()
+
 @router.put("/agents/{agent_id}")
 async def update_agent(agent_id: str, agent_data: Dict[str, Any]):
     """Update an existing agent"""
     try:
         await agent_manager.update_agent(agent_id, agent_data)
-        return {"status": "updated", "agent_id": agent_id}
+        # Bumped by the agents table's trigger
+        version = await agent_manager.get_agent_version(agent_id)
+        return ORJSONResponse(
+            {"status": "updated", "agent_id": agent_id, "config_version": version},
+            headers={"ETag": f'"{version}"'}
+        )
     except ValueError as e:
         logger.error(f"Agent not found: {agent_id}")
         raise HTTPException(status_code=404, detail=str(e))
@@ -139,83 +639,96 @@ async def delete_agent(agent_id: str):
         logger.error(f"Failed to delete agent: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/agents/{agent_id}/memory")
+async def get_agent_memory(agent_id: str):
+    """Get the conversation summary and remembered turns a chat agent's next prompt gets"""
+    try:
+        await agent_manager.get_agent(agent_id)
+        return await memory.load(agent_id)
+    except ValueError as e:
+        logger.error(f"Agent not found: {agent_id}")
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to get agent memory: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/agents/{agent_id}/output")
 async def get_agent_output(agent_id: str):
     """Get the latest output for an agent"""
     try:
-        with db.get_conn() as conn:
+        # Snapshot queued runs first so a batch committing mid-query isn't missed
+        pending = run_journal.pending_runs(agent_id)
+        async with db.read() as conn:
             # Get the most recent run for this agent
-            cursor = conn.execute("""
-                SELECT result, status
+            cursor = await conn.execute("""
+                SELECT run_id, result, status, started_at
                 FROM agent_runs 
                 WHERE agent_id = ?
                 ORDER BY started_at DESC
                 LIMIT 1
             """, (agent_id,))
-            row = cursor.fetchone()
+            rows = await cursor.fetchall()
             
-            if not row:
-                return {"output": [], "status": "no_output"}
+        rows = run_journal.merge_runs(rows, pending)
+        row = rows[0] if rows else None
+        if not row:
+            return {"output": [], "status": "no_output"}
+        
+        result = decode_column(row['result'])
+        # Handle different result formats
+        if isinstance(result, str):
+            output = [result]
+        elif isinstance(result, dict) and 'raw' in result and len(result) == 1:
+            # If result is not valid JSON, return it as a single string
+            output = [str(result['raw'])]
+        elif isinstance(result, dict) and 'result' in result:
+            output = [result['result']]
+        elif isinstance(result, list):
+            output = result
+        else:
+            output = [str(result)]
+            
+        return {
+            "output": output,
+            "status": row['status']
+        }
             
-            try:
-                result = json.loads(row['result']) if row['result'] else {}
-                # Handle different result formats
-                if isinstance(result, str):
-                    output = [result]
-                elif isinstance(result, dict) and 'result' in result:
-                    output = [result['result']]
-                elif isinstance(result, list):
-                    output = result
-                else:
-                    output = [str(result)]
-                    
-                return {
-                    "output": output,
-                    "status": row['status']
-                }
-            except json.JSONDecodeError:
-                # If result is not valid JSON, return it as a single string
-                return {
-                    "output": [str(row['result'])],
-                    "status": row['status']
-                }
-                
     except Exception as e:
         logger.error(f"Failed to get agent output: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/agents/{agent_id}/runs")
-async def get_agent_runs(agent_id: str):
-    """Get all runs for an agent"""
+async def get_agent_runs(
+    agent_id: str,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    status: Optional[str] = None,
+    started_after: Optional[str] = None,
+    started_before: Optional[str] = None,
+    include_archived: bool = False
+):
+    """Get runs for an agent, newest first, optionally paginated with ?limit=&after=
+    
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    With ?include_archived=true, runs moved to the run archive are merged in.
+    """
     try:
-        with db.get_conn() as conn:
-            cursor = conn.execute("""
-                SELECT run_id, task, status, result, started_at, completed_at
-                FROM agent_runs 
-                WHERE agent_id = ?
-                ORDER BY started_at DESC
-            """, (agent_id,))
-            rows = cursor.fetchall()
-            
-            runs = []
-            for row in rows:
-                try:
-                    task = json.loads(row['task']) if row['task'] else {}
-                    result = json.loads(row['result']) if row['result'] else {}
-                except json.JSONDecodeError:
-                    task = {"raw": row['task']}
-                    result = {"raw": row['result']}
-                    
-                runs.append({
-                    "run_id": row['run_id'],
-                    "task": task,
-                    "status": row['status'],
-                    "result": result,
-                    "started_at": row['started_at'],
-                    "completed_at": row['completed_at']
-                })
-            
-            return runs
+        runs, next_cursor = await agent_manager.list_runs(
+            agent_id,
+            limit=limit,
+            after=after,
+            fields=fields,
+            status=status,
+            started_after=started_after,
+            started_before=started_before,
+            raw=True,
+            include_archived=include_archived
+        )
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+        return ORJSONResponse(runs, headers=headers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to get agent runs: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,26 @@
+# src/config/app_config.py
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict
+
+import yaml
+
+# Base directory
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+# Operator-tunable settings live in YAML; CONFIG_PATH overrides the location
+CONFIG_PATH = Path(os.getenv('CONFIG_PATH', BASE_DIR / 'config' / 'config.yaml'))
+
+@lru_cache(maxsize=None)
+def load_app_config() -> Dict[str, Any]:
+    """Load config/config.yaml, returning an empty dict if it is missing or empty"""
+    if not CONFIG_PATH.exists():
+        return {}
+    with open(CONFIG_PATH) as f:
+        # The C loader, when PyYAML was built with libyaml, parses several times faster
+        return yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader)) or {}
+
+def get_section(name: str) -> Dict[str, Any]:
+    """Get one top-level section of the application config"""
+    return load_app_config().get(name) or {}
@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Awaitable, Callable
 from sqlite3 import Connection
 
 @dataclass
@@ -15,6 +15,16 @@ class Agent:
     type: str = 'default'
     created_at: Optional[datetime] = None
     db_conn: Optional[Connection] = None
+    # Database whose write() serializes writes, for agents that store state
+    database: Optional[Any] = None
+    # LLM provider name from the agent's config; None selects the default
+    provider: Optional[str] = None
+    # Version of the stored agent the instance was built from, bumped on
+    # every change to its name, type, config or status
+    config_version: Optional[int] = None
+    updated_at: Optional[datetime] = None
+    # ConversationMemory for agents that hold multi-turn conversations
+    memory: Optional[Any] = None
     
     def __post_init__(self):
         """Validate agent attributes after initialization"""
@@ -42,7 +52,8 @@ class Agent:
             temperature=float(data.get('temperature', 0.7)),
             status=data.get('status', 'inactive'),
             created_at=data.get('created_at'),
-            db_conn=db_conn
+            db_conn=db_conn,
+            provider=data.get('provider')
         )
         # Put db_conn back in data if it was present
         if db_conn is not None:
@@ -61,10 +72,13 @@ class Agent:
             "temperature": self.temperature,
             "status": self.status,
             "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "config_version": self.config_version,
             "config": {
                 "model_name": self.model_name,
                 "tools": self.tools,
-                "temperature": self.temperature
+                "temperature": self.temperature,
+                "provider": self.provider
             }
         }
     
@@ -81,6 +95,31 @@ class Agent:
         """
         raise NotImplementedError("Agent subclasses must implement execute_task")
     
+    async def stream_task(
+        self,
+        task: Dict[str, Any],
+        emit: Callable[[str], Awaitable[None]]
+    ) -> Dict[str, Any]:
+        """Execute a task, passing output text to emit as it is produced
+        
+        Args:
+            task: Dictionary containing task details
+            emit: Coroutine function called with each text delta
+            
+        Returns:
+            Dictionary containing task results, as from execute_task
+            
+        Agents that can't stream fall back to execute_task and emit nothing.
+        """
+        return await self.execute_task(task)
+    
+    async def prepare(self) -> None:
+        """Finish setting up a freshly loaded agent before its first use
+
+        Called by AgentManager once the instance is wired up; agents that
+        need to write to the database on load do it here.
+        """
+    
     @property
     def config(self) -> Dict[str, Any]:
         """Get agent configuration"""
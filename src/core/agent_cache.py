@@ -0,0 +1,65 @@
+# src/core/agent_cache.py
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from .agent import Agent
+
+class AgentCache:
+    """Bounded LRU cache of constructed agent instances with a TTL
+
+    Entries expire ``ttl`` seconds after they were stored so changes made
+    outside this process are eventually picked up; local writes invalidate
+    their entry immediately.
+    """
+
+    def __init__(self, max_size: int = 256, ttl: float = 60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, agent_id: str) -> Optional[Agent]:
+        """Get a cached agent, or None if it is missing or expired"""
+        entry = self._entries.get(agent_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        agent, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[agent_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(agent_id)
+        self.hits += 1
+        return agent
+
+    def put(self, agent_id: str, agent: Agent) -> None:
+        """Cache an agent, evicting the least recently used one if full"""
+        self._entries[agent_id] = (agent, time.monotonic() + self.ttl)
+        self._entries.move_to_end(agent_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, agent_id: str) -> None:
+        """Drop an agent from the cache"""
+        self._entries.pop(agent_id, None)
+
+    def clear(self) -> None:
+        """Drop every cached agent"""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and the current size"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
@@ -1,22 +1,141 @@
 # src/core/agent_manager.py
-from typing import Dict, Any, List, Type
+from typing import Dict, Any, AsyncIterator, List, Optional, Set, Tuple, Type
+import asyncio
+import importlib
+import time
 import uuid
-import json
+from contextlib import asynccontextmanager
 from datetime import datetime
+from functools import partial
 import logging
-from sqlite3 import Connection, Row
+from sqlite3 import Row
 from src.database.db_setup import Database
+from src.database.run_archive import TraceNotArchivedError
 from .agent import Agent
+from .agent_cache import AgentCache
+from .config_manager import ConfigManager
+from .event_hub import EventHub
+from .metrics import REGISTRY
+from .run_context import RunContext, current_run
+from .run_stream import RunStream
+from .serialization import decode_column, dumps, loads, raw_column
+from .single_flight import SingleFlight, task_key
+from .tracing import RunTrace, current_trace, span
+from .pagination import decode_cursor, encode_cursor, normalize_timestamp, parse_fields
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+RUN_SECONDS = REGISTRY.histogram(
+    "agent_run_duration_seconds",
+    "End-to-end time to execute an agent run",
+    ("agent_type", "status")
+)
+RUNS_TOTAL = REGISTRY.counter(
+    "agent_runs",
+    "Finished agent runs",
+    ("agent_type", "status")
+)
+RUNS_IN_FLIGHT = REGISTRY.gauge(
+    "agent_runs_in_flight",
+    "Agent runs currently executing",
+    ("agent_type",)
+)
+RUNS_COALESCED = REGISTRY.counter(
+    "agent_runs_coalesced",
+    "Runs that shared an identical in-flight run's execution",
+    ("agent_type",)
+)
+
+# Public agent fields and the columns they are read from
+AGENT_FIELDS = {
+    "id": "agent_id",
+    "name": "name",
+    "type": "type",
+    "status": "status",
+    "config": "config",
+    "created_at": "created_at"
+}
+
+# Run fields map one-to-one onto agent_runs columns
+RUN_FIELDS = {
+    field: field
+    for field in (
+        "run_id", "task", "status", "result", "started_at", "completed_at", "cache_hit", "output",
+        "attempts", "coalesced_from"
+    )
+}
+
 class AgentManager:
     """Manages agent lifecycle and task execution"""
     
-    def __init__(self, database=None, db_path=":memory:"):
-        """Initialize AgentManager with either a database instance or path"""
+    # Seconds between saves of a streaming run's partial output
+    STREAM_SAVE_INTERVAL = 0.5
+    # Seconds between checks of a followed run that isn't streaming here
+    STREAM_POLL_INTERVAL = 1.0
+    
+    def __init__(
+        self,
+        database=None,
+        db_path=":memory:",
+        run_journal=None,
+        agent_cache=None,
+        task_queue=None,
+        event_hub=None,
+        run_archive=None,
+        tracing: bool = True,
+        span_exporter=None,
+        coalesce_agent_types=None,
+        invalidations=None,
+        memory=None
+    ):
+        """Initialize AgentManager with either a database instance or path
+        
+        Args:
+            database: Database instance to use
+            db_path: Path used to create a Database when none is given
+            run_journal: Optional RunJournal that batches agent_runs writes;
+                without one, run bookkeeping is written directly
+            agent_cache: AgentCache for constructed agents; a default one
+                is created when not given
+            task_queue: Optional TaskQueue that enables submit_task
+            event_hub: EventHub that run and agent changes are published
+                to; a default one is created when not given
+            run_archive: Optional RunArchive holding runs moved out of
+                agent_runs, read by list_runs(include_archived=True)
+            tracing: Whether to record a span for each stage of a run in
+                run_spans
+            span_exporter: Optional SpanFileExporter that traced runs are
+                also written to
+            coalesce_agent_types: Agent types whose concurrent identical
+                tasks share one execution; each duplicate still gets its
+                own run, marked with the run it shared
+            invalidations: Optional InvalidationChannel shared with the
+                other worker processes using the database; agent changes
+                are published to it, and changes made by other workers
+                drop the agent from this process's cache
+            memory: Optional ConversationMemory given to the agents, which
+                multi-turn agent types keep their conversations in
+        """
         self.db = database if database is not None else Database(db_path)
+        self.run_journal = run_journal
+        self.agent_cache = agent_cache if agent_cache is not None else AgentCache()
+        self.task_queue = task_queue
+        self.event_hub = event_hub if event_hub is not None else EventHub()
+        self.run_archive = run_archive
+        self.tracing = tracing
+        self.span_exporter = span_exporter
+        self.coalesce_agent_types = set(coalesce_agent_types or ())
+        self._single_flight = SingleFlight()
+        self.invalidations = invalidations
+        self.memory = memory
+        if invalidations is not None:
+            for event_type in ("agent.updated", "agent.deleted"):
+                invalidations.subscribe(event_type, partial(self._agent_changed_elsewhere, event_type))
+        # Long-polled runs: event set when the run finishes, and its waiter count
+        self._run_waiters: Dict[str, List] = {}
+        self._streams: Dict[str, RunStream] = {}
+        self._stream_jobs: Set[asyncio.Task] = set()
         self.active_agents = {}
         self._agent_classes = {}
         
@@ -28,48 +147,91 @@ class AgentManager:
         """
         if hasattr(agent_class, 'AGENT_TYPE'):
             self._agent_classes[agent_class.AGENT_TYPE] = agent_class
+            # Cached instances may have been built from a different class
+            self.agent_cache.clear()
         else:
             logger.warning(f"Agent class {agent_class.__name__} has no AGENT_TYPE defined")
+
+    def register_agent_type(self, agent_type: str, class_path: str) -> None:
+        """Register an agent class by import path, importing it on first use
+        
+        Args:
+            agent_type: Type identifier of the agent
+            class_path: Location of the class as "module:Class"
+        """
+        self._agent_classes[agent_type] = class_path
+        self.agent_cache.clear()
+
+    def _agent_class(self, agent_type: str) -> Type[Agent]:
+        """Get the class registered for an agent type, importing it if needed"""
+        agent_class = self._agent_classes.get(agent_type, Agent)
+        if isinstance(agent_class, str):
+            module, _, name = agent_class.partition(":")
+            with span("import_agent_class", agent_type=agent_type):
+                agent_class = getattr(importlib.import_module(module), name)
+            self._agent_classes[agent_type] = agent_class
+        return agent_class
         
     def _row_to_agent(self, row: Row) -> Agent:
         """Convert database row to Agent instance"""
         try:
             # Parse config with error handling
             try:
-                config = json.loads(row['config']) if row['config'] else {}
-            except json.JSONDecodeError as e:
+                config = loads(row['config']) if row['config'] else {}
+            except ValueError as e:
                 logger.error(f"Failed to parse config JSON: {e}")
                 config = {}
             
             # Get agent type from row, default to 'default' if not present
             agent_type = row['type'] if 'type' in row.keys() else 'default'
-            logger.info(f"Creating agent with type: {agent_type}")
             
             # Get the appropriate agent class
-            agent_class = self._agent_classes.get(agent_type, Agent)
-            logger.info(f"Using agent class: {agent_class.__name__}")
+            agent_class = self._agent_class(agent_type)
             
             # Create agent instance with safe type conversion
-            with self.db.get_conn() as conn:
-                agent = agent_class(
-                    id=row['agent_id'],
-                    name=row['name'],
-                    type=agent_type,
-                    model_name=config.get('model_name', 'gpt-3.5-turbo'),
-                    tools=config.get('tools', []),
-                    temperature=float(config.get('temperature', 0.7)),
-                    status=row['status'],
-                    created_at=row['created_at'],
-                    db_conn=conn
-                )
+            agent = agent_class(
+                id=row['agent_id'],
+                name=row['name'],
+                type=agent_type,
+                model_name=config.get('model_name', 'gpt-3.5-turbo'),
+                tools=config.get('tools', []),
+                temperature=float(config.get('temperature', 0.7)),
+                status=row['status'],
+                created_at=row['created_at'],
+                database=self.db,
+                provider=config.get('provider'),
+                config_version=row['config_version'] if 'config_version' in row.keys() else None,
+                updated_at=row['updated_at'] if 'updated_at' in row.keys() else None,
+                memory=self.memory
+            )
+            
+            # Config changes made through the agent must drop the cached instance
+            config_manager = getattr(agent, 'config_manager', None)
+            if isinstance(config_manager, ConfigManager):
+                config_manager.on_update = self._config_updated
             
-            logger.info(f"Successfully created agent instance: {agent.to_dict()}")
+            logger.debug(f"Created {agent_class.__name__} instance for agent {agent.id}")
             return agent
             
         except Exception as e:
             logger.error(f"Error converting database row to agent: {str(e)}", exc_info=True)
             raise
         
+    async def _config_updated(self, agent_id: str) -> None:
+        """Drop the cached agent after its config changed through ConfigManager"""
+        self.agent_cache.invalidate(agent_id)
+        if self.invalidations is not None:
+            await self.invalidations.publish("agent.updated", agent_id)
+        self.event_hub.publish("agent.updated", agent_id=agent_id)
+
+    def _agent_changed_elsewhere(self, event_type: str, agent_id: Optional[str]) -> None:
+        """Drop an agent another worker process changed, and tell local subscribers"""
+        if agent_id is None:
+            self.agent_cache.clear()
+            return
+        self.agent_cache.invalidate(agent_id)
+        self.event_hub.publish(event_type, agent_id=agent_id)
+
     async def get_agent(self, agent_id: str) -> Agent:
         """Get agent by ID
         
@@ -82,18 +244,57 @@ class AgentManager:
         Raises:
             ValueError: If agent not found
         """
-        with self.db.get_conn() as conn:
-            cursor = conn.execute(
-                "SELECT * FROM agents WHERE agent_id = ?",
+        agent = self.agent_cache.get(agent_id)
+        if agent is not None:
+            return agent
+            
+        with span("select_agent"):
+            async with self.db.read() as conn:
+                cursor = await conn.execute(
+                    "SELECT * FROM agents WHERE agent_id = ?",
+                    (agent_id,)
+                )
+                row = await cursor.fetchone()
+            
+        if not row:
+            raise ValueError(f"Agent {agent_id} not found")
+            
+        with span("row_to_agent", agent_type=row['type']):
+            agent = self._row_to_agent(row)
+            await agent.prepare()
+            config_manager = getattr(agent, 'config_manager', None)
+            if isinstance(config_manager, ConfigManager) and config_manager.updated_at is not None:
+                # Preparing wrote the config, e.g. its defaults, bumping the version
+                agent.config_version = config_manager.version
+                agent.updated_at = config_manager.updated_at
+        self.agent_cache.put(agent_id, agent)
+        return agent
+
+    async def get_agent_version(self, agent_id: str) -> int:
+        """Get an agent's config_version without building the agent
+
+        Args:
+            agent_id: The ID of the agent
+
+        Returns:
+            The version of the cached instance, or else the stored one
+
+        Raises:
+            ValueError: If agent not found
+        """
+        agent = self.agent_cache.get(agent_id)
+        if agent is not None and agent.config_version is not None:
+            return agent.config_version
+        async with self.db.read() as conn:
+            cursor = await conn.execute(
+                "SELECT config_version FROM agents WHERE agent_id = ?",
                 (agent_id,)
             )
-            row = cursor.fetchone()
-            
-            if not row:
-                raise ValueError(f"Agent {agent_id} not found")
-                
-            return self._row_to_agent(row)
-        
+            row = await cursor.fetchone()
+        if not row:
+            raise ValueError(f"Agent {agent_id} not found")
+        return row["config_version"]
+
     async def create_agent(
         self, 
         name: str, 
@@ -113,86 +314,839 @@ class AgentManager:
         agent_id = str(uuid.uuid4())
         
         try:
-            with self.db.get_conn() as conn:
+            async with self.db.write() as conn:
                 # Create the agent record
-                conn.execute("""
+                await conn.execute("""
                     INSERT INTO agents (agent_id, name, config, status, type)
                     VALUES (?, ?, ?, ?, ?)
-                """, (agent_id, name, json.dumps(config), "inactive", agent_type))
+                """, (agent_id, name, dumps(config), "inactive", agent_type))
                 
                 # Initialize agent state
-                conn.execute("""
+                await conn.execute("""
                     INSERT INTO agent_states (agent_id, memory)
                     VALUES (?, ?)
-                """, (agent_id, json.dumps({})))
+                """, (agent_id, dumps({})))
                 
             logger.info(f"Created {agent_type} agent: {agent_id} ({name})")
+            self.event_hub.publish(
+                "agent.created", agent_id=agent_id, name=name,
+                agent_type=agent_type, status="inactive", config=config
+            )
             return agent_id
             
         except Exception as e:
             logger.error(f"Failed to create agent: {e}")
             raise
             
+    async def _record_run_start(
+        self,
+        run_id: str,
+        agent_id: str,
+        task: Dict[str, Any],
+        status: str = 'running'
+    ) -> None:
+        """Record a new run with status 'running' or 'queued'"""
+        started_at = datetime.utcnow().isoformat(" ")
+        if self.run_journal is not None:
+            self.run_journal.record_start(run_id, agent_id, dumps(task), started_at, status)
+        else:
+            async with self.db.write() as conn:
+                await conn.execute("""
+                    INSERT INTO agent_runs 
+                    (run_id, agent_id, task, status, started_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (run_id, agent_id, dumps(task), status, started_at))
+        self.event_hub.publish(
+            "run.created", agent_id=agent_id, run_id=run_id,
+            task=task, status=status, started_at=started_at
+        )
+
+    async def _record_run_status(self, run_id: str, agent_id: str, status: str) -> None:
+        """Record an intermediate status transition of a run"""
+        if self.run_journal is not None:
+            self.run_journal.record_status(run_id, agent_id, status)
+        else:
+            async with self.db.write() as conn:
+                await conn.execute(
+                    "UPDATE agent_runs SET status = ? WHERE run_id = ?",
+                    (status, run_id)
+                )
+        self.event_hub.publish("run.status", agent_id=agent_id, run_id=run_id, status=status)
+
+    async def _record_run_output(self, run_id: str, agent_id: str, output: str) -> None:
+        """Record the text a streaming run has produced so far"""
+        if self.run_journal is not None:
+            self.run_journal.record_output(run_id, agent_id, output)
+            return
+        async with self.db.write() as conn:
+            await conn.execute(
+                "UPDATE agent_runs SET output = ? WHERE run_id = ?",
+                (output, run_id)
+            )
+
+    async def _record_run_finish(
+        self,
+        run_id: str,
+        agent_id: str,
+        status: str,
+        result: Any,
+        cache_hit: bool = False,
+        attempts: Optional[List[Dict[str, Any]]] = None,
+        coalesced_from: Optional[str] = None
+    ) -> None:
+        """Record the final status and result of a run, and the LLM requests it sent"""
+        completed_at = datetime.utcnow().isoformat(" ")
+        encoded_attempts = dumps(attempts) if attempts else None
+        if self.run_journal is not None:
+            self.run_journal.record_finish(
+                run_id, agent_id, status, dumps(result), completed_at, cache_hit,
+                encoded_attempts, coalesced_from
+            )
+        else:
+            async with self.db.write() as conn:
+                await conn.execute("""
+                    UPDATE agent_runs 
+                    SET status = ?, result = ?, completed_at = ?, cache_hit = ?,
+                        attempts = COALESCE(?, attempts),
+                        coalesced_from = COALESCE(?, coalesced_from)
+                    WHERE run_id = ?
+                """, (
+                    status, dumps(result), completed_at, int(cache_hit),
+                    encoded_attempts, coalesced_from, run_id
+                ))
+        self.event_hub.publish(
+            "run.status", agent_id=agent_id, run_id=run_id, status=status,
+            result=result, completed_at=completed_at, cache_hit=cache_hit
+        )
+        # Wake anyone long-polling this run
+        waiter = self._run_waiters.pop(run_id, None)
+        if waiter is not None:
+            waiter[0].set()
+
+    async def _record_run_spans(self, run_id: str, agent_id: str, trace: RunTrace) -> None:
+        """Save a finished run's spans and pass them to the exporter"""
+        rows = [(
+            s.span_id, s.parent_id, s.name, s.start, s.duration,
+            dumps(s.attributes) if s.attributes else None
+        ) for s in trace.spans]
+        try:
+            if self.run_journal is not None:
+                self.run_journal.record_spans(run_id, rows)
+            else:
+                async with self.db.write() as conn:
+                    await conn.executemany("""
+                        INSERT OR REPLACE INTO run_spans
+                        (run_id, span_id, parent_id, name, start_offset, duration, attributes)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """, [(run_id, *row) for row in rows])
+            if self.span_exporter is not None:
+                await self.span_exporter.export(run_id, agent_id, trace)
+        except Exception as e:
+            # Losing a trace must never fail the run it describes
+            logger.warning(f"Failed to record spans for run {run_id}: {e}")
+
+    @asynccontextmanager
+    async def _traced(self, run_id: str, agent_id: str):
+        """Collect spans for a run and save them when the block exits
+        
+        Inside an already traced run this adds nothing, so run_task can
+        trace the stages before _execute_run. Spans are only saved once
+        _execute_run has started, i.e. the run has been recorded.
+        """
+        if not self.tracing or current_trace.get() is not None:
+            yield
+            return
+        trace = RunTrace()
+        token = current_trace.set(trace)
+        try:
+            yield
+        finally:
+            current_trace.reset(token)
+            if trace.recorded:
+                await self._record_run_spans(run_id, agent_id, trace)
+
+    async def _execute_run(
+        self,
+        agent: Agent,
+        run_id: str,
+        agent_id: str,
+        task: Dict[str, Any],
+        stream: Optional[RunStream] = None
+    ) -> Dict[str, Any]:
+        """Execute a recorded run and record its outcome
+        
+        With a stream, the agent's output is appended to it as it is
+        produced and saved to the run every STREAM_SAVE_INTERVAL seconds.
+        """
+        async with self._traced(run_id, agent_id):
+            trace = current_trace.get()
+            if trace is not None:
+                trace.recorded = True
+            return await self._execute_traced(agent, run_id, agent_id, task, stream)
+
+    async def _execute_traced(
+        self,
+        agent: Agent,
+        run_id: str,
+        agent_id: str,
+        task: Dict[str, Any],
+        stream: Optional[RunStream]
+    ) -> Dict[str, Any]:
+        """Body of _execute_run, run inside its trace"""
+        context = RunContext(run_id=run_id, agent_id=agent_id)
+        token = current_run.set(context)
+        in_flight = RUNS_IN_FLIGHT.labels(agent.type)
+        in_flight.inc()
+        started = time.perf_counter()
+        status = 'failed'
+        try:
+            if stream is None:
+                with span("execute_task", agent_type=agent.type) as execution:
+                    result = await self._execute_task(agent, run_id, task, context)
+                    if execution is not None and context.coalesced_from is not None:
+                        execution.attributes["coalesced_from"] = context.coalesced_from
+            else:
+                last_saved = time.monotonic()
+                
+                async def emit(delta: str) -> None:
+                    nonlocal last_saved
+                    stream.append(delta)
+                    if time.monotonic() - last_saved >= self.STREAM_SAVE_INTERVAL:
+                        last_saved = time.monotonic()
+                        await self._record_run_output(run_id, agent_id, stream.text())
+                
+                with span("stream_task", agent_type=agent.type):
+                    result = await agent.stream_task(task, emit)
+                if stream.length:
+                    await self._record_run_output(run_id, agent_id, stream.text())
+            status = 'completed'
+        except asyncio.CancelledError:
+            await self._record_run_finish(
+                run_id, agent_id, 'failed', "Run was cancelled",
+                attempts=context.attempts, coalesced_from=context.coalesced_from
+            )
+            if stream is not None:
+                stream.finish('failed', "Run was cancelled")
+            raise
+        except Exception as e:
+            await self._record_run_finish(
+                run_id, agent_id, 'failed', str(e),
+                attempts=context.attempts, coalesced_from=context.coalesced_from
+            )
+            if stream is not None:
+                stream.finish('failed', str(e))
+            raise
+        finally:
+            current_run.reset(token)
+            in_flight.dec()
+            RUN_SECONDS.labels(agent.type, status).observe(time.perf_counter() - started)
+            RUNS_TOTAL.labels(agent.type, status).inc()
+        
+        # Update run record
+        with span("record_finish", write_behind=self.run_journal is not None):
+            await self._record_run_finish(
+                run_id, agent_id, 'completed', result, context.cache_hit,
+                context.attempts, context.coalesced_from
+            )
+        if stream is not None:
+            stream.finish('completed', result)
+        return result
+
+    async def _execute_task(
+        self,
+        agent: Agent,
+        run_id: str,
+        task: Dict[str, Any],
+        context: RunContext
+    ) -> Dict[str, Any]:
+        """Execute a task, joining an identical one in flight if the agent type allows
+        
+        Tasks coalesce when they are for the same agent, built from the same
+        stored config, and equal once normalized.
+        """
+        if agent.type not in self.coalesce_agent_types:
+            return await agent.execute_task(task)
+        key = task_key(agent.id, agent.config_version, task)
+        # Set before joining, so a joiner that fails or is cancelled records it too
+        context.coalesced_from = self._single_flight.owner(key)
+        result, leader = await self._single_flight.do(key, run_id, lambda: agent.execute_task(task))
+        if leader == run_id:
+            return result
+        RUNS_COALESCED.labels(agent.type).inc()
+        logger.debug(f"Run {run_id} coalesced with in-flight run {leader}")
+        # Each run gets its own copy, as callers may modify their result
+        return dict(result) if isinstance(result, dict) else result
+
     async def run_task(self, agent_id: str, task: Dict[str, Any]) -> Dict[str, Any]:
         """Execute a task with specified agent"""
         try:
-            # Get agent instance
-            agent = await self.get_agent(agent_id)
-            if not agent:
-                raise ValueError(f"Agent {agent_id} not found")
-            
             run_id = str(uuid.uuid4())
-            started_at = datetime.utcnow()
+            async with self._traced(run_id, agent_id):
+                # Get agent instance
+                with span("get_agent"):
+                    agent = await self.get_agent(agent_id)
+                if not agent:
+                    raise ValueError(f"Agent {agent_id} not found")
+                
+                # Record task start
+                with span("record_start", write_behind=self.run_journal is not None):
+                    await self._record_run_start(run_id, agent_id, task)
+                
+                # Execute task
+                return await self._execute_run(agent, run_id, agent_id, task)
+        except Exception as e:
+            logger.error(f"Failed to run task: {e}")
+            raise
+
+    async def start_stream(self, agent_id: str, task: Dict[str, Any]) -> str:
+        """Start a task whose output can be followed as it is generated
+        
+        The run executes in the background, independent of any subscriber,
+        so clients can disconnect and resume with follow_run.
+        
+        Args:
+            agent_id: ID of the agent to run the task
+            task: Dictionary containing task details
             
-            # Record task start
-            with self.db.get_conn() as conn:
-                conn.execute("""
+        Returns:
+            The ID of the started run
+            
+        Raises:
+            ValueError: If agent not found
+        """
+        agent = await self.get_agent(agent_id)
+        run_id = str(uuid.uuid4())
+        await self._record_run_start(run_id, agent_id, task)
+        
+        stream = RunStream(run_id, agent_id)
+        self._streams[run_id] = stream
+        job = asyncio.get_running_loop().create_task(
+            self._run_streamed(agent, stream, task)
+        )
+        self._stream_jobs.add(job)
+        job.add_done_callback(self._stream_jobs.discard)
+        return run_id
+
+    async def _run_streamed(self, agent: Agent, stream: RunStream, task: Dict[str, Any]) -> None:
+        """Execute a streaming run in the background"""
+        try:
+            await self._execute_run(agent, stream.run_id, stream.agent_id, task, stream)
+        except Exception as e:
+            logger.error(f"Streaming run {stream.run_id} failed: {e}")
+        finally:
+            self._streams.pop(stream.run_id, None)
+
+    async def follow_run(self, run_id: str, offset: int = 0) -> AsyncIterator[Dict[str, Any]]:
+        """Yield a run's output from a character offset until it finishes
+        
+        Runs streaming in this process are followed live. Otherwise the
+        output saved on the run is replayed and re-read every
+        STREAM_POLL_INTERVAL seconds until the run finishes.
+        
+        Yields:
+            'delta' events with the new text and the offset just past it,
+            then one 'done' event with the run's status and result
+            
+        Raises:
+            ValueError: If run not found
+        """
+        while True:
+            stream = self._streams.get(run_id)
+            if stream is not None:
+                async for event in stream.follow(offset):
+                    yield event
+                return
+            
+            run = await self.get_run(run_id)
+            output = run.get("output") or ""
+            if len(output) > offset:
+                yield {"event": "delta", "offset": len(output), "text": output[offset:]}
+                offset = len(output)
+            if run["status"] not in ('queued', 'running'):
+                yield {
+                    "event": "done",
+                    "run_id": run_id,
+                    "status": run["status"],
+                    "result": run["result"]
+                }
+                return
+            if run_id not in self._streams:
+                await self.wait_for_run(run_id, self.STREAM_POLL_INTERVAL)
+
+    async def run_batch(
+        self,
+        items: List[Tuple[str, Dict[str, Any]]],
+        concurrency: int = 8
+    ) -> List[Dict[str, Any]]:
+        """Execute many tasks, at most `concurrency` at a time
+        
+        All runs are inserted as 'queued' in a single transaction before any
+        of them starts. A failing item never fails the batch; its error is
+        reported in its own entry instead.
+        
+        Args:
+            items: (agent_id, task) pairs
+            concurrency: Maximum number of tasks executing at once
+            
+        Returns:
+            One entry per item, in input order, with its run_id, status and
+            either result or error
+        """
+        # Resolve each distinct agent once
+        agents: Dict[str, Any] = {}
+        for agent_id in dict.fromkeys(agent_id for agent_id, _ in items):
+            try:
+                agents[agent_id] = await self.get_agent(agent_id)
+            except Exception as e:
+                agents[agent_id] = e
+        
+        results: List[Dict[str, Any]] = []
+        runs = []
+        started_at = datetime.utcnow().isoformat(" ")
+        for index, (agent_id, task) in enumerate(items):
+            entry = {"index": index, "agent_id": agent_id, "run_id": None}
+            if isinstance(agents[agent_id], Exception):
+                entry.update(status="failed", error=str(agents[agent_id]))
+            else:
+                entry.update(run_id=str(uuid.uuid4()), status="queued")
+                runs.append((entry, task))
+            results.append(entry)
+        
+        if runs:
+            async with self.db.write() as conn:
+                await conn.executemany("""
                     INSERT INTO agent_runs 
                     (run_id, agent_id, task, status, started_at)
                     VALUES (?, ?, ?, ?, ?)
-                """, (run_id, agent_id, json.dumps(task), 'running', started_at))
-            
-            # Execute task
-            result = await agent.execute_task(task)
+                """, [
+                    (entry["run_id"], entry["agent_id"], dumps(task), "queued", started_at)
+                    for entry, task in runs
+                ])
+            for entry, task in runs:
+                self.event_hub.publish(
+                    "run.created", agent_id=entry["agent_id"], run_id=entry["run_id"],
+                    task=task, status="queued", started_at=started_at
+                )
+        
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def execute(entry: Dict[str, Any], task: Dict[str, Any]) -> None:
+            async with semaphore:
+                await self._record_run_status(entry["run_id"], entry["agent_id"], "running")
+                try:
+                    result = await self._execute_run(
+                        agents[entry["agent_id"]], entry["run_id"], entry["agent_id"], task
+                    )
+                    entry.update(status="completed", result=result)
+                except Exception as e:
+                    entry.update(status="failed", error=str(e))
+        
+        await asyncio.gather(*(execute(entry, task) for entry, task in runs))
+        logger.info(
+            f"Ran batch of {len(items)} tasks: "
+            f"{sum(entry['status'] == 'completed' for entry in results)} completed"
+        )
+        return results
+
+    async def submit_task(self, agent_id: str, task: Dict[str, Any]) -> str:
+        """Queue a task for background execution by the task queue
+        
+        Args:
+            agent_id: ID of the agent to run the task
+            task: Dictionary containing task details
             
-            # Update run record
-            with self.db.get_conn() as conn:
-                conn.execute("""
-                    UPDATE agent_runs 
-                    SET status = ?, result = ?, completed_at = ?
-                    WHERE run_id = ?
-                """, ('completed', json.dumps(result), datetime.utcnow(), run_id))
+        Returns:
+            The ID of the queued run
             
-            return result
+        Raises:
+            ValueError: If agent not found
+            TaskQueueFullError: If the task queue has no room
+            RuntimeError: If no task queue is configured
+        """
+        if self.task_queue is None:
+            raise RuntimeError("Background task execution is not enabled")
+        
+        # Fail fast on unknown agents rather than queueing a doomed run
+        await self.get_agent(agent_id)
+        
+        run_id = str(uuid.uuid4())
+        await self._record_run_start(run_id, agent_id, task, status='queued')
+        try:
+            self.task_queue.submit(
+                (run_id, agent_id),
+                lambda: self._run_queued(run_id, agent_id, task)
+            )
         except Exception as e:
-            logger.error(f"Failed to run task: {e}")
+            await self._record_run_finish(run_id, agent_id, 'failed', str(e))
             raise
+        
+        logger.debug(f"Queued run {run_id} for agent {agent_id}")
+        return run_id
+
+    async def _run_queued(self, run_id: str, agent_id: str, task: Dict[str, Any]) -> None:
+        """Execute a run taken off the task queue"""
+        try:
+            agent = await self.get_agent(agent_id)
+        except Exception as e:
+            await self._record_run_finish(run_id, agent_id, 'failed', str(e))
+            raise
+        await self._record_run_status(run_id, agent_id, 'running')
+        await self._execute_run(agent, run_id, agent_id, task)
+
+    async def get_run(self, run_id: str, raw: bool = False) -> Dict[str, Any]:
+        """Get a single run, including changes still queued in the run journal
+        
+        Args:
+            run_id: ID of the run
+            raw: Leave task and result as pre-encoded JSON for ORJSONResponse
+                instead of decoding them
+        
+        Raises:
+            ValueError: If run not found
+        """
+        # Snapshot queued changes first so a batch committing mid-query isn't missed
+        pending = self.run_journal.pending_run(run_id) if self.run_journal else None
+        async with self.db.read() as conn:
+            cursor = await conn.execute("""
+                SELECT run_id, agent_id, task, status, result, started_at, completed_at, cache_hit, output,
+                       attempts, coalesced_from
+                FROM agent_runs
+                WHERE run_id = ?
+            """, (run_id,))
+            row = await cursor.fetchone()
+        
+        run = dict(row) if row else {}
+        if pending:
+            run.update(pending)
+        if "started_at" not in run:
+            raise ValueError(f"Run {run_id} not found")
+        
+        decode = raw_column if raw else decode_column
+        for field in ("task", "result"):
+            run[field] = decode(run.get(field))
+        run["attempts"] = decode(run["attempts"]) if run.get("attempts") else []
+        run["cache_hit"] = bool(run.get("cache_hit"))
+        return run
+
+    async def wait_for_run(self, run_id: str, timeout: float, raw: bool = False) -> Dict[str, Any]:
+        """Get a run, waiting up to timeout seconds for it to finish
+        
+        Only runs executing in this process can be waited on; others are
+        returned as they are. raw is passed on to get_run.
+        
+        Raises:
+            ValueError: If run not found
+        """
+        run = await self.get_run(run_id, raw)
+        if run["status"] not in ('queued', 'running') or timeout <= 0:
+            return run
+        waiter = self._run_waiters.setdefault(run_id, [asyncio.Event(), 0])
+        waiter[1] += 1
+        try:
+            # Read again now we're registered, so a finish in between still counts
+            run = await self.get_run(run_id, raw)
+            if run["status"] in ('queued', 'running'):
+                try:
+                    await asyncio.wait_for(waiter[0].wait(), timeout)
+                except asyncio.TimeoutError:
+                    return run
+                run = await self.get_run(run_id, raw)
+            return run
+        finally:
+            waiter[1] -= 1
+            if waiter[1] == 0 and self._run_waiters.get(run_id) is waiter:
+                del self._run_waiters[run_id]
+
+    async def get_run_trace(self, run_id: str, agent_id: Optional[str] = None) -> Dict[str, Any]:
+        """Get a run's spans as a waterfall, in the order they started
+        
+        Offsets and durations are in milliseconds from the start of the run;
+        depth is the nesting level of each span. With agent_id, runs moved
+        to the run archive are found there too.
+        
+        Raises:
+            ValueError: If run not found
+            TraceNotArchivedError: If the run was archived without its spans
+        """
+        try:
+            run = await self.get_run(run_id)
+        except ValueError:
+            if agent_id is None or self.run_archive is None:
+                raise
+            run = await self.run_archive.read_run(agent_id, run_id)
+            if run is None:
+                raise
+            if "spans" not in run:
+                raise TraceNotArchivedError(f"Run {run_id} was archived without its trace")
+            return self._waterfall({**run, "agent_id": agent_id}, [tuple(row) for row in run["spans"]], True)
+
+        pending = self.run_journal.pending_spans(run_id) if self.run_journal is not None else []
+        async with self.db.read() as conn:
+            cursor = await conn.execute("""
+                SELECT span_id, parent_id, name, start_offset, duration, attributes
+                FROM run_spans
+                WHERE run_id = ?
+            """, (run_id,))
+            rows = {row["span_id"]: tuple(row) for row in await cursor.fetchall()}
+        rows.update((row[0], row) for row in pending)
+        return self._waterfall(run, list(rows.values()), False)
+
+    @staticmethod
+    def _waterfall(run: Dict[str, Any], rows: List[Tuple], archived: bool) -> Dict[str, Any]:
+        """Build a trace from a run and its run_spans rows"""
+        depths: Dict[int, int] = {}
+        spans = []
+        for span_id, parent_id, name, start, duration, attributes in sorted(rows):
+            depths[span_id] = depths.get(parent_id, -1) + 1 if parent_id is not None else 0
+            spans.append({
+                "span_id": span_id,
+                "parent_id": parent_id,
+                "name": name,
+                "depth": depths[span_id],
+                "start_ms": round(start * 1000, 3),
+                "duration_ms": round(duration * 1000, 3) if duration is not None else None,
+                "attributes": decode_column(attributes)
+            })
+        ends = [s["start_ms"] + (s["duration_ms"] or 0) for s in spans]
+        return {
+            "run_id": run["run_id"],
+            "agent_id": run["agent_id"],
+            "status": run["status"],
+            "started_at": run["started_at"],
+            "archived": archived,
+            "duration_ms": round(max(ends), 3) if ends else None,
+            "spans": spans
+        }
+
+    async def close(self, timeout: float = 30.0) -> None:
+        """Let in-flight runs finish, failing queued runs that never started
+        
+        Streaming runs still going after timeout seconds are cancelled.
+        """
+        if self._stream_jobs:
+            _, unfinished = await asyncio.wait(set(self._stream_jobs), timeout=timeout)
+            for job in unfinished:
+                job.cancel()
+            await asyncio.gather(*unfinished, return_exceptions=True)
+        if self.task_queue is None:
+            return
+        for run_id, agent_id in await self.task_queue.close(timeout):
+            await self._record_run_finish(run_id, agent_id, 'failed', "Server shut down before the run started")
 
     async def get_all_agents(self) -> List[Dict[str, Any]]:
         """Get all agents from the database"""
+        agents, _ = await self.list_agents()
+        return agents
+
+    async def list_agents(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        fields: Optional[str] = None,
+        status: Optional[str] = None,
+        agent_type: Optional[str] = None,
+        raw: bool = False
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Get a page of agents in creation order
+        
+        Args:
+            limit: Maximum number of agents to return, or None for all
+            after: Cursor returned with the previous page
+            fields: Comma-separated fields to include; config is only
+                decoded when requested
+            status: Only return agents with this status
+            agent_type: Only return agents of this type
+            raw: Leave config as pre-encoded JSON for ORJSONResponse
+                instead of decoding it
+            
+        Returns:
+            The agents and the cursor for the next page, if there is one
+            
+        Raises:
+            ValueError: If the cursor or fields are invalid
+        """
+        selected = parse_fields(fields, AGENT_FIELDS)
+        columns = ", ".join(AGENT_FIELDS[field] for field in selected)
+        where, params = [], []
+        if status is not None:
+            where.append("status = ?")
+            params.append(status)
+        if agent_type is not None:
+            where.append("type = ?")
+            params.append(agent_type)
+        if after is not None:
+            where.append("rowid > ?")
+            params.append(decode_cursor(after, 1)[0])
+        query = f"SELECT rowid, {columns} FROM agents"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY rowid"
+        if limit is not None:
+            # Fetch one extra row to learn whether there is a next page
+            query += " LIMIT ?"
+            params.append(limit + 1)
+            
         try:
-            with self.db.get_conn() as conn:
-                rows = conn.execute("SELECT * FROM agents").fetchall()
-                agents = []
-                for row in rows:
-                    try:
-                        config = json.loads(row["config"]) if row["config"] else {}
-                        agents.append({
-                            "id": row["agent_id"],
-                            "name": row["name"],
-                            "type": row["type"] if "type" in row.keys() else "default",
-                            "status": row["status"],
-                            "config": config,
-                            "created_at": row["created_at"]
-                        })
-                    except Exception as e:
-                        logger.error(f"Error processing agent row {row['agent_id']}: {e}")
-                        continue
-                return agents
+            async with self.db.read() as conn:
+                cursor = await conn.execute(query, params)
+                rows = await cursor.fetchall()
+            
+            next_cursor = None
+            if limit is not None and len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_cursor(rows[-1]["rowid"])
+                
+            agents = []
+            for row in rows:
+                try:
+                    agent = {}
+                    for field in selected:
+                        value = row[AGENT_FIELDS[field]]
+                        if field == "config":
+                            value = raw_column(value) if raw else loads(value) if value else {}
+                        agent[field] = value
+                    agents.append(agent)
+                except Exception as e:
+                    logger.error(f"Error processing agent row {row['rowid']}: {e}")
+                    continue
+            return agents, next_cursor
         except Exception as e:
             logger.error(f"Failed to get all agents: {e}")
             raise
 
+    async def list_runs(
+        self,
+        agent_id: str,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        fields: Optional[str] = None,
+        status: Optional[str] = None,
+        started_after: Optional[str] = None,
+        started_before: Optional[str] = None,
+        raw: bool = False,
+        include_archived: bool = False
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Get a page of an agent's runs, newest first
+        
+        Runs still queued in the run journal are included, and with
+        include_archived so are runs moved to the run archive.
+        
+        Args:
+            agent_id: ID of the agent
+            limit: Maximum number of runs to return, or None for all
+            after: Cursor returned with the previous page
+            fields: Comma-separated fields to include; task and result are
+                only decoded when requested
+            status: Only return runs with this status
+            started_after: Only return runs started at or after this ISO time
+            started_before: Only return runs started before this ISO time
+            raw: Leave task and result as pre-encoded JSON for ORJSONResponse
+                instead of decoding them
+            include_archived: Also read runs from the run archive
+            
+        Returns:
+            The runs and the cursor for the next page, if there is one
+            
+        Raises:
+            ValueError: If the cursor, fields or timestamps are invalid
+        """
+        selected = parse_fields(fields, RUN_FIELDS)
+        # Keyset and status columns are always read so queued runs can be
+        # filtered and the next cursor built
+        columns = ["run_id", "started_at", "status"] + [
+            field for field in selected if field not in ("run_id", "started_at", "status")
+        ]
+        where, params = ["agent_id = ?"], [agent_id]
+        if status is not None:
+            where.append("status = ?")
+            params.append(status)
+        if started_after is not None:
+            started_after = normalize_timestamp(started_after)
+            where.append("started_at >= ?")
+            params.append(started_after)
+        if started_before is not None:
+            started_before = normalize_timestamp(started_before)
+            where.append("started_at < ?")
+            params.append(started_before)
+        if after is not None:
+            after_started, after_run = decode_cursor(after, 2)
+            where.append("(started_at, run_id) < (?, ?)")
+            params.extend([after_started, after_run])
+        query = f"""
+            SELECT {", ".join(columns)}
+            FROM agent_runs
+            WHERE {" AND ".join(where)}
+            ORDER BY started_at DESC, run_id DESC
+        """
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit + 1)
+
+        def matches(run: Dict[str, Any]) -> bool:
+            if status is not None and run["status"] != status:
+                return False
+            if started_after is not None and run["started_at"] < started_after:
+                return False
+            if started_before is not None and run["started_at"] >= started_before:
+                return False
+            if after is not None and (run["started_at"], run["run_id"]) >= (after_started, after_run):
+                return False
+            return True
+
+        # Snapshot queued runs first so a batch committing mid-query isn't missed
+        pending = self.run_journal.pending_runs(agent_id) if self.run_journal else []
+        async with self.db.read() as conn:
+            cursor = await conn.execute(query, params)
+            rows = await cursor.fetchall()
+        if pending:
+            rows = [
+                run for run in self.run_journal.merge_runs(rows, pending)
+                if matches(run)
+            ]
+            rows.sort(key=lambda run: (run["started_at"], run["run_id"]), reverse=True)
+        if include_archived and self.run_archive is not None:
+            # Read after agent_runs so a run archived in between is seen in
+            # one tier or both, never neither
+            upper = started_before
+            if after is not None and (upper is None or after_started < upper):
+                upper = after_started
+            archived = await self.run_archive.read_runs(
+                agent_id,
+                limit=limit + 1 if limit is not None else None,
+                predicate=matches,
+                started_after=started_after,
+                started_before=upper
+            )
+            if archived:
+                merged = {run["run_id"]: run for run in archived}
+                merged.update((row["run_id"], row) for row in rows)
+                rows = sorted(
+                    merged.values(),
+                    key=lambda run: (run["started_at"], run["run_id"]),
+                    reverse=True
+                )
+
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["started_at"], rows[-1]["run_id"])
+
+        decode = raw_column if raw else decode_column
+        runs = []
+        for row in rows:
+            run = {}
+            for field in selected:
+                value = row[field]
+                if field in ("task", "result"):
+                    value = decode(value)
+                elif field == "attempts":
+                    value = decode(value) if value else []
+                elif field == "cache_hit":
+                    value = bool(value)
+                run[field] = value
+            runs.append(run)
+        return runs, next_cursor
+
     async def update_agent(self, agent_id: str, agent_data: Dict[str, Any]) -> None:
         """Update an existing agent
         
@@ -204,30 +1158,37 @@ class AgentManager:
             ValueError: If agent not found
         """
         try:
-            with self.db.get_conn() as conn:
+            async with self.db.write() as conn:
                 # Check if agent exists
-                existing = conn.execute(
+                cursor = await conn.execute(
                     "SELECT agent_id FROM agents WHERE agent_id = ?",
                     (agent_id,)
-                ).fetchone()
+                )
+                existing = await cursor.fetchone()
                 
                 if not existing:
                     raise ValueError(f"Agent {agent_id} not found")
                 
                 # Update the agent
-                conn.execute("""
+                await conn.execute("""
                     UPDATE agents 
                     SET name = ?, config = ?, type = ?
                     WHERE agent_id = ?
                 """, (
                     agent_data["name"],
-                    json.dumps(agent_data["config"]),
+                    dumps(agent_data["config"]),
                     agent_data["type"],
                     agent_id
                 ))
-                conn.commit()
+                if self.invalidations is not None:
+                    await self.invalidations.publish("agent.updated", agent_id, conn)
                 
-                logger.info(f"Updated agent {agent_id}")
+            self.agent_cache.invalidate(agent_id)
+            self.event_hub.publish(
+                "agent.updated", agent_id=agent_id, name=agent_data["name"],
+                agent_type=agent_data["type"], config=agent_data["config"]
+            )
+            logger.info(f"Updated agent {agent_id}")
                 
         except Exception as e:
             logger.error(f"Failed to update agent {agent_id}: {e}")
@@ -243,24 +1204,29 @@ class AgentManager:
             ValueError: If agent not found
         """
         try:
-            with self.db.get_conn() as conn:
+            async with self.db.write() as conn:
                 # Check if agent exists
-                existing = conn.execute(
+                cursor = await conn.execute(
                     "SELECT agent_id FROM agents WHERE agent_id = ?",
                     (agent_id,)
-                ).fetchone()
+                )
+                existing = await cursor.fetchone()
                 
                 if not existing:
                     raise ValueError(f"Agent {agent_id} not found")
                 
-                # First delete from agent_states (due to foreign key constraint)
-                conn.execute("DELETE FROM agent_states WHERE agent_id = ?", (agent_id,))
-                
-                # Then delete the agent
-                conn.execute("DELETE FROM agents WHERE agent_id = ?", (agent_id,))
-                conn.commit()
+                # States, runs and conversations go with it via ON DELETE CASCADE
+                await conn.execute("DELETE FROM agents WHERE agent_id = ?", (agent_id,))
+                if self.invalidations is not None:
+                    await self.invalidations.publish("agent.deleted", agent_id, conn)
                 
-                logger.info(f"Deleted agent {agent_id}")
+            if self.run_journal is not None:
+                # Its queued runs have no row to land in; ones already being
+                # flushed are skipped by the journal itself
+                self.run_journal.discard_agent(agent_id)
+            self.agent_cache.invalidate(agent_id)
+            self.event_hub.publish("agent.deleted", agent_id=agent_id)
+            logger.info(f"Deleted agent {agent_id}")
                 
         except Exception as e:
             logger.error(f"Failed to delete agent {agent_id}: {e}")
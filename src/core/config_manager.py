@@ -1,48 +1,84 @@
-import json
 import logging
-from typing import Dict, Any
-from sqlite3 import Connection
+from typing import Dict, Any, Awaitable, Callable, Optional
+
+from .serialization import dumps, loads
+from .tracing import span
 
 class ConfigManager:
-    """Manages agent configurations stored in the database"""
+    """Manages agent configurations stored in the database
+
+    The config is read once by ``load``, e.g. from the agent's prepare(),
+    and served from memory by ``get_config`` until it is next written.
+    """
 
-    def __init__(self, agent_id: str, db_conn: Connection, agent_type: str):
+    def __init__(
+        self,
+        agent_id: str,
+        agent_type: str,
+        database,
+        on_update: Optional[Callable[[str], Awaitable[None]]] = None
+    ):
         self.agent_id = agent_id
-        self.db_conn = db_conn
         self.agent_type = agent_type
+        # Database that config reads and writes go through
+        self.database = database
+        # Coroutine function called with the agent ID after the config is written
+        self.on_update = on_update
+        # The agent's config_version when the config was last read or written
+        self.version: Optional[int] = None
+        # The agent's updated_at after the last config write
+        self.updated_at = None
         self._config = None
 
     def get_config(self) -> Dict[str, Any]:
-        """Get the configuration for this agent"""
+        """Get the configuration for this agent
+
+        Raises:
+            RuntimeError: If the config hasn't been loaded yet
+        """
         if self._config is None:
-            self._config = self._load_config()
+            raise RuntimeError(f"Config of agent {self.agent_id} is not loaded; await load() first")
         return self._config
 
-    def _load_config(self) -> Dict[str, Any]:
-        """Load configuration from database, falling back to defaults if not found"""
-        try:
-            cursor = self.db_conn.cursor()
-            cursor.execute("SELECT config FROM agents WHERE agent_id = ?", (self.agent_id,))
-            result = cursor.fetchone()
-            
-            if result and result['config']:
-                return json.loads(result['config'])
-            return {}
-            
-        except Exception as e:
-            logging.warning(f"Failed to load config from database: {e}. Using empty config.")
-            return {}
+    async def load(self) -> Dict[str, Any]:
+        """Read the configuration from the database, {} if there is none"""
+        with span("load_config"):
+            async with self.database.read() as conn:
+                cursor = await conn.execute(
+                    "SELECT config, config_version FROM agents WHERE agent_id = ?",
+                    (self.agent_id,)
+                )
+                result = await cursor.fetchone()
+        config = {}
+        if result:
+            self.version = result['config_version']
+            if result['config']:
+                try:
+                    config = loads(result['config'])
+                except ValueError as e:
+                    logging.warning(f"Invalid config stored for agent {self.agent_id}: {e}. Using empty config.")
+        self._config = config
+        return config
 
-    def update_config(self, config: Dict[str, Any]) -> None:
+    async def update_config(self, config: Dict[str, Any]) -> None:
         """Update agent configuration in database"""
         try:
-            cursor = self.db_conn.cursor()
-            cursor.execute(
-                "UPDATE agents SET config = ? WHERE agent_id = ?",
-                (json.dumps(config), self.agent_id)
-            )
-            self.db_conn.commit()
+            async with self.database.write() as conn:
+                await conn.execute(
+                    "UPDATE agents SET config = ? WHERE agent_id = ?",
+                    (dumps(config), self.agent_id)
+                )
+                # Bumped by a trigger if the config changed
+                cursor = await conn.execute(
+                    "SELECT config_version, updated_at FROM agents WHERE agent_id = ?",
+                    (self.agent_id,)
+                )
+                result = await cursor.fetchone()
             self._config = config
+            self.version = result['config_version'] if result else None
+            self.updated_at = result['updated_at'] if result else None
+            if self.on_update is not None:
+                await self.on_update(self.agent_id)
         except Exception as e:
             logging.error(f"Failed to update config in database: {e}")
-            raise
\ No newline at end of file
+            raise
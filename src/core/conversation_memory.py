@@ -0,0 +1,238 @@
+# src/core/conversation_memory.py
+import asyncio
+import contextvars
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .metrics import REGISTRY
+from .serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+MEMORY_COMPACTIONS = REGISTRY.counter(
+    "conversation_memory_compactions",
+    "Folds of older conversation turns into an agent's running summary",
+    ("outcome",)
+)
+
+# Turn tokens, estimated in SQL the same way as estimate_tokens for rows
+# stored before conversations had a tokens column
+_TURN_TOKENS = "COALESCE(tokens, (LENGTH(user_message) + LENGTH(agent_response) + 3) / 4)"
+
+# Coroutine function (summary so far, turns to fold in, token limit) -> new summary
+Summarizer = Callable[[str, List[Dict[str, Any]], int], Awaitable[str]]
+
+def estimate_tokens(*texts: str) -> int:
+    """Estimate the tokens of texts at ~4 characters per token"""
+    return (sum(len(text) for text in texts) + 3) // 4
+
+async def truncating_summarizer(summary: str, turns: List[Dict[str, Any]], max_tokens: int) -> str:
+    """Summarizer that needs no LLM call: keeps the newest text that fits"""
+    lines = [summary] if summary else []
+    for turn in turns:
+        lines.append(f"User: {turn['user_message']}")
+        lines.append(f"Assistant: {turn['agent_response']}")
+    return "\n".join(lines)[-max_tokens * 4:]
+
+class ConversationMemory:
+    """Token-bounded memory of agents' conversations, stored in SQLite
+
+    Turns are appended to the conversations table as they happen. Prompts
+    get the agent's running summary, kept in agent_states.memory, plus the
+    newest turns that fit in the rest of ``max_tokens``, read from the tail
+    of the (agent_id, id) index, so prompt size and cost stay flat however
+    long the conversation grows. When the turns not yet summarized exceed
+    the window left beside a ``summary_tokens`` summary, the oldest are
+    folded into the summary in the background until they fill half of it.
+    """
+
+    def __init__(self, database, max_tokens: int = 2000, summary_tokens: int = 500, max_turns: int = 50):
+        if not 0 < summary_tokens < max_tokens:
+            raise ValueError("summary_tokens must be positive and below max_tokens")
+        self.db = database
+        self.max_tokens = max_tokens
+        self.summary_tokens = summary_tokens
+        # Most turns read per prompt or compaction, bounding the work
+        # either does while compaction lags behind
+        self.max_turns = max_turns
+        self._compacting: Dict[str, asyncio.Task] = {}
+
+    @property
+    def window_tokens(self) -> int:
+        """Tokens of unsummarized turns that trigger a compaction"""
+        return self.max_tokens - self.summary_tokens
+
+    async def _state(self, conn, agent_id: str) -> Dict[str, Any]:
+        cursor = await conn.execute("SELECT memory FROM agent_states WHERE agent_id = ?", (agent_id,))
+        row = await cursor.fetchone()
+        state = loads(row["memory"]) if row is not None and row["memory"] else {}
+        state.setdefault("summary", "")
+        state.setdefault("summarized_through", 0)
+        return state
+
+    async def load(self, agent_id: str) -> Dict[str, Any]:
+        """Get the part of a conversation that fits in the token budget
+
+        Returns:
+            Dictionary with the 'summary' of older turns, the newest
+            'turns' in order, and the estimated 'tokens' of both
+        """
+        async with self.db.read() as conn:
+            state = await self._state(conn, agent_id)
+            cursor = await conn.execute(f"""
+                SELECT id, user_message, agent_response, {_TURN_TOKENS} AS tokens
+                FROM conversations
+                WHERE agent_id = ? AND id > ?
+                ORDER BY id DESC
+                LIMIT ?
+            """, (agent_id, state["summarized_through"], self.max_turns))
+            rows = await cursor.fetchall()
+        used = estimate_tokens(state["summary"])
+        turns = []
+        for row in rows:
+            if used + row["tokens"] > self.max_tokens:
+                break
+            turns.append(dict(row))
+            used += row["tokens"]
+        turns.reverse()
+        return {"summary": state["summary"], "turns": turns, "tokens": used}
+
+    async def messages(self, agent_id: str, system_prompt: str, user_message: str) -> List[Dict[str, str]]:
+        """Build the chat messages for a new user message
+
+        Args:
+            agent_id: ID of the agent holding the conversation
+            system_prompt: Instructions placed first
+            user_message: The message being answered
+
+        Returns:
+            The system prompt, the summary, the remembered turns and the
+            new message, as chat completion messages
+        """
+        memory = await self.load(agent_id)
+        messages = [{"role": "system", "content": system_prompt}]
+        if memory["summary"]:
+            messages.append({
+                "role": "system",
+                "content": f"Summary of the conversation so far:\n{memory['summary']}"
+            })
+        for turn in memory["turns"]:
+            messages.append({"role": "user", "content": turn["user_message"]})
+            messages.append({"role": "assistant", "content": turn["agent_response"]})
+        messages.append({"role": "user", "content": user_message})
+        return messages
+
+    async def append(
+        self,
+        agent_id: str,
+        user_message: str,
+        agent_response: str,
+        summarize: Optional[Summarizer] = None
+    ) -> int:
+        """Record a turn, compacting older turns in the background when over budget
+
+        Args:
+            agent_id: ID of the agent holding the conversation
+            user_message: What the user said
+            agent_response: What the agent answered
+            summarize: Summarizer used if a compaction starts; defaults to
+                truncating_summarizer
+
+        Returns:
+            ID of the stored turn
+        """
+        tokens = estimate_tokens(user_message, agent_response)
+        async with self.db.write() as conn:
+            cursor = await conn.execute(
+                "INSERT INTO conversations (agent_id, user_message, agent_response, tokens) VALUES (?, ?, ?, ?)",
+                (agent_id, user_message, agent_response, tokens)
+            )
+            turn_id = cursor.lastrowid
+            state = await self._state(conn, agent_id)
+            cursor = await conn.execute(
+                f"SELECT COALESCE(SUM({_TURN_TOKENS}), 0) FROM conversations WHERE agent_id = ? AND id > ?",
+                (agent_id, state["summarized_through"])
+            )
+            pending = (await cursor.fetchone())[0]
+        if pending > self.window_tokens and agent_id not in self._compacting:
+            # Started in an empty context, as the compaction outlives the
+            # current run and must not record its spans or LLM attempts
+            task = contextvars.Context().run(
+                asyncio.get_running_loop().create_task, self.compact(agent_id, summarize)
+            )
+            self._compacting[agent_id] = task
+            task.add_done_callback(lambda _: self._compacting.pop(agent_id, None))
+        return turn_id
+
+    async def compact(self, agent_id: str, summarize: Optional[Summarizer] = None) -> bool:
+        """Fold the oldest unsummarized turns into the summary
+
+        Turns are folded until the rest fill at most half the window, at
+        most max_turns at a time.
+
+        Args:
+            agent_id: ID of the agent holding the conversation
+            summarize: Summarizer to use; defaults to truncating_summarizer
+
+        Returns:
+            Whether the summary was updated
+        """
+        async with self.db.read() as conn:
+            state = await self._state(conn, agent_id)
+            cursor = await conn.execute(
+                f"SELECT COALESCE(SUM({_TURN_TOKENS}), 0) FROM conversations WHERE agent_id = ? AND id > ?",
+                (agent_id, state["summarized_through"])
+            )
+            pending = (await cursor.fetchone())[0]
+            cursor = await conn.execute(f"""
+                SELECT id, user_message, agent_response, {_TURN_TOKENS} AS tokens
+                FROM conversations
+                WHERE agent_id = ? AND id > ?
+                ORDER BY id
+                LIMIT ?
+            """, (agent_id, state["summarized_through"], self.max_turns))
+            rows = await cursor.fetchall()
+        folded = []
+        for row in rows:
+            if pending <= self.window_tokens // 2:
+                break
+            folded.append(dict(row))
+            pending -= row["tokens"]
+        if not folded:
+            return False
+
+        try:
+            summary = await (summarize or truncating_summarizer)(state["summary"], folded, self.summary_tokens)
+        except Exception as e:
+            MEMORY_COMPACTIONS.labels("failed").inc()
+            logger.error(f"Summarizing the conversation of agent {agent_id} failed: {e!r}")
+            return False
+        # A summarizer running long must not push prompts over budget
+        summary = summary[-self.summary_tokens * 4:]
+
+        async with self.db.write() as conn:
+            current = await self._state(conn, agent_id)
+            if current["summarized_through"] != state["summarized_through"]:
+                # Another worker folded these turns in first
+                MEMORY_COMPACTIONS.labels("superseded").inc()
+                return False
+            current.update(summary=summary, summarized_through=folded[-1]["id"])
+            await conn.execute("""
+                INSERT INTO agent_states (agent_id, memory) VALUES (?, ?)
+                ON CONFLICT (agent_id) DO UPDATE SET memory = excluded.memory
+            """, (agent_id, dumps(current)))
+        MEMORY_COMPACTIONS.labels("ok").inc()
+        return True
+
+    async def close(self) -> None:
+        """Wait for compactions in progress"""
+        if self._compacting:
+            await asyncio.gather(*list(self._compacting.values()), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the token budget and the compactions in progress"""
+        return {
+            "max_tokens": self.max_tokens,
+            "summary_tokens": self.summary_tokens,
+            "compacting": len(self._compacting)
+        }
@@ -0,0 +1,91 @@
+# src/core/event_hub.py
+import asyncio
+import itertools
+import logging
+from typing import Any, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+class Subscription:
+    """One subscriber's queue of events from an EventHub
+
+    Usage:
+        with hub.subscribe(agent_id) as subscription:
+            event = await subscription.next(timeout=15)
+    """
+
+    def __init__(self, hub: 'EventHub', agent_id: Optional[str], max_queue: int):
+        self.hub = hub
+        self.agent_id = agent_id
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+
+    def _deliver(self, event: Dict[str, Any]) -> None:
+        if self.agent_id is not None and event.get("agent_id") != self.agent_id:
+            return
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too far behind to catch up from deltas; tell it to reload instead
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait({"type": "resync", "seq": event["seq"]})
+            self.hub.overflows += 1
+
+    async def next(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Wait for the next event, or None if timeout seconds pass first"""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        """Stop receiving events"""
+        self.hub._subscriptions.discard(self)
+
+    def __enter__(self) -> 'Subscription':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+class EventHub:
+    """In-process fan-out of run and agent change events to subscribers
+
+    Publishing never blocks: each subscriber has its own bounded queue, and
+    one that falls ``max_queue`` events behind gets a single 'resync' event
+    in place of what it missed.
+    """
+
+    def __init__(self, max_queue: int = 1000):
+        self.max_queue = max_queue
+        self._subscriptions: Set[Subscription] = set()
+        self._seq = itertools.count(1)
+        self.published = 0
+        self.overflows = 0
+
+    def publish(self, event_type: str, **fields: Any) -> None:
+        """Send an event to every matching subscriber
+
+        Args:
+            event_type: Event name, e.g. 'run.created' or 'agent.updated'
+            **fields: Event payload; subscribers filtered to an agent only
+                receive events whose agent_id matches
+        """
+        event = {"type": event_type, "seq": next(self._seq), **fields}
+        self.published += 1
+        for subscription in list(self._subscriptions):
+            subscription._deliver(event)
+
+    def subscribe(self, agent_id: Optional[str] = None) -> Subscription:
+        """Start receiving events, optionally only those for one agent"""
+        subscription = Subscription(self, agent_id, self.max_queue)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def stats(self) -> Dict[str, Any]:
+        """Get subscriber and delivery counters"""
+        return {
+            "subscribers": len(self._subscriptions),
+            "published": self.published,
+            "overflows": self.overflows
+        }
@@ -0,0 +1,57 @@
+# src/core/pagination.py
+import base64
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+def encode_cursor(*values: Any) -> str:
+    """Encode the sort key of the last row on a page as an opaque cursor"""
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Decode a cursor produced by encode_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return values
+
+def parse_fields(fields: Optional[str], allowed: Dict[str, str]) -> List[str]:
+    """Parse a comma-separated field projection
+
+    Args:
+        fields: Requested fields, or None for all of them
+        allowed: Mapping of public field names to column names
+
+    Raises:
+        ValueError: If an unknown field is requested
+    """
+    if not fields:
+        return list(allowed)
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+def normalize_timestamp(value: str) -> str:
+    """Convert an ISO 8601 timestamp to the naive UTC form stored in SQLite
+
+    Raises:
+        ValueError: If the value is not an ISO 8601 timestamp
+    """
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid timestamp: {value}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.isoformat(" ")
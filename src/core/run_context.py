@@ -0,0 +1,22 @@
+# src/core/run_context.py
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+@dataclass
+class RunContext:
+    """Facts about the run currently executing, collected while it runs"""
+    run_id: str
+    agent_id: str
+    cache_hit: bool = False
+    # One entry per LLM request sent for the run, see src.llm.resilience
+    attempts: List[Dict[str, Any]] = field(default_factory=list)
+    # Set when the run shared another run's execution instead of its own
+    coalesced_from: Optional[str] = None
+
+# Set by AgentManager around agent.execute_task so agents can annotate the run
+current_run: ContextVar[Optional[RunContext]] = ContextVar('current_run', default=None)
+
+def get_current_run() -> Optional[RunContext]:
+    """Get the context of the run executing in this task, if any"""
+    return current_run.get()
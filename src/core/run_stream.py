@@ -0,0 +1,70 @@
+# src/core/run_stream.py
+import asyncio
+from typing import Any, AsyncIterator, Dict, List
+
+class RunStream:
+    """Output of a streaming run, kept in memory while the run is live
+
+    Deltas are buffered so any number of subscribers, including ones that
+    reconnect part-way through, can follow the run from a character offset.
+    """
+
+    def __init__(self, run_id: str, agent_id: str):
+        self.run_id = run_id
+        self.agent_id = agent_id
+        self.status = "running"
+        self.result: Any = None
+        self.length = 0
+        self._parts: List[str] = []
+        self._changed = asyncio.Event()
+
+    def text(self) -> str:
+        """Get everything streamed so far"""
+        return "".join(self._parts)
+
+    def append(self, delta: str) -> None:
+        """Add a delta and wake subscribers"""
+        if not delta:
+            return
+        self._parts.append(delta)
+        self.length += len(delta)
+        self._wake()
+
+    def finish(self, status: str, result: Any) -> None:
+        """Mark the run finished and wake subscribers"""
+        self.status = status
+        self.result = result
+        self._wake()
+
+    def _wake(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def follow(self, offset: int = 0) -> AsyncIterator[Dict[str, Any]]:
+        """Yield stream events from a character offset until the run finishes
+
+        Deltas that arrive while a subscriber is busy are coalesced into one
+        event. Each delta event carries the offset just past its text, and
+        the last event is 'done' with the run's status and result.
+        """
+        index, consumed = 0, 0
+        while True:
+            changed = self._changed
+            if self.length > offset:
+                parts = self._parts[index:]
+                index += len(parts)
+                text = "".join(parts)
+                start, consumed = consumed, consumed + len(text)
+                text = text[max(0, offset - start):]
+                offset = consumed
+                yield {"event": "delta", "offset": offset, "text": text}
+                continue
+            if self.status != "running":
+                yield {
+                    "event": "done",
+                    "run_id": self.run_id,
+                    "status": self.status,
+                    "result": self.result
+                }
+                return
+            await changed.wait()
@@ -0,0 +1,65 @@
+# src/core/serialization.py
+from typing import Any, Optional, Union
+
+import orjson
+
+# Pre-encoded JSON embedded verbatim by orjson.dumps; older orjson releases
+# don't have it, in which case columns are decoded instead
+_Fragment = getattr(orjson, "Fragment", None)
+
+def dumps(value: Any, sort_keys: bool = False) -> str:
+    """Encode a value as compact JSON text for storage
+
+    Args:
+        value: Value to encode
+        sort_keys: Sort object keys, so equal values always encode the
+            same, e.g. when the text is hashed
+
+    Raises:
+        TypeError: If the value is not JSON serializable
+    """
+    option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+    return orjson.dumps(value, option=option).decode()
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Decode JSON text or bytes
+
+    Raises:
+        ValueError: If the data is not valid JSON
+    """
+    return orjson.loads(data)
+
+def decode_column(value: Optional[Union[str, bytes]]) -> Any:
+    """Decode a JSON column, with {} for empty values and {"raw": value} for invalid ones"""
+    if not value:
+        return {}
+    try:
+        return orjson.loads(value)
+    except orjson.JSONDecodeError:
+        return {"raw": value}
+
+def checked_column(value: Optional[Union[str, bytes]]) -> Optional[Union[str, bytes]]:
+    """Get a stored JSON column that raw_column can pass through
+
+    Valid JSON is returned as is and anything else as {"raw": value}, for
+    values that may predate migration 13, e.g. in the run archive.
+    """
+    if not value:
+        return value
+    try:
+        orjson.loads(value)
+    except orjson.JSONDecodeError:
+        return dumps({"raw": value if isinstance(value, str) else value.decode(errors="replace")})
+    return value
+
+def raw_column(value: Optional[Union[str, bytes]]) -> Any:
+    """Pass a JSON column through to an ORJSONResponse without decoding it
+
+    The column must hold valid JSON: written by dumps, or rewritten by
+    migration 13 if it was stored before. Returns {} for empty values.
+    """
+    if not value:
+        return {}
+    if _Fragment is None:
+        return decode_column(value)
+    return _Fragment(value)
@@ -0,0 +1,89 @@
+# src/core/single_flight.py
+import asyncio
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+from .serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+def normalize_task(task: Any) -> Any:
+    """Canonical form of a task, so trivially different duplicates compare equal
+
+    Dict keys are sorted and string values trimmed with runs of whitespace
+    collapsed; case and everything else are kept as given.
+    """
+    if isinstance(task, dict):
+        return {key: normalize_task(task[key]) for key in sorted(task, key=str)}
+    if isinstance(task, (list, tuple)):
+        return [normalize_task(item) for item in task]
+    if isinstance(task, str):
+        return " ".join(task.split())
+    return task
+
+def task_key(agent_id: str, config_version: Any, task: Dict[str, Any]) -> str:
+    """Key under which identical tasks for the same agent and config are coalesced"""
+    payload = dumps([agent_id, config_version, normalize_task(task)])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class SingleFlight:
+    """Shares one execution among concurrent callers with the same key
+
+    The first caller for a key runs the work; callers arriving while it is
+    in flight wait for and receive the same result or error. Nothing is
+    kept once the work finishes, so later callers run it again.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, Tuple[str, asyncio.Future]] = {}
+        self.shared = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def owner(self, key: Hashable) -> Optional[str]:
+        """Owner of the execution in flight for key, which a caller now would join"""
+        call = self._calls.get(key)
+        return call[0] if call is not None else None
+
+    async def do(self, key: Hashable, owner: str, work: Callable[[], Awaitable[T]]) -> Tuple[T, str]:
+        """Run work, or join the execution already in flight for key
+
+        Args:
+            key: Identity of the work
+            owner: Name of this caller, e.g. its run ID, reported to joiners
+            work: Coroutine function doing the work
+
+        Returns:
+            The result and the owner of the execution that produced it
+
+        Raises:
+            Exception: The error the shared execution failed with
+        """
+        existing = self._calls.get(key)
+        if existing is not None:
+            leader, future = existing
+            self.shared += 1
+            # A joiner giving up must not cancel the execution others wait on
+            return await asyncio.shield(future), leader
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = (owner, future)
+        try:
+            result = await work()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.set_exception(RuntimeError(f"Shared execution {owner} was cancelled"))
+            else:
+                future.set_exception(e)
+            # Retrieved here so an execution nobody joined isn't logged as unhandled
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, owner
+        finally:
+            del self._calls[key]
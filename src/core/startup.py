@@ -0,0 +1,134 @@
+# src/core/startup.py
+import logging
+import re
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# One line of `python -X importtime` output: self and cumulative microseconds
+# and the module name, indented by nesting depth
+_IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+class StartupTimer:
+    """Records how long each named stage of bringing up a worker takes"""
+
+    def __init__(self):
+        self.stages: List[Tuple[str, float]] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as a stage called name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, time.perf_counter() - start))
+
+    def total(self) -> float:
+        """Seconds spent in all recorded stages"""
+        return sum(seconds for _, seconds in self.stages)
+
+    def reset(self) -> None:
+        """Forget the recorded stages"""
+        self.stages.clear()
+
+# Stages of the current process's startup
+STARTUP = StartupTimer()
+
+def _group(module: str) -> str:
+    """Package an imported module is charged to: its top-level package, or
+    two levels deep for the application's own src.* modules"""
+    parts = module.split(".")
+    return ".".join(parts[:2]) if parts[0] == "src" else parts[0]
+
+def measure_imports(module: str, cwd: Optional[Path] = None) -> Tuple[float, Dict[str, float]]:
+    """Import module in a fresh interpreter under ``-X importtime``
+
+    Args:
+        module: Module to import, e.g. 'src.main'
+        cwd: Directory to run the interpreter in
+
+    Returns:
+        The total import time in seconds and the self time of the modules
+        imported, in seconds, summed per package
+
+    Raises:
+        RuntimeError: If the import fails
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    total = 0.0
+    packages: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORT_TIME_LINE.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        group = _group(name)
+        packages[group] = packages.get(group, 0.0) + int(self_us) / 1e6
+        # Top-level imports are indented by one space; their cumulative time
+        # includes everything they pulled in
+        if len(indent) == 1:
+            total += int(cumulative_us) / 1e6
+    return total, dict(sorted(packages.items(), key=lambda item: item[1], reverse=True))
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def measure_first_request(command: Sequence[str], path: str, cwd: Optional[Path] = None,
+                          timeout: float = 60.0, env: Optional[Dict[str, str]] = None) -> float:
+    """Start a server and time how long it takes to answer its first request
+
+    Args:
+        command: Command starting the server; '--host' and '--port' are appended
+        path: Path to request once the server is up
+        cwd: Directory to start the server in
+        timeout: Seconds to wait for an answer
+        env: Environment of the server process, by default this one's
+
+    Returns:
+        Seconds from starting the process to the first successful response
+
+    Raises:
+        RuntimeError: If the server exits or doesn't answer within timeout
+    """
+    # Imported here to keep it off the startup path this module measures
+    import urllib.request
+
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}{path}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [*command, "--host", "127.0.0.1", "--port", str(port)],
+        cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"Server exited with code {server.returncode} before answering")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                pass
+            time.sleep(0.01)
+        raise RuntimeError(f"Server did not answer {path} within {timeout}s")
+    finally:
+        server.terminate()
+        try:
+            server.wait(10)
+        except subprocess.TimeoutExpired:
+            server.kill()
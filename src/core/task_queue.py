@@ -0,0 +1,94 @@
+# src/core/task_queue.py
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class TaskQueueFullError(Exception):
+    """Raised when a job is submitted to a full task queue"""
+
+class TaskQueue:
+    """Bounded in-process queue drained by a fixed pool of worker tasks
+
+    Jobs are coroutine factories submitted under a key identifying them. Workers
+    are started on first submit so the queue binds to the serving loop.
+    """
+
+    def __init__(self, workers: int = 8, max_queue: int = 1000):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._active = 0
+        self._closed = False
+
+    def submit(self, key: Any, job: Callable[[], Awaitable[Any]]) -> None:
+        """Queue a job for the worker pool
+
+        Raises:
+            TaskQueueFullError: If max_queue jobs are already waiting
+            RuntimeError: If the queue has been closed
+        """
+        if self._closed:
+            raise RuntimeError("Task queue is closed")
+        self._ensure_workers()
+        try:
+            self._queue.put_nowait((key, job))
+        except asyncio.QueueFull:
+            raise TaskQueueFullError(f"Task queue is full ({self.max_queue} waiting)")
+
+    def _ensure_workers(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+        loop = asyncio.get_running_loop()
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        while len(self._workers) < self.workers:
+            self._workers.append(loop.create_task(self._work()))
+
+    async def _work(self) -> None:
+        while True:
+            key, job = await self._queue.get()
+            self._active += 1
+            try:
+                await job()
+            except Exception as e:
+                logger.error(f"Queued job {key} failed: {e}")
+            finally:
+                self._active -= 1
+                self._queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get worker and queue depth counters"""
+        return {
+            "workers": self.workers,
+            "active": self._active,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue
+        }
+
+    async def close(self, timeout: float = 30.0) -> List[Any]:
+        """Stop accepting jobs and let queued ones finish
+
+        Jobs still running after ``timeout`` seconds are cancelled.
+
+        Returns:
+            Keys of jobs that were dropped before they started
+        """
+        self._closed = True
+        if self._queue is None:
+            return []
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Task queue did not drain before shutdown")
+
+        dropped = []
+        while not self._queue.empty():
+            dropped.append(self._queue.get_nowait())
+            self._queue.task_done()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        return [key for key, _ in dropped]
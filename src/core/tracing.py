@@ -0,0 +1,139 @@
+# src/core/tracing.py
+import asyncio
+import logging
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, ContextManager, Dict, List, Optional
+
+from .serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Span:
+    """One timed stage of a run, with offsets relative to the trace start"""
+    span_id: int
+    parent_id: Optional[int]
+    name: str
+    start: float
+    duration: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+class RunTrace:
+    """Spans collected while a run executes"""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.origin_ns = time.time_ns()
+        self.spans: List[Span] = []
+        # Set once the run exists in agent_runs, so its spans can be saved
+        self.recorded = False
+
+    def start_span(self, name: str, parent: Optional[Span], attributes: Dict[str, Any]) -> Span:
+        """Open a span; its duration is set when it ends"""
+        span = Span(
+            span_id=len(self.spans) + 1,
+            parent_id=parent.span_id if parent is not None else None,
+            name=name,
+            start=time.perf_counter() - self.origin,
+            attributes=attributes
+        )
+        self.spans.append(span)
+        return span
+
+    def end_span(self, span: Span) -> None:
+        """Close a span at the current time"""
+        span.duration = time.perf_counter() - self.origin - span.start
+
+# Set by AgentManager for the duration of a traced run
+current_trace: ContextVar[Optional[RunTrace]] = ContextVar('current_trace', default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+
+class _SpanScope:
+    """Context manager that opens a span on enter and closes it on exit"""
+
+    __slots__ = ("trace", "name", "attributes", "span", "token")
+
+    def __init__(self, trace: RunTrace, name: str, attributes: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self) -> Span:
+        self.span = self.trace.start_span(self.name, _current_span.get(), self.attributes)
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.span.attributes["error"] = exc_type.__name__
+        _current_span.reset(self.token)
+        self.trace.end_span(self.span)
+
+# Shared by every span() call outside a traced run
+_NO_SPAN = nullcontext()
+
+def span(name: str, **attributes: Any) -> ContextManager[Optional[Span]]:
+    """Time a block as a span of the run executing in this task
+
+    Nested spans become children of the enclosing one. Outside a traced run
+    this does nothing and yields None.
+
+    Args:
+        name: Stage name shown in the trace
+        **attributes: Extra details stored with the span
+    """
+    trace = current_trace.get()
+    if trace is None:
+        return _NO_SPAN
+    return _SpanScope(trace, name, attributes)
+
+class SpanFileExporter:
+    """Appends finished traces to a file as OpenTelemetry-style JSON lines
+
+    Each line is one span with OTLP field names: the trace ID is the run ID
+    without dashes, times are Unix nanoseconds and attributes are key/value
+    lists, so the file can be replayed into an OTLP collector.
+    """
+
+    def __init__(self, path, service_name: str = "agent-manager"):
+        self.path = Path(path)
+        self.service_name = service_name
+
+    def _lines(self, run_id: str, agent_id: str, trace: RunTrace) -> List[str]:
+        trace_id = run_id.replace("-", "").rjust(32, "0")[:32]
+        lines = []
+        for s in trace.spans:
+            start = trace.origin_ns + int(s.start * 1e9)
+            attributes = {"run.id": run_id, "agent.id": agent_id, **s.attributes}
+            lines.append(dumps({
+                "resource": {"service.name": self.service_name},
+                "traceId": trace_id,
+                "spanId": f"{s.span_id:016x}",
+                "parentSpanId": f"{s.parent_id:016x}" if s.parent_id is not None else "",
+                "name": s.name,
+                "startTimeUnixNano": start,
+                "endTimeUnixNano": start + int((s.duration or 0.0) * 1e9),
+                "attributes": [
+                    {"key": key, "value": {"stringValue": str(value)}}
+                    for key, value in attributes.items()
+                ]
+            }))
+        return lines
+
+    def _write(self, lines: List[str]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(line + "\n" for line in lines))
+
+    async def export(self, run_id: str, agent_id: str, trace: RunTrace) -> None:
+        """Append a run's spans to the export file"""
+        if not trace.spans:
+            return
+        try:
+            await asyncio.to_thread(self._write, self._lines(run_id, agent_id, trace))
+        except OSError as e:
+            logger.warning(f"Failed to export trace for run {run_id}: {e}")
@@ -0,0 +1,174 @@
+# src/database/coordination.py
+import asyncio
+import logging
+import os
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+def worker_id() -> str:
+    """Identify this process among the workers sharing a database"""
+    return f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+class InvalidationChannel:
+    """Tells the other worker processes sharing a database to drop cached state
+
+    ``publish(scope, key)`` appends a row to cache_invalidations; every
+    process polls the table every ``interval`` seconds and passes rows
+    written by other processes to the callbacks subscribed to their scope.
+    A key of None stands for everything in the scope. Rows are pruned after
+    ``retention`` seconds, far longer than any worker lags behind.
+    """
+
+    def __init__(self, database, interval: float = 0.5, retention: float = 3600.0, origin: Optional[str] = None):
+        self.db = database
+        self.interval = interval
+        self.retention = retention
+        self.origin = origin or worker_id()
+        self.published = 0
+        self.received = 0
+        self._subscribers: Dict[str, List[Callable[[Optional[str]], None]]] = {}
+        self._last_seq: Optional[int] = None
+        self._pruned_at = 0.0
+        self._task = None
+
+    def subscribe(self, scope: str, callback: Callable[[Optional[str]], None]) -> None:
+        """Call callback with the key of each invalidation other processes publish in scope"""
+        self._subscribers.setdefault(scope, []).append(callback)
+
+    async def publish(self, scope: str, key: Optional[str] = None, conn=None) -> None:
+        """Announce that state cached under scope and key has changed
+
+        Args:
+            scope: Kind of state, e.g. 'agent.updated'
+            key: Identity of what changed, or None for the whole scope
+            conn: Writer connection of an open db.write() block, so the
+                invalidation commits atomically with the change itself
+        """
+        row = (scope, key, self.origin, time.time())
+        query = "INSERT INTO cache_invalidations (scope, key, origin, created_at) VALUES (?, ?, ?, ?)"
+        if conn is not None:
+            await conn.execute(query, row)
+        else:
+            async with self.db.write() as conn:
+                await conn.execute(query, row)
+        self.published += 1
+
+    async def poll(self) -> int:
+        """Deliver invalidations published by other processes since the last poll
+
+        The first poll only notes the latest row, as a starting process has
+        nothing cached yet.
+
+        Returns:
+            The number of invalidations delivered
+        """
+        async with self.db.read() as conn:
+            if self._last_seq is None:
+                cursor = await conn.execute("SELECT COALESCE(MAX(seq), 0) FROM cache_invalidations")
+                self._last_seq = (await cursor.fetchone())[0]
+                return 0
+            cursor = await conn.execute("""
+                SELECT seq, scope, key, origin FROM cache_invalidations
+                WHERE seq > ?
+                ORDER BY seq
+            """, (self._last_seq,))
+            rows = await cursor.fetchall()
+        delivered = 0
+        for row in rows:
+            self._last_seq = row["seq"]
+            if row["origin"] == self.origin:
+                continue
+            delivered += 1
+            for callback in self._subscribers.get(row["scope"], ()):
+                try:
+                    callback(row["key"])
+                except Exception as e:
+                    logger.error(f"Invalidation callback for {row['scope']} failed: {e!r}")
+        self.received += delivered
+        return delivered
+
+    async def prune(self) -> None:
+        """Delete invalidations older than the retention window"""
+        async with self.db.write() as conn:
+            await conn.execute(
+                "DELETE FROM cache_invalidations WHERE created_at < ?",
+                (time.time() - self.retention,)
+            )
+
+    def start(self) -> None:
+        """Start polling in the background"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        """Background loop that polls, and occasionally prunes, the table"""
+        while True:
+            try:
+                await self.poll()
+                if time.monotonic() - self._pruned_at >= self.retention / 10:
+                    self._pruned_at = time.monotonic()
+                    await self.prune()
+            except Exception as e:
+                logger.error(f"Polling cache invalidations failed: {e!r}")
+            await asyncio.sleep(self.interval)
+
+    async def close(self) -> None:
+        """Stop polling"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Get this worker's ID and invalidation counters"""
+        return {
+            "worker": self.origin,
+            "published": self.published,
+            "received": self.received,
+            "last_seq": self._last_seq
+        }
+
+class Lease:
+    """Named, expiring claim that lets one worker process at a time run a job
+
+    ``acquire`` takes the lease when it is free or expired, or renews it
+    when this process already holds it. A holder that dies is replaced once
+    ``ttl`` seconds pass without a renewal.
+    """
+
+    def __init__(self, database, name: str, ttl: float, owner: Optional[str] = None):
+        self.db = database
+        self.name = name
+        self.ttl = ttl
+        self.owner = owner or worker_id()
+
+    async def acquire(self) -> bool:
+        """Take or renew the lease
+
+        Returns:
+            Whether this process holds the lease for the next ttl seconds
+        """
+        now = time.time()
+        async with self.db.write() as conn:
+            await conn.execute("""
+                INSERT INTO worker_leases (name, owner, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT (name) DO UPDATE
+                SET owner = excluded.owner, expires_at = excluded.expires_at
+                WHERE worker_leases.owner = excluded.owner OR worker_leases.expires_at < ?
+            """, (self.name, self.owner, now + self.ttl, now))
+            cursor = await conn.execute("SELECT owner FROM worker_leases WHERE name = ?", (self.name,))
+            return (await cursor.fetchone())["owner"] == self.owner
+
+    async def release(self) -> None:
+        """Give up the lease if this process holds it"""
+        async with self.db.write() as conn:
+            await conn.execute(
+                "DELETE FROM worker_leases WHERE name = ? AND owner = ?",
+                (self.name, self.owner)
+            )
@@ -1,69 +1,202 @@
 # src/database/db_setup.py
+import asyncio
+import itertools
 import sqlite3
 import logging
+import time
+from contextlib import asynccontextmanager
+
+import aiosqlite
+
+from src.core.metrics import REGISTRY
+from .migrations import migrate
 
 logger = logging.getLogger(__name__)
 
+# Counter used to give each in-memory database its own shared-cache name
+_memory_db_ids = itertools.count()
+
+DB_WAIT_SECONDS = REGISTRY.histogram(
+    "db_connection_wait_seconds",
+    "Time spent waiting for a pooled reader or the writer lock",
+    ("mode",)
+)
+# Whole blocks, not single statements: for writes this is how long the
+# writer lock, and SQLite's RESERVED lock, is held per transaction
+DB_HOLD_SECONDS = REGISTRY.histogram(
+    "db_transaction_hold_seconds",
+    "Time a connection is held per db.read() block or db.write() transaction, including commit",
+    ("mode",)
+)
+
 class Database:
-    def __init__(self, db_path: str):
-        """Initialize database with schema"""
+    def __init__(self, db_path: str, pool_size: int = 4, busy_timeout: float = 30.0):
+        """Initialize database with schema
+
+        Args:
+            db_path: Path to the SQLite file, or ":memory:"
+            pool_size: Maximum number of async reader connections
+            busy_timeout: Seconds a connection waits for a lock held by
+                another connection, e.g. another worker process, before
+                failing with "database is locked"
+        """
         self.db_path = db_path
+        self.pool_size = pool_size
+        self.busy_timeout = busy_timeout
+        # In-memory databases are private to a single connection, so name them
+        # and enable the shared cache to let the async pool see the same data
+        self._uri = None
+        if db_path == ":memory:":
+            self._uri = f"file:agents_mem_{next(_memory_db_ids)}?mode=memory&cache=shared"
+
+        # Metric children are bound once; observing is then a bisect and two adds
+        self._read_wait = DB_WAIT_SECONDS.labels("read")
+        self._write_wait = DB_WAIT_SECONDS.labels("write")
+        self._read_hold = DB_HOLD_SECONDS.labels("read")
+        self._write_hold = DB_HOLD_SECONDS.labels("write")
+
+        # Async pool state is created lazily inside the running event loop
+        self._readers = None
+        self._reader_count = 0
+        self._writer = None
+        self._writer_lock = None
+
         self.conn = self._create_connection()
         
-        # Enable foreign keys
-        with self.get_conn() as conn:
-            conn.execute("PRAGMA foreign_keys = ON")
-            
-            # Create tables with consistent schema
-            conn.executescript("""
-                CREATE TABLE IF NOT EXISTS agents (
-                    agent_id TEXT PRIMARY KEY,
-                    name TEXT NOT NULL,
-                    config TEXT NOT NULL,
-                    status TEXT NOT NULL,
-                    type TEXT NOT NULL DEFAULT 'default',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-                
-                CREATE TABLE IF NOT EXISTS agent_states (
-                    agent_id TEXT PRIMARY KEY,
-                    memory TEXT NOT NULL,
-                    FOREIGN KEY (agent_id) REFERENCES agents (agent_id)
-                );
-                
-                CREATE TABLE IF NOT EXISTS agent_runs (
-                    run_id TEXT PRIMARY KEY,
-                    agent_id TEXT NOT NULL,
-                    task TEXT NOT NULL,
-                    status TEXT NOT NULL,
-                    result TEXT,
-                    started_at TIMESTAMP NOT NULL,
-                    completed_at TIMESTAMP,
-                    FOREIGN KEY (agent_id) REFERENCES agents (agent_id)
-                );
-                
-                CREATE TABLE IF NOT EXISTS conversations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    agent_id TEXT NOT NULL,
-                    user_message TEXT NOT NULL,
-                    agent_response TEXT NOT NULL,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (agent_id) REFERENCES agents (agent_id)
-                );
-            """)
+        # Enable foreign keys and bring the schema up to date in place
+        conn = self.get_conn()
+        conn.execute("PRAGMA foreign_keys = ON")
+        migrate(conn)
     
     def _create_connection(self):
         """Create a new database connection with proper configuration"""
-        conn = sqlite3.connect(self.db_path)
+        # The sync connection is only used from the event loop thread, which
+        # need not be the thread that created it (e.g. under a test client)
+        if self._uri:
+            conn = sqlite3.connect(self._uri, uri=True, check_same_thread=False, timeout=self.busy_timeout)
+        else:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=self.busy_timeout)
+            # WAL lets the reader pool run alongside the writer, and with
+            # synchronous=NORMAL commits no longer fsync on every transaction
+            self._enable_wal(conn)
+            conn.execute("PRAGMA synchronous = NORMAL")
         conn.row_factory = sqlite3.Row
         return conn
     
+    def _enable_wal(self, conn: sqlite3.Connection) -> None:
+        """Switch to WAL, retrying while other processes hold locks
+
+        Changing the journal mode fails at once rather than waiting for the
+        busy timeout, e.g. while another worker is migrating the schema.
+        """
+        deadline = time.monotonic() + self.busy_timeout
+        while True:
+            try:
+                conn.execute("PRAGMA journal_mode = WAL")
+                return
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e) or time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.05)
+
     def get_conn(self):
         """Get a properly configured database connection"""
         if self.conn is None:
             self.conn = self._create_connection()
         return self.conn
 
+    async def _connect(self, readonly: bool) -> aiosqlite.Connection:
+        """Open a new async connection configured like the sync one"""
+        if self._uri:
+            conn = await aiosqlite.connect(self._uri, uri=True, timeout=self.busy_timeout)
+        else:
+            conn = await aiosqlite.connect(self.db_path, timeout=self.busy_timeout)
+            await conn.execute("PRAGMA synchronous = NORMAL")
+        conn.row_factory = sqlite3.Row
+        await conn.execute("PRAGMA foreign_keys = ON")
+        if readonly:
+            await conn.execute("PRAGMA query_only = ON")
+            if self._uri:
+                # Shared-cache readers would otherwise hit table locks held by the writer
+                await conn.execute("PRAGMA read_uncommitted = ON")
+        return conn
+
+    async def _acquire_reader(self) -> aiosqlite.Connection:
+        """Take a reader from the pool, opening a new one while below pool_size"""
+        if self._readers is None:
+            self._readers = asyncio.Queue()
+        if self._readers.empty() and self._reader_count < self.pool_size:
+            self._reader_count += 1
+            try:
+                return await self._connect(readonly=True)
+            except Exception:
+                self._reader_count -= 1
+                raise
+        return await self._readers.get()
+
+    @asynccontextmanager
+    async def read(self):
+        """Borrow a read-only async connection from the pool
+
+        Usage:
+            async with db.read() as conn:
+                cursor = await conn.execute(...)
+        """
+        start = time.perf_counter()
+        conn = await self._acquire_reader()
+        acquired = time.perf_counter()
+        self._read_wait.observe(acquired - start)
+        readers = self._readers
+        try:
+            yield conn
+        finally:
+            self._read_hold.observe(time.perf_counter() - acquired)
+            if self._readers is readers:
+                readers.put_nowait(conn)
+            else:
+                # The pool was closed while this connection was checked out
+                await conn.close()
+
+    @asynccontextmanager
+    async def write(self):
+        """Get exclusive use of the writer connection
+
+        The transaction is committed when the block exits normally and rolled
+        back if it raises. It starts with BEGIN IMMEDIATE, taking the
+        database write lock up front: a deferred transaction that reads and
+        then writes fails with SQLITE_BUSY, without waiting, when another
+        process committed in between.
+        """
+        if self._writer_lock is None:
+            self._writer_lock = asyncio.Lock()
+        start = time.perf_counter()
+        async with self._writer_lock:
+            acquired = time.perf_counter()
+            self._write_wait.observe(acquired - start)
+            if self._writer is None:
+                self._writer = await self._connect(readonly=False)
+            try:
+                await self._writer.execute("BEGIN IMMEDIATE")
+                yield self._writer
+            except BaseException:
+                await self._writer.rollback()
+                raise
+            else:
+                await self._writer.commit()
+            finally:
+                self._write_hold.observe(time.perf_counter() - acquired)
+
+    async def close(self) -> None:
+        """Close all async connections"""
+        if self._readers is not None:
+            while not self._readers.empty():
+                await self._readers.get_nowait().close()
+            self._readers = None
+            self._reader_count = 0
+        if self._writer is not None:
+            await self._writer.close()
+            self._writer = None
+
     def list_agents(self):
         """List all agents"""
         cursor = self.conn.cursor()
@@ -71,43 +204,17 @@ class Database:
         return [dict(row) for row in cursor.fetchall()]
 
     def delete_agent(self, agent_id: str):
-        """Delete an agent and all related records"""
-        cursor = self.conn.cursor()
+        """Delete an agent and all related records
+
+        States, runs and conversations are removed by ON DELETE CASCADE.
+        """
         try:
-            # Start transaction
-            self.conn.execute("BEGIN TRANSACTION")
-            
-            # Check for any remaining foreign key references
-            tables = ['conversations', 'agent_runs', 'agent_states']
-            for table in tables:
-                count = cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE agent_id = ?", (agent_id,)).fetchone()[0]
-                if count > 0:
-                    logger.info(f"Found {count} records in {table} for agent {agent_id}")
-            
-            # Delete related records first
-            cursor.execute("DELETE FROM conversations WHERE agent_id = ?", (agent_id,))
-            logger.info(f"Deleted conversations for agent {agent_id}")
-            
-            cursor.execute("DELETE FROM agent_runs WHERE agent_id = ?", (agent_id,))
-            logger.info(f"Deleted agent_runs for agent {agent_id}")
-            
-            cursor.execute("DELETE FROM agent_states WHERE agent_id = ?", (agent_id,))
-            logger.info(f"Deleted agent_states for agent {agent_id}")
-            
-            # Finally delete the agent
-            cursor.execute("DELETE FROM agents WHERE agent_id = ?", (agent_id,))
-            logger.info(f"Deleted agent {agent_id}")
-            
-            # Commit transaction
+            self.conn.execute("DELETE FROM agents WHERE agent_id = ?", (agent_id,))
             self.conn.commit()
             logger.info(f"Successfully deleted agent {agent_id} and all related records")
-            
         except Exception as e:
             self.conn.rollback()
             logger.error(f"Failed to delete agent {agent_id}: {str(e)}")
-            # Check if agent still exists
-            exists = cursor.execute("SELECT COUNT(*) FROM agents WHERE agent_id = ?", (agent_id,)).fetchone()[0]
-            logger.error(f"Agent still exists: {exists}")
             raise
 
     def update_agent(self, agent_id: str, updated_data: dict):
@@ -0,0 +1,294 @@
+# src/database/migrations.py
+import logging
+import sqlite3
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+# Each entry upgrades the schema by one version; the database's current
+# version is kept in PRAGMA user_version. Never edit a released migration,
+# append a new one instead.
+MIGRATIONS = [
+    # 1: Base schema. Databases created before versioning already have these
+    # tables and report user_version 0, so every statement is idempotent.
+    """
+    CREATE TABLE IF NOT EXISTS agents (
+        agent_id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        config TEXT NOT NULL,
+        status TEXT NOT NULL,
+        type TEXT NOT NULL DEFAULT 'default',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS agent_states (
+        agent_id TEXT PRIMARY KEY,
+        memory TEXT NOT NULL,
+        FOREIGN KEY (agent_id) REFERENCES agents (agent_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS agent_runs (
+        run_id TEXT PRIMARY KEY,
+        agent_id TEXT NOT NULL,
+        task TEXT NOT NULL,
+        status TEXT NOT NULL,
+        result TEXT,
+        started_at TIMESTAMP NOT NULL,
+        completed_at TIMESTAMP,
+        FOREIGN KEY (agent_id) REFERENCES agents (agent_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS conversations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        agent_id TEXT NOT NULL,
+        user_message TEXT NOT NULL,
+        agent_response TEXT NOT NULL,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (agent_id) REFERENCES agents (agent_id)
+    );
+    """,
+    # 2: Cascade deletes from agents and index the per-agent hot paths.
+    # SQLite can't alter a foreign key in place, so the child tables are
+    # rebuilt; rows pointing at agents that no longer exist are dropped.
+    """
+    CREATE TABLE agent_states_new (
+        agent_id TEXT PRIMARY KEY,
+        memory TEXT NOT NULL,
+        FOREIGN KEY (agent_id) REFERENCES agents (agent_id) ON DELETE CASCADE
+    );
+    INSERT INTO agent_states_new (agent_id, memory)
+        SELECT agent_id, memory FROM agent_states
+        WHERE agent_id IN (SELECT agent_id FROM agents);
+    DROP TABLE agent_states;
+    ALTER TABLE agent_states_new RENAME TO agent_states;
+
+    CREATE TABLE agent_runs_new (
+        run_id TEXT PRIMARY KEY,
+        agent_id TEXT NOT NULL,
+        task TEXT NOT NULL,
+        status TEXT NOT NULL,
+        result TEXT,
+        started_at TIMESTAMP NOT NULL,
+        completed_at TIMESTAMP,
+        FOREIGN KEY (agent_id) REFERENCES agents (agent_id) ON DELETE CASCADE
+    );
+    INSERT INTO agent_runs_new
+        (run_id, agent_id, task, status, result, started_at, completed_at)
+        SELECT run_id, agent_id, task, status, result, started_at, completed_at
+        FROM agent_runs
+        WHERE agent_id IN (SELECT agent_id FROM agents);
+    DROP TABLE agent_runs;
+    ALTER TABLE agent_runs_new RENAME TO agent_runs;
+
+    CREATE TABLE conversations_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        agent_id TEXT NOT NULL,
+        user_message TEXT NOT NULL,
+        agent_response TEXT NOT NULL,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (agent_id) REFERENCES agents (agent_id) ON DELETE CASCADE
+    );
+    INSERT INTO conversations_new (id, agent_id, user_message, agent_response, timestamp)
+        SELECT id, agent_id, user_message, agent_response, timestamp
+        FROM conversations
+        WHERE agent_id IN (SELECT agent_id FROM agents);
+    DROP TABLE conversations;
+    ALTER TABLE conversations_new RENAME TO conversations;
+
+    CREATE INDEX idx_agent_runs_agent_started
+        ON agent_runs (agent_id, started_at DESC);
+    CREATE INDEX idx_conversations_agent_timestamp
+        ON conversations (agent_id, timestamp);
+    """,
+    # 3: Include run_id as the tiebreaker so keyset pages over an agent's
+    # runs are read straight from the index without a sort.
+    """
+    DROP INDEX idx_agent_runs_agent_started;
+    CREATE INDEX idx_agent_runs_agent_started
+        ON agent_runs (agent_id, started_at DESC, run_id DESC);
+    """,
+    # 4: Content-addressed LLM response cache, and a marker on runs that
+    # were answered from it.
+    """
+    CREATE TABLE llm_response_cache (
+        cache_key TEXT PRIMARY KEY,
+        model TEXT NOT NULL,
+        response TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        created_at REAL NOT NULL,
+        last_used_at REAL NOT NULL
+    );
+    CREATE INDEX idx_llm_response_cache_last_used
+        ON llm_response_cache (last_used_at);
+
+    ALTER TABLE agent_runs ADD COLUMN cache_hit INTEGER NOT NULL DEFAULT 0;
+    """,
+    # 5: Text streamed so far by a run, saved as it arrives so clients can
+    # resume a stream from an offset.
+    """
+    ALTER TABLE agent_runs ADD COLUMN output TEXT;
+    """,
+    # 6: Index of runs moved out of agent_runs into compressed segment
+    # files, one row per block of an agent's runs.
+    """
+    CREATE TABLE archived_run_blocks (
+        agent_id TEXT NOT NULL,
+        segment TEXT NOT NULL,
+        byte_offset INTEGER NOT NULL,
+        byte_length INTEGER NOT NULL,
+        run_count INTEGER NOT NULL,
+        min_started_at TIMESTAMP NOT NULL,
+        max_started_at TIMESTAMP NOT NULL,
+        FOREIGN KEY (agent_id) REFERENCES agents (agent_id) ON DELETE CASCADE
+    );
+    CREATE INDEX idx_archived_run_blocks_agent
+        ON archived_run_blocks (agent_id, max_started_at DESC);
+    """,
+    # 7: Timed stages of each run, for per-run trace waterfalls. Offsets
+    # and durations are in seconds from the start of the run.
+    """
+    CREATE TABLE run_spans (
+        run_id TEXT NOT NULL,
+        span_id INTEGER NOT NULL,
+        parent_id INTEGER,
+        name TEXT NOT NULL,
+        start_offset REAL NOT NULL,
+        duration REAL,
+        attributes TEXT,
+        PRIMARY KEY (run_id, span_id),
+        FOREIGN KEY (run_id) REFERENCES agent_runs (run_id) ON DELETE CASCADE
+    );
+    """,
+    # 8: Every LLM request a run sent, including retries and hedges, as a
+    # JSON list, to measure what the resilience policy did for tail latency.
+    """
+    ALTER TABLE agent_runs ADD COLUMN attempts TEXT;
+    """,
+    # 9: The run whose execution a coalesced duplicate shared, instead of
+    # calling the agent itself.
+    """
+    ALTER TABLE agent_runs ADD COLUMN coalesced_from TEXT;
+    """,
+    # 10: Coordination between worker processes sharing the database:
+    # cache invalidations each worker polls for, and leases that let one
+    # worker at a time run singleton background jobs.
+    """
+    CREATE TABLE cache_invalidations (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        scope TEXT NOT NULL,
+        key TEXT,
+        origin TEXT NOT NULL,
+        created_at REAL NOT NULL
+    );
+    CREATE TABLE worker_leases (
+        name TEXT PRIMARY KEY,
+        owner TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    );
+    """,
+    # 11: Conversation memory. Each turn stores its estimated token count,
+    # and the newest turns of an agent are read from the (agent_id, id)
+    # index, as timestamps only have second resolution.
+    """
+    ALTER TABLE conversations ADD COLUMN tokens INTEGER;
+    CREATE INDEX idx_conversations_agent_id ON conversations (agent_id, id);
+    """,
+    # 12: Version agents for ETags and caches keyed on their config. The
+    # triggers bump config_version whenever a write changes a public field,
+    # and stamp updated_at, whichever code path the write comes from.
+    """
+    ALTER TABLE agents ADD COLUMN config_version INTEGER NOT NULL DEFAULT 1;
+    ALTER TABLE agents ADD COLUMN updated_at TIMESTAMP;
+    UPDATE agents SET updated_at = created_at;
+    CREATE TRIGGER agents_set_updated_at
+    AFTER INSERT ON agents
+    WHEN NEW.updated_at IS NULL
+    BEGIN
+        UPDATE agents SET updated_at = NEW.created_at WHERE agent_id = NEW.agent_id;
+    END;
+    CREATE TRIGGER agents_bump_config_version
+    AFTER UPDATE OF name, type, config, status ON agents
+    WHEN NEW.name IS NOT OLD.name OR NEW.type IS NOT OLD.type
+        OR NEW.config IS NOT OLD.config OR NEW.status IS NOT OLD.status
+    BEGIN
+        UPDATE agents
+        SET config_version = OLD.config_version + 1, updated_at = CURRENT_TIMESTAMP
+        WHERE agent_id = NEW.agent_id;
+    END;
+    """,
+    # 13: JSON columns are served verbatim (serialization.raw_column), so
+    # rewrite text that isn't valid JSON, e.g. NaN or Infinity from the
+    # stdlib json module, as {"raw": text}: what decode_column reads it as.
+    """
+    UPDATE agents SET config = json_object('raw', config)
+        WHERE config != '' AND NOT json_valid(config);
+    UPDATE agent_runs SET task = json_object('raw', task)
+        WHERE task != '' AND NOT json_valid(task);
+    UPDATE agent_runs SET result = json_object('raw', result)
+        WHERE result != '' AND NOT json_valid(result);
+    """,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def _statements(script: str) -> List[str]:
+    """Split a migration script into complete SQL statements"""
+    statements, current = [], ""
+    for line in script.splitlines(keepends=True):
+        current += line
+        if sqlite3.complete_statement(current):
+            statements.append(current.strip())
+            current = ""
+    if current.strip():
+        statements.append(current.strip())
+    return statements
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Bring the schema up to SCHEMA_VERSION
+
+    Each migration runs in its own transaction with foreign keys disabled,
+    so tables can be rebuilt, and is checked for dangling references
+    before it commits. The transaction takes the write lock before the
+    version is checked, so when several worker processes start at once
+    each migration is applied by exactly one of them.
+
+    Args:
+        conn: Connection to the database to upgrade
+
+    Returns:
+        The schema version after migrating
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version > SCHEMA_VERSION:
+        logger.warning(
+            f"Database schema version {version} is newer than this code "
+            f"supports ({SCHEMA_VERSION})"
+        )
+        return version
+
+    for target in range(version + 1, SCHEMA_VERSION + 1):
+        # foreign_keys can only be toggled outside a transaction
+        conn.commit()
+        conn.execute("PRAGMA foreign_keys = OFF")
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= target:
+                # Applied by another process while this one waited for the lock
+                conn.rollback()
+                continue
+            logger.info(f"Migrating database schema to version {target}")
+            for statement in _statements(MIGRATIONS[target - 1]):
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {target}")
+            violations = conn.execute("PRAGMA foreign_key_check").fetchall()
+            if violations:
+                raise sqlite3.IntegrityError(
+                    f"Migration {target} left {len(violations)} foreign key violations"
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.execute("PRAGMA foreign_keys = ON")
+    return SCHEMA_VERSION
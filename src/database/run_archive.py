@@ -0,0 +1,254 @@
+# src/database/run_archive.py
+import asyncio
+import gzip
+import logging
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.core.serialization import checked_column, dumps, loads
+
+logger = logging.getLogger(__name__)
+
+class TraceNotArchivedError(Exception):
+    """Raised for the trace of a run archived before spans were kept with it"""
+
+# Columns copied from agent_runs into archived records
+ARCHIVED_COLUMNS = (
+    "run_id", "task", "status", "result", "started_at", "completed_at", "cache_hit", "output",
+    "attempts", "coalesced_from"
+)
+
+class RunArchive:
+    """Cold tier for finished agent_runs older than a retention window
+
+    Each archive pass moves a batch of old runs into gzip-compressed blocks
+    appended to segment files under ``directory``, one block per agent, and
+    records every block in the archived_run_blocks index. Each archived
+    run keeps its run_spans rows under "spans". A block is only
+    referenced once its bytes are on disk, and its runs are deleted from
+    agent_runs in the same transaction that indexes it, so an interrupted
+    pass leaves at worst unreferenced bytes behind. With a Lease, only the
+    worker process holding it runs background passes.
+    """
+
+    SEGMENT_PATTERN = "runs-{:06d}.seg"
+
+    def __init__(
+        self,
+        database,
+        directory,
+        retention: float = 30 * 24 * 3600,
+        batch_size: int = 5000,
+        segment_max_bytes: int = 64 * 1024 * 1024,
+        lease=None
+    ):
+        self.db = database
+        self.directory = Path(directory)
+        self.retention = retention
+        self.batch_size = batch_size
+        self.segment_max_bytes = segment_max_bytes
+        self.lease = lease
+        self.archived = 0
+        self._segment: Optional[Path] = None
+        self._task = None
+
+    def _current_segment(self) -> Path:
+        """Get the segment to append to, starting a new one when full"""
+        if self._segment is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            existing = sorted(self.directory.glob("runs-*.seg"))
+            self._segment = existing[-1] if existing else self.directory / self.SEGMENT_PATTERN.format(1)
+        if self._segment.exists() and self._segment.stat().st_size >= self.segment_max_bytes:
+            number = int(self._segment.stem.split("-")[1]) + 1
+            self._segment = self.directory / self.SEGMENT_PATTERN.format(number)
+        return self._segment
+
+    def _append_blocks(self, groups: Dict[str, List[Dict[str, Any]]]) -> List[Tuple]:
+        """Compress each agent's runs into a block and append it to the segment
+
+        Returns:
+            archived_run_blocks rows for the written blocks
+        """
+        segment = self._current_segment()
+        index_rows = []
+        with open(segment, "ab") as f:
+            for agent_id, runs in groups.items():
+                block = gzip.compress(
+                    "".join(dumps(run) + "\n" for run in runs).encode(),
+                    compresslevel=6
+                )
+                offset = f.tell()
+                f.write(block)
+                started = [run["started_at"] for run in runs]
+                index_rows.append((
+                    agent_id, segment.name, offset, len(block), len(runs),
+                    min(started), max(started)
+                ))
+            f.flush()
+            os.fsync(f.fileno())
+        return index_rows
+
+    def _read_block(self, segment: str, offset: int, length: int) -> List[Dict[str, Any]]:
+        """Read and decompress one block of archived runs"""
+        with open(self.directory / segment, "rb") as f:
+            f.seek(offset)
+            data = gzip.decompress(f.read(length))
+        return [loads(line) for line in data.splitlines() if line]
+
+    async def archive_once(self) -> int:
+        """Move one batch of finished runs older than the retention window
+
+        Their spans go with them, as deleting the runs cascades to run_spans.
+
+        Returns:
+            The number of runs archived
+        """
+        cutoff = (datetime.utcnow() - timedelta(seconds=self.retention)).isoformat(" ")
+        batch = """
+            FROM agent_runs
+            WHERE started_at < ? AND status NOT IN ('queued', 'running')
+            ORDER BY agent_id, started_at DESC, run_id DESC
+            LIMIT ?
+        """
+        async with self.db.read() as conn:
+            cursor = await conn.execute(
+                f"SELECT agent_id, {', '.join(ARCHIVED_COLUMNS)} {batch}",
+                (cutoff, self.batch_size)
+            )
+            rows = await cursor.fetchall()
+            if not rows:
+                return 0
+            # In the same read transaction, so the spans match the batch
+            cursor = await conn.execute(f"""
+                SELECT run_id, span_id, parent_id, name, start_offset, duration, attributes
+                FROM run_spans
+                WHERE run_id IN (SELECT run_id {batch})
+            """, (cutoff, self.batch_size))
+            spans: Dict[str, List[List[Any]]] = {}
+            for span in await cursor.fetchall():
+                spans.setdefault(span["run_id"], []).append(list(span)[1:])
+
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            groups.setdefault(row["agent_id"], []).append({
+                **{column: row[column] for column in ARCHIVED_COLUMNS},
+                "spans": spans.get(row["run_id"], [])
+            })
+        index_rows = await asyncio.to_thread(self._append_blocks, groups)
+
+        async with self.db.write() as conn:
+            await conn.executemany("""
+                INSERT INTO archived_run_blocks
+                (agent_id, segment, byte_offset, byte_length, run_count, min_started_at, max_started_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, index_rows)
+            await conn.executemany(
+                "DELETE FROM agent_runs WHERE run_id = ?",
+                [(row["run_id"],) for row in rows]
+            )
+        self.archived += len(rows)
+        logger.info(f"Archived {len(rows)} runs for {len(groups)} agents into {index_rows[0][1]}")
+        return len(rows)
+
+    async def read_runs(
+        self,
+        agent_id: str,
+        limit: Optional[int] = None,
+        predicate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        started_after: Optional[str] = None,
+        started_before: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Get an agent's archived runs, newest first
+
+        Blocks are read newest first and only until no remaining block can
+        contain one of the newest ``limit`` matching runs.
+
+        Args:
+            agent_id: ID of the agent
+            limit: Maximum number of runs to return, or None for all
+            predicate: Only return runs for which this returns True
+            started_after: Skip blocks with every run started before this
+            started_before: Skip blocks with every run started after this
+
+        Returns:
+            Archived runs with task and result still JSON-encoded, and
+            their run_spans rows under "spans" unless archived before
+            spans were kept
+        """
+        where, params = ["agent_id = ?"], [agent_id]
+        if started_after is not None:
+            where.append("max_started_at >= ?")
+            params.append(started_after)
+        if started_before is not None:
+            where.append("min_started_at <= ?")
+            params.append(started_before)
+        async with self.db.read() as conn:
+            cursor = await conn.execute(f"""
+                SELECT segment, byte_offset, byte_length, max_started_at
+                FROM archived_run_blocks
+                WHERE {" AND ".join(where)}
+                ORDER BY max_started_at DESC
+            """, params)
+            blocks = await cursor.fetchall()
+
+        runs: List[Dict[str, Any]] = []
+        for block in blocks:
+            if limit is not None and len(runs) >= limit and block["max_started_at"] < runs[limit - 1]["started_at"]:
+                break
+            records = await asyncio.to_thread(
+                self._read_block, block["segment"], block["byte_offset"], block["byte_length"]
+            )
+            for run in records:
+                # Blocks written before a column was added lack it
+                for column in ARCHIVED_COLUMNS:
+                    run.setdefault(column, None)
+                # and ones archived before migration 13 may hold invalid JSON
+                for column in ("task", "result"):
+                    run[column] = checked_column(run[column])
+            runs.extend(run for run in records if predicate is None or predicate(run))
+            runs.sort(key=lambda run: (run["started_at"], run["run_id"]), reverse=True)
+            if limit is not None:
+                del runs[limit:]
+        return runs
+
+    async def read_run(self, agent_id: str, run_id: str) -> Optional[Dict[str, Any]]:
+        """Get one of an agent's archived runs, or None if it isn't archived"""
+        runs = await self.read_runs(agent_id, limit=1, predicate=lambda run: run["run_id"] == run_id)
+        return runs[0] if runs else None
+
+    def start(self, interval: float = 3600.0) -> None:
+        """Start archiving in the background every ``interval`` seconds"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(interval))
+
+    async def _run(self, interval: float) -> None:
+        """Background loop that drains old runs, then waits for the next pass"""
+        while True:
+            try:
+                if self.lease is None or await self.lease.acquire():
+                    while await self.archive_once() >= self.batch_size:
+                        pass
+            except Exception as e:
+                logger.error(f"Run archive pass failed: {e!r}")
+            await asyncio.sleep(interval)
+
+    async def close(self) -> None:
+        """Stop the background archiver"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the archived run counter and segment location"""
+        return {
+            "archived": self.archived,
+            "directory": str(self.directory),
+            "segment": self._segment.name if self._segment is not None else None,
+            "retention": self.retention
+        }
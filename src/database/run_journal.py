@@ -0,0 +1,317 @@
+# src/database/run_journal.py
+import asyncio
+import logging
+import sqlite3
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class RunJournal:
+    """Write-behind journal for agent_runs bookkeeping
+
+    Run inserts and status transitions are queued in memory and written to
+    the database in a single transaction every ``flush_interval`` seconds, or
+    as soon as ``max_batch`` runs are pending. Queued runs remain visible
+    through ``pending_runs``/``merge_runs`` until their transaction commits.
+    """
+
+    def __init__(self, database, flush_interval: float = 0.05, max_batch: int = 200):
+        self.db = database
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._flushing: Dict[str, Dict[str, Any]] = {}
+        # run_spans rows, kept apart from run records and written after them
+        self._pending_spans: Dict[str, List[Tuple]] = {}
+        self._flushing_spans: Dict[str, List[Tuple]] = {}
+        self._closed = False
+
+        # Created lazily so they bind to the loop that serves requests
+        self._has_work = None
+        self._batch_full = None
+        self._flush_lock = None
+        self._flusher = None
+
+    def record_start(
+        self,
+        run_id: str,
+        agent_id: str,
+        task: str,
+        started_at: str,
+        status: str = "running"
+    ) -> None:
+        """Queue the insert of a new run
+
+        Args:
+            run_id: ID of the run
+            agent_id: ID of the agent executing the run
+            task: JSON-encoded task
+            started_at: Start timestamp as stored in the database
+            status: Initial status, 'running' or 'queued'
+        """
+        self._enqueue(run_id, {
+            "run_id": run_id,
+            "agent_id": agent_id,
+            "task": task,
+            "status": status,
+            "result": None,
+            "started_at": started_at,
+            "completed_at": None,
+            "cache_hit": False,
+            "output": None,
+            "attempts": None,
+            "coalesced_from": None
+        })
+
+    def record_finish(
+        self,
+        run_id: str,
+        agent_id: str,
+        status: str,
+        result: Optional[str],
+        completed_at: str,
+        cache_hit: bool = False,
+        attempts: Optional[str] = None,
+        coalesced_from: Optional[str] = None
+    ) -> None:
+        """Queue a run's final status transition
+
+        Args:
+            run_id: ID of the run
+            agent_id: ID of the agent executing the run
+            status: Final status, e.g. 'completed' or 'failed'
+            result: JSON-encoded result
+            completed_at: Completion timestamp as stored in the database
+            cache_hit: Whether the result came from the LLM response cache
+            attempts: JSON-encoded LLM requests the run sent, if any
+            coalesced_from: ID of the run whose execution this one shared
+        """
+        self._enqueue(run_id, {
+            "run_id": run_id,
+            "agent_id": agent_id,
+            "status": status,
+            "result": result,
+            "completed_at": completed_at,
+            "cache_hit": cache_hit,
+            "attempts": attempts,
+            "coalesced_from": coalesced_from
+        })
+
+    def record_status(self, run_id: str, agent_id: str, status: str) -> None:
+        """Queue an intermediate status transition, e.g. 'queued' to 'running'"""
+        self._enqueue(run_id, {
+            "run_id": run_id,
+            "agent_id": agent_id,
+            "status": status
+        })
+
+    def record_output(self, run_id: str, agent_id: str, output: str) -> None:
+        """Queue the text a streaming run has produced so far"""
+        self._enqueue(run_id, {
+            "run_id": run_id,
+            "agent_id": agent_id,
+            "output": output
+        })
+
+    def record_spans(self, run_id: str, spans: List[Tuple]) -> None:
+        """Queue a finished run's run_spans rows
+
+        Args:
+            run_id: ID of the run
+            spans: (span_id, parent_id, name, start_offset, duration,
+                attributes) tuples, with attributes JSON-encoded
+        """
+        if self._closed:
+            raise RuntimeError("Run journal is closed")
+        self._ensure_flusher()
+        self._pending_spans.setdefault(run_id, []).extend(spans)
+        self._has_work.set()
+
+    def pending_spans(self, run_id: str) -> List[Tuple]:
+        """Get queued run_spans rows for a run that may not be committed yet"""
+        return self._flushing_spans.get(run_id, []) + self._pending_spans.get(run_id, [])
+
+    def _enqueue(self, run_id: str, fields: Dict[str, Any]) -> None:
+        if self._closed:
+            raise RuntimeError("Run journal is closed")
+        self._ensure_flusher()
+        # A start and finish queued in the same window collapse into one insert
+        self._pending.setdefault(run_id, {}).update(fields)
+        self._has_work.set()
+        if len(self._pending) >= self.max_batch:
+            self._batch_full.set()
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is None or self._flusher.done():
+            if self._has_work is None:
+                self._has_work = asyncio.Event()
+                self._batch_full = asyncio.Event()
+                self._flush_lock = asyncio.Lock()
+            self._flusher = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        """Background loop that commits queued records in batches"""
+        while True:
+            await self._has_work.wait()
+            try:
+                await asyncio.wait_for(self._batch_full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception:
+                # Records were requeued by flush; back off before retrying
+                await asyncio.sleep(self.flush_interval)
+
+    async def flush(self) -> None:
+        """Write all queued records in one transaction"""
+        if self._flush_lock is None:
+            return
+        async with self._flush_lock:
+            if not self._pending and not self._pending_spans:
+                return
+            batch, self._pending = self._pending, {}
+            spans, self._pending_spans = self._pending_spans, {}
+            self._has_work.clear()
+            self._batch_full.clear()
+            self._flushing = batch
+            self._flushing_spans = spans
+
+            try:
+                try:
+                    async with self.db.write() as conn:
+                        await self._write(conn, batch, spans)
+                except sqlite3.IntegrityError as e:
+                    # A record that can never be written mustn't hold back the rest
+                    logger.warning(f"Run journal batch rejected ({e}); writing runs one at a time")
+                    await self._write_each(batch, spans)
+                logger.debug(f"Flushed {len(batch)} run records and spans of {len(spans)} runs")
+            except BaseException as e:
+                logger.error(f"Failed to flush run journal: {e!r}")
+                # Requeue the batch underneath anything queued meanwhile
+                for run_id, record in batch.items():
+                    self._pending[run_id] = {**record, **self._pending.get(run_id, {})}
+                for run_id, rows in spans.items():
+                    self._pending_spans[run_id] = rows + self._pending_spans.get(run_id, [])
+                self._has_work.set()
+                raise
+            finally:
+                self._flushing = {}
+                self._flushing_spans = {}
+
+    async def _write(self, conn, batch: Dict[str, Dict[str, Any]], spans: Dict[str, List[Tuple]]) -> None:
+        """Write run records and spans in the open transaction of conn
+
+        Runs of deleted agents, and spans of deleted runs, are skipped: an
+        agent deleted while one of its runs was queued cascades its rows away.
+        """
+        inserts = [r for r in batch.values() if "task" in r]
+        updates = [r for r in batch.values() if "task" not in r]
+        if inserts:
+            await conn.executemany("""
+                INSERT INTO agent_runs
+                (run_id, agent_id, task, status, result, started_at, completed_at,
+                 cache_hit, output, attempts, coalesced_from)
+                SELECT ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
+                WHERE EXISTS (SELECT 1 FROM agents WHERE agent_id = ?)
+            """, [(
+                r["run_id"], r["agent_id"], r["task"], r["status"],
+                r["result"], r["started_at"], r["completed_at"], int(r["cache_hit"]),
+                r.get("output"), r.get("attempts"), r.get("coalesced_from"), r["agent_id"]
+            ) for r in inserts])
+        if updates:
+            # Columns a record doesn't carry keep their stored value
+            await conn.executemany("""
+                UPDATE agent_runs
+                SET status = COALESCE(?, status),
+                    result = COALESCE(?, result),
+                    completed_at = COALESCE(?, completed_at),
+                    cache_hit = COALESCE(?, cache_hit),
+                    output = COALESCE(?, output),
+                    attempts = COALESCE(?, attempts),
+                    coalesced_from = COALESCE(?, coalesced_from)
+                WHERE run_id = ?
+            """, [(
+                r.get("status"), r.get("result"), r.get("completed_at"),
+                int(r["cache_hit"]) if "cache_hit" in r else None,
+                r.get("output"), r.get("attempts"), r.get("coalesced_from"), r["run_id"]
+            ) for r in updates])
+        if spans:
+            # After the inserts, so each span's run row exists
+            await conn.executemany("""
+                INSERT OR REPLACE INTO run_spans
+                (run_id, span_id, parent_id, name, start_offset, duration, attributes)
+                SELECT ?, ?, ?, ?, ?, ?, ?
+                WHERE EXISTS (SELECT 1 FROM agent_runs WHERE run_id = ?)
+            """, [
+                (run_id, *row, run_id) for run_id, rows in spans.items() for row in rows
+            ])
+
+    async def _write_each(self, batch: Dict[str, Dict[str, Any]], spans: Dict[str, List[Tuple]]) -> None:
+        """Write each run's record and spans in its own transaction, dropping
+        runs the database rejects"""
+        for run_id in list(dict.fromkeys([*batch, *spans])):
+            record = {run_id: batch[run_id]} if run_id in batch else {}
+            rows = {run_id: spans[run_id]} if run_id in spans else {}
+            try:
+                async with self.db.write() as conn:
+                    await self._write(conn, record, rows)
+            except sqlite3.IntegrityError as e:
+                logger.error(f"Dropping journaled run {run_id}: {e}")
+            batch.pop(run_id, None)
+            spans.pop(run_id, None)
+
+    def discard_agent(self, agent_id: str) -> None:
+        """Drop queued records and spans of an agent's runs, e.g. before it is deleted"""
+        run_ids = [run_id for run_id, record in self._pending.items() if record["agent_id"] == agent_id]
+        for run_id in run_ids:
+            del self._pending[run_id]
+            self._pending_spans.pop(run_id, None)
+
+    def pending_runs(self, agent_id: str) -> List[Dict[str, Any]]:
+        """Get queued runs for an agent that may not be committed yet
+
+        Take this snapshot before querying agent_runs so a batch committing
+        during the query is still seen from one side or the other.
+        """
+        runs = {}
+        for source in (self._flushing, self._pending):
+            for run_id, record in source.items():
+                if record["agent_id"] == agent_id:
+                    runs[run_id] = {**runs.get(run_id, {}), **record}
+        return list(runs.values())
+
+    def pending_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Get the queued changes for one run, or None if nothing is queued"""
+        records = [source[run_id] for source in (self._flushing, self._pending) if run_id in source]
+        if not records:
+            return None
+        run = {}
+        for record in records:
+            run.update(record)
+        return run
+
+    @staticmethod
+    def merge_runs(rows, pending: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Overlay queued runs on agent_runs rows, newest first"""
+        if not pending:
+            return list(rows)
+        merged = {row["run_id"]: dict(row) for row in rows}
+        for record in pending:
+            run = {**merged.get(record["run_id"], {}), **record}
+            # A bare status update whose row fell outside the query is skipped
+            if "started_at" in run:
+                merged[record["run_id"]] = run
+        return sorted(merged.values(), key=lambda run: run["started_at"], reverse=True)
+
+    async def close(self) -> None:
+        """Stop the background flusher and write everything still queued"""
+        self._closed = True
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
@@ -0,0 +1,343 @@
+# src/llm/client_registry.py
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, fields
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from src.config.app_config import get_section
+from src.core.metrics import REGISTRY
+from src.core.tracing import span
+from .providers import LLMProvider, OpenAIProvider, SimulatedProvider
+from .resilience import LatencyTracker
+from .scheduler import ModelScheduler, RateBudget, classify_error
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+LLM_WAIT_SECONDS = REGISTRY.histogram(
+    "llm_slot_wait_seconds",
+    "Time LLM calls waited for a free per-model request slot",
+    ("model",)
+)
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    "llm_request_duration_seconds",
+    "Time LLM calls held a request slot, i.e. the call itself",
+    ("model",)
+)
+
+@dataclass
+class ModelLimits:
+    """Concurrency, rate and timeout limits for calls to one model
+
+    max_in_flight is the ceiling of the adaptive concurrency limit, which
+    drops by ``decrease`` on overload but never below min_in_flight. Rates
+    are per minute, None for unlimited, and belong to the API key named by
+    ``api_key``: in the registry every model on a key shares one budget,
+    set under ``llm.api_keys`` or else by the default limits' rates. After
+    a 429 without Retry-After the key is paused for ``cooldown`` seconds,
+    and the call is requeued up to max_requeues times before its error is
+    raised.
+    """
+    max_in_flight: int = 16
+    timeout: float = 60.0
+    min_in_flight: int = 1
+    requests_per_minute: Optional[float] = None
+    tokens_per_minute: Optional[float] = None
+    decrease: float = 0.5
+    cooldown: float = 1.0
+    max_requeues: int = 3
+    api_key: str = "default"
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], base: Optional['ModelLimits'] = None) -> 'ModelLimits':
+        """Create limits from config, inheriting unset values from base"""
+        base = base or cls()
+        values = {f.name: getattr(base, f.name) for f in fields(cls)}
+        values.update({k: v for k, v in (data or {}).items() if k in values})
+        return cls(
+            max_in_flight=int(values['max_in_flight']),
+            timeout=float(values['timeout']),
+            min_in_flight=int(values['min_in_flight']),
+            requests_per_minute=(
+                float(values['requests_per_minute']) if values['requests_per_minute'] else None
+            ),
+            tokens_per_minute=float(values['tokens_per_minute']) if values['tokens_per_minute'] else None,
+            decrease=float(values['decrease']),
+            cooldown=float(values['cooldown']),
+            max_requeues=int(values['max_requeues']),
+            api_key=str(values['api_key'])
+        )
+
+# Builders for the providers agents can select by name, from their config section
+PROVIDER_FACTORIES: Dict[str, Callable[['LLMClientRegistry', Dict[str, Any]], LLMProvider]] = {
+    "openai": lambda registry, config: OpenAIProvider(registry.get_client),
+    "simulated": lambda registry, config: SimulatedProvider.from_config(config),
+}
+
+class LLMClientRegistry:
+    """Process-wide shared LLM client with per-model concurrency limits
+
+    A single AsyncOpenAI client (and its keep-alive connection pool) is
+    reused for every call; ``slot(model)`` queues calls through the model's
+    ModelScheduler, which enforces its adaptive concurrency limit and the
+    rate budget of its API key, shared per (provider, api_key) with the
+    other models on the key, and supplies the model's timeout.
+    ``get_provider(name)`` returns the backend an agent's config selects,
+    created once from the ``llm.providers`` section.
+    """
+
+    def __init__(
+        self,
+        default_limits: Optional[ModelLimits] = None,
+        model_limits: Optional[Dict[str, ModelLimits]] = None,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        client_factory: Optional[Callable[[], Any]] = None,
+        default_provider: str = "openai",
+        provider_settings: Optional[Dict[str, Dict[str, Any]]] = None,
+        api_keys: Optional[Dict[str, Dict[str, Any]]] = None
+    ):
+        self.default_limits = default_limits or ModelLimits()
+        self.model_limits = model_limits or {}
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self._client_factory = client_factory or self._create_openai_client
+        self._client = None
+        # Keyed by (provider, model)
+        self._schedulers: Dict[Tuple[str, str], ModelScheduler] = {}
+        # Rate budgets per API key, by name
+        self.api_keys = api_keys or {}
+        self._budgets: Dict[Tuple[str, str], RateBudget] = {}
+        self._latencies: Dict[str, LatencyTracker] = {}
+        self.default_provider = default_provider
+        self.provider_settings = provider_settings or {}
+        self._providers: Dict[str, LLMProvider] = {}
+        # Optional ResponseCache for deterministic requests, set by the app
+        self.response_cache = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'LLMClientRegistry':
+        """Create a registry from the ``llm`` section of config.yaml"""
+        default_limits = ModelLimits.from_dict(config.get('default'))
+        model_limits = {
+            model: ModelLimits.from_dict(limits, default_limits)
+            for model, limits in (config.get('models') or {}).items()
+        }
+        return cls(
+            default_limits=default_limits,
+            model_limits=model_limits,
+            max_connections=int(config.get('max_connections', 100)),
+            max_keepalive_connections=int(config.get('max_keepalive_connections', 20)),
+            default_provider=config.get('default_provider', 'openai'),
+            provider_settings=config.get('providers') or {},
+            api_keys=config.get('api_keys') or {}
+        )
+
+    def _create_openai_client(self):
+        """Create the shared AsyncOpenAI client with a bounded keep-alive pool"""
+        import httpx
+        from openai import AsyncOpenAI
+
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections
+            ),
+            timeout=self.default_limits.timeout
+        )
+        return AsyncOpenAI(http_client=http_client)
+
+    def get_client(self):
+        """Get the shared client, creating it on first use"""
+        if self._client is None:
+            self._client = self._client_factory()
+        return self._client
+
+    def register_provider(self, name: str, provider: LLMProvider) -> None:
+        """Make a provider instance selectable by name, replacing any existing one"""
+        self._providers[name] = provider
+
+    def get_provider(self, name: Optional[str] = None) -> LLMProvider:
+        """Get a provider by name, or the default provider
+
+        Raises:
+            ValueError: If no provider of that name is registered or known
+        """
+        name = name or self.default_provider
+        provider = self._providers.get(name)
+        if provider is None:
+            factory = PROVIDER_FACTORIES.get(name)
+            if factory is None:
+                raise ValueError(f"Unknown LLM provider: {name}")
+            provider = self._providers[name] = factory(self, self.provider_settings.get(name) or {})
+        return provider
+
+    def limits_for(self, model: str) -> ModelLimits:
+        """Get the configured limits for a model"""
+        return self.model_limits.get(model, self.default_limits)
+
+    def budget_for(self, provider: str, api_key: str) -> RateBudget:
+        """Get the rate budget of an API key, creating it on first use"""
+        budget = self._budgets.get((provider, api_key))
+        if budget is None:
+            rates = {
+                "requests_per_minute": self.default_limits.requests_per_minute,
+                "tokens_per_minute": self.default_limits.tokens_per_minute,
+                **(self.api_keys.get(api_key) or {})
+            }
+            budget = self._budgets[(provider, api_key)] = RateBudget(
+                float(rates["requests_per_minute"]) if rates["requests_per_minute"] else None,
+                float(rates["tokens_per_minute"]) if rates["tokens_per_minute"] else None
+            )
+        return budget
+
+    def _model_label(self, provider: str, model: str) -> str:
+        return model if provider == self.default_provider else f"{provider}:{model}"
+
+    def scheduler_for(self, model: str, provider: Optional[str] = None) -> ModelScheduler:
+        """Get the scheduler for a model, creating it on first use
+
+        Args:
+            model: Model the calls go to
+            provider: Provider the calls are sent through; defaults to the
+                default provider
+        """
+        provider = provider or self.default_provider
+        scheduler = self._schedulers.get((provider, model))
+        if scheduler is None:
+            limits = self.limits_for(model)
+            scheduler = ModelScheduler(limits, self.budget_for(provider, limits.api_key))
+            label = self._model_label(provider, model)
+            scheduler.wait_time = LLM_WAIT_SECONDS.labels(label)
+            scheduler.request_time = LLM_REQUEST_SECONDS.labels(label)
+            self._schedulers[(provider, model)] = scheduler
+        return scheduler
+
+    def latency_for(self, model: str) -> LatencyTracker:
+        """Get the recent request latencies of a model, which set its hedge delay"""
+        latencies = self._latencies.get(model)
+        if latencies is None:
+            latencies = self._latencies[model] = LatencyTracker()
+        return latencies
+
+    @asynccontextmanager
+    async def slot(self, model: str, tokens: float = 0, provider: Optional[str] = None):
+        """Wait for the model's scheduler to admit a call
+
+        An error raised in the block is reported to the scheduler, so 429s,
+        5xx responses and timeouts lower the model's concurrency limit.
+
+        Args:
+            model: Model the call goes to
+            tokens: Estimated prompt plus completion tokens, charged to the
+                token budget of the model's API key
+            provider: Provider the call is sent through, as for scheduler_for
+
+        Usage:
+            async with registry.slot(model) as limits:
+                await client.chat.completions.create(..., timeout=limits.timeout)
+        """
+        scheduler = self.scheduler_for(model, provider)
+        start = time.perf_counter()
+        with span("llm_slot_wait", model=model):
+            started = await scheduler.acquire(tokens)
+        acquired = time.perf_counter()
+        scheduler.wait_time.observe(acquired - start)
+        error = None
+        try:
+            yield scheduler.limits
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            scheduler.request_time.observe(time.perf_counter() - acquired)
+            scheduler.release(started, error)
+
+    async def run(
+        self,
+        model: str,
+        call: Callable[[ModelLimits], Awaitable[T]],
+        tokens: float = 0,
+        can_requeue: Optional[Callable[[], bool]] = None,
+        provider: Optional[str] = None
+    ) -> T:
+        """Run ``call(limits)`` in a slot, requeueing it when rate limited
+
+        A call rejected with 429 goes back into the model's queue, behind the
+        pause the rejection triggered, up to the model's max_requeues times.
+
+        Args:
+            model: Model the call goes to
+            call: Coroutine function making the request
+            tokens: Estimated tokens of the call, as for slot
+            can_requeue: Returns False once the call has had visible effects,
+                e.g. streamed output, and must not be repeated
+            provider: Provider the call is sent through, as for scheduler_for
+
+        Raises:
+            Exception: The call's error, if it isn't a 429 or can't be requeued
+        """
+        scheduler = self.scheduler_for(model, provider)
+        requeues = 0
+        while True:
+            try:
+                async with self.slot(model, tokens, provider) as limits:
+                    return await call(limits)
+            except Exception as e:
+                _, rate_limited, _ = classify_error(e)
+                if (
+                    not rate_limited
+                    or requeues >= scheduler.limits.max_requeues
+                    or (can_requeue is not None and not can_requeue())
+                ):
+                    raise
+                requeues += 1
+                scheduler.requeued += 1
+                logger.info(
+                    f"Requeueing rate-limited call to {model} "
+                    f"({requeues}/{scheduler.limits.max_requeues})"
+                )
+
+    def stats(self) -> Dict[str, Any]:
+        """Get limits, queue depth and saturation per model, and budgets per API key
+
+        Models are named as is for the default provider, else as provider:model.
+        """
+        models = {
+            self._model_label(provider, model): scheduler.stats()
+            for (provider, model), scheduler in self._schedulers.items()
+        }
+        for model, latencies in self._latencies.items():
+            p95 = latencies.quantile(0.95)
+            if model in models:
+                models[model]["p95_ms"] = round(p95 * 1000, 1) if p95 is not None else None
+        return {
+            "max_connections": self.max_connections,
+            "max_keepalive_connections": self.max_keepalive_connections,
+            "in_flight": sum(scheduler.in_flight for scheduler in self._schedulers.values()),
+            "waiting": sum(scheduler.waiting for scheduler in self._schedulers.values()),
+            "models": models,
+            "api_keys": {f"{provider}:{key}": budget.stats() for (provider, key), budget in self._budgets.items()},
+            "providers": sorted(self._providers),
+            "response_cache": self.response_cache.stats() if self.response_cache is not None else None
+        }
+
+    async def close(self) -> None:
+        """Close the providers, then the shared client and its connections"""
+        for provider in self._providers.values():
+            await provider.close()
+        self._providers.clear()
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+_registry: Optional[LLMClientRegistry] = None
+
+def get_llm_registry() -> LLMClientRegistry:
+    """Get the process-wide registry, configured from config.yaml"""
+    global _registry
+    if _registry is None:
+        _registry = LLMClientRegistry.from_config(get_section('llm'))
+    return _registry
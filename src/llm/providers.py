@@ -0,0 +1,225 @@
+# src/llm/providers.py
+import asyncio
+import hashlib
+import logging
+import math
+import random
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Union
+
+from src.core.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class CompletionRequest:
+    """One chat completion request, independent of the provider serving it"""
+    model: str
+    messages: List[Dict[str, Any]]
+    temperature: float = 0.7
+    timeout: Optional[float] = None
+    max_tokens: Optional[int] = None
+
+@dataclass
+class Completion:
+    """Text of a finished completion plus token usage, when known"""
+    text: str
+    model: str
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    finish_reason: Optional[str] = None
+
+class LLMProviderError(Exception):
+    """A provider failed to produce a completion
+
+    status_code mirrors the HTTP status an API would have returned, so the
+    scheduler treats simulated and real failures alike.
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+class LLMProvider:
+    """Interface for a backend that serves chat completions
+
+    Subclasses implement complete and stream; batch runs completions
+    concurrently unless a backend has a native batch API.
+    """
+
+    name = "base"
+
+    async def complete(self, request: CompletionRequest) -> Completion:
+        """Generate a whole completion"""
+        raise NotImplementedError("LLM providers must implement complete")
+
+    def stream(self, request: CompletionRequest) -> AsyncIterator[str]:
+        """Generate a completion as text deltas, in order"""
+        raise NotImplementedError("LLM providers must implement stream")
+
+    async def batch(self, requests: Sequence[CompletionRequest]) -> List[Union[Completion, Exception]]:
+        """Generate completions for many requests
+
+        Returns:
+            One entry per request, in order: its Completion, or the
+            exception that request failed with
+        """
+        return await asyncio.gather(*(self.complete(r) for r in requests), return_exceptions=True)
+
+    async def close(self) -> None:
+        """Release connections held by the provider"""
+
+class OpenAIProvider(LLMProvider):
+    """Chat completions from the OpenAI API, or any compatible server
+
+    Args:
+        client_getter: Returns the shared AsyncOpenAI client; called per
+            request so the client can be created lazily and replaced
+    """
+
+    name = "openai"
+
+    def __init__(self, client_getter: Callable[[], Any]):
+        self._client_getter = client_getter
+
+    def _arguments(self, request: CompletionRequest) -> Dict[str, Any]:
+        arguments = {
+            "model": request.model,
+            "messages": request.messages,
+            "temperature": request.temperature,
+            "timeout": request.timeout
+        }
+        if request.max_tokens is not None:
+            arguments["max_tokens"] = request.max_tokens
+        return arguments
+
+    async def complete(self, request: CompletionRequest) -> Completion:
+        response = await self._client_getter().chat.completions.create(**self._arguments(request))
+        choice = response.choices[0]
+        usage = getattr(response, "usage", None)
+        return Completion(
+            text=choice.message.content,
+            model=request.model,
+            prompt_tokens=getattr(usage, "prompt_tokens", None),
+            completion_tokens=getattr(usage, "completion_tokens", None),
+            finish_reason=getattr(choice, "finish_reason", None)
+        )
+
+    async def stream(self, request: CompletionRequest) -> AsyncIterator[str]:
+        stream = await self._client_getter().chat.completions.create(
+            **self._arguments(request), stream=True
+        )
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
+
+# Vocabulary of SimulatedProvider completions
+_WORDS = (
+    "once upon a time there was a small brave fox who lived near a quiet river "
+    "and every morning the fox walked with friends to find berries under tall trees "
+    "until one day a lost bird asked for help and they learned that kindness matters"
+).split()
+
+@dataclass(eq=False)
+class SimulatedProvider(LLMProvider):
+    """In-process backend producing deterministic text at a set pace
+
+    The same model, messages and temperature always produce the same text,
+    so cached and uncached runs can be compared. Latency to the first token
+    is drawn from ``distribution`` ('fixed', 'normal' or 'lognormal', with
+    ``latency`` as the mean or median and ``jitter`` as the standard
+    deviation or sigma); tokens then arrive at ``tokens_per_second``, in
+    chunks of ``chunk_tokens`` when streaming. ``error_rate`` of requests
+    fail with a 503 and ``rate_limit_rate`` with a 429. No network is used.
+    """
+
+    tokens_per_second: float = 50.0
+    latency: float = 0.3
+    jitter: float = 0.1
+    distribution: str = "lognormal"
+    completion_tokens: int = 200
+    chunk_tokens: int = 1
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    seed: int = 0
+    _rng: random.Random = field(init=False, repr=False)
+
+    name = "simulated"
+
+    DISTRIBUTIONS = ("fixed", "normal", "lognormal")
+
+    def __post_init__(self):
+        if self.distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution {self.distribution!r}")
+        self._rng = random.Random(self.seed)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'SimulatedProvider':
+        """Create a provider from its ``llm.providers.simulated`` section"""
+        return cls(
+            tokens_per_second=float(config.get("tokens_per_second", 50.0)),
+            latency=float(config.get("latency", 0.3)),
+            jitter=float(config.get("jitter", 0.1)),
+            distribution=config.get("distribution", "lognormal"),
+            completion_tokens=int(config.get("completion_tokens", 200)),
+            chunk_tokens=int(config.get("chunk_tokens", 1)),
+            error_rate=float(config.get("error_rate", 0.0)),
+            rate_limit_rate=float(config.get("rate_limit_rate", 0.0)),
+            seed=int(config.get("seed", 0))
+        )
+
+    def sample_latency(self) -> float:
+        """Draw a time to first token in seconds"""
+        if self.distribution == "fixed":
+            return self.latency
+        if self.distribution == "normal":
+            return max(0.0, self._rng.gauss(self.latency, self.jitter))
+        return self.latency * math.exp(self._rng.gauss(0.0, self.jitter))
+
+    def tokens_for(self, request: CompletionRequest) -> List[str]:
+        """Get the deterministic completion tokens for a request"""
+        digest = hashlib.sha256(
+            dumps([request.model, request.messages, request.temperature]).encode()
+        ).digest()
+        rng = random.Random(digest)
+        count = request.max_tokens or self.completion_tokens
+        return [rng.choice(_WORDS) for _ in range(count)]
+
+    def _check_error(self, request: CompletionRequest) -> None:
+        if self.rate_limit_rate and self._rng.random() < self.rate_limit_rate:
+            raise LLMProviderError(f"Simulated rate limit for model {request.model}", status_code=429)
+        if self.error_rate and self._rng.random() < self.error_rate:
+            raise LLMProviderError(f"Simulated failure for model {request.model}", status_code=503)
+
+    async def _sleep(self, seconds: float, request: CompletionRequest) -> None:
+        if request.timeout is not None and seconds > request.timeout:
+            await asyncio.sleep(request.timeout)
+            raise asyncio.TimeoutError(f"Simulated request exceeded {request.timeout}s")
+        await asyncio.sleep(seconds)
+
+    async def complete(self, request: CompletionRequest) -> Completion:
+        self._check_error(request)
+        tokens = self.tokens_for(request)
+        duration = self.sample_latency()
+        if self.tokens_per_second > 0:
+            duration += len(tokens) / self.tokens_per_second
+        await self._sleep(duration, request)
+        return Completion(
+            text=" ".join(tokens),
+            model=request.model,
+            prompt_tokens=sum(len(str(m.get("content", "")).split()) for m in request.messages),
+            completion_tokens=len(tokens),
+            finish_reason="length" if request.max_tokens else "stop"
+        )
+
+    async def stream(self, request: CompletionRequest) -> AsyncIterator[str]:
+        self._check_error(request)
+        tokens = self.tokens_for(request)
+        await self._sleep(self.sample_latency(), request)
+        step = max(1, self.chunk_tokens)
+        for i in range(0, len(tokens), step):
+            chunk = tokens[i:i + step]
+            if self.tokens_per_second > 0:
+                await asyncio.sleep(len(chunk) / self.tokens_per_second)
+            yield (" " if i else "") + " ".join(chunk)
@@ -0,0 +1,318 @@
+# src/llm/resilience.py
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, fields, replace
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+
+from src.config.app_config import get_section
+from src.core.metrics import REGISTRY
+from src.core.run_context import get_current_run
+from src.core.tracing import span
+from .scheduler import classify_error
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+LLM_ATTEMPTS = REGISTRY.counter(
+    "llm_attempts",
+    "LLM requests by kind (primary, retry or hedge) and outcome",
+    ("model", "kind", "outcome")
+)
+
+@dataclass
+class ResiliencePolicy:
+    """How an agent type's LLM calls recover from slow and failed requests
+
+    Each attempt is cut off after attempt_timeout seconds, or the model's
+    timeout if that is shorter or attempt_timeout is None; streamed attempts
+    are instead cut off when the first chunk, or the next one, takes that
+    long, so a long answer that keeps arriving is never abandoned. Retryable
+    failures are tried again up to max_attempts in total, sleeping a random
+    time between 0 and ``backoff_base * 2 ** (attempt - 1)`` seconds,
+    capped at backoff_max.
+    With hedge, a duplicate request is started when an attempt has run for
+    hedge_after seconds, or by default for the model's observed
+    hedge_quantile latency once hedge_min_samples calls have completed;
+    whichever finishes first wins and the other is cancelled.
+    """
+    attempt_timeout: Optional[float] = None
+    max_attempts: int = 1
+    backoff_base: float = 0.5
+    backoff_max: float = 10.0
+    hedge: bool = False
+    hedge_after: Optional[float] = None
+    hedge_quantile: float = 0.95
+    hedge_min_samples: int = 20
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], base: Optional['ResiliencePolicy'] = None) -> 'ResiliencePolicy':
+        """Create a policy from config, inheriting unset values from base"""
+        base = base or cls()
+        values = {f.name: getattr(base, f.name) for f in fields(cls)}
+        values.update({k: v for k, v in (data or {}).items() if k in values})
+        return cls(
+            attempt_timeout=float(values['attempt_timeout']) if values['attempt_timeout'] else None,
+            max_attempts=max(1, int(values['max_attempts'])),
+            backoff_base=float(values['backoff_base']),
+            backoff_max=float(values['backoff_max']),
+            hedge=bool(values['hedge']),
+            hedge_after=float(values['hedge_after']) if values['hedge_after'] is not None else None,
+            hedge_quantile=float(values['hedge_quantile']),
+            hedge_min_samples=int(values['hedge_min_samples'])
+        )
+
+class LatencyTracker:
+    """Latencies of a model's most recent successful requests"""
+
+    def __init__(self, size: int = 500):
+        self._samples = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Get the nearest-rank quantile of the recent latencies, None when empty"""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, max(0, int(q * len(ordered) + 0.5) - 1))]
+
+async def chunks_with_timeout(chunks: AsyncIterator[T], timeout: float) -> AsyncIterator[T]:
+    """Pass on the chunks of a stream, failing if any takes over timeout seconds
+
+    Used by streaming calls under call_with_policy(stream=True), which bounds
+    time to first token and the gaps between chunks rather than the whole
+    stream.
+
+    Raises:
+        asyncio.TimeoutError: If the first or next chunk doesn't arrive in time
+    """
+    iterator = chunks.__aiter__()
+    try:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(iterator.__anext__(), timeout)
+            except StopAsyncIteration:
+                return
+            yield chunk
+    finally:
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+def is_retryable(error: BaseException) -> bool:
+    """Tell whether a failed LLM request may succeed if sent again
+
+    Overload responses (429, 5xx), timeouts and connection failures are
+    retryable; other errors, e.g. invalid requests, are not.
+    """
+    overloaded, _, _ = classify_error(error)
+    return overloaded or "Connection" in type(error).__name__
+
+def _error_outcome(error: BaseException) -> str:
+    if isinstance(error, asyncio.TimeoutError) or "Timeout" in type(error).__name__:
+        return "timeout"
+    return "error"
+
+class _PolicyCall:
+    """One logical LLM call executed under a ResiliencePolicy"""
+
+    def __init__(self, registry, model, call, policy, tokens, can_retry, hedge, provider=None, stream=False):
+        self.registry = registry
+        self.model = model
+        self.provider = provider
+        self.stream = stream
+        self.call = call
+        self.policy = policy
+        self.tokens = tokens
+        self.can_retry = can_retry
+        self.hedge = hedge and policy.hedge
+        self.latencies = registry.latency_for(model)
+        self.run = get_current_run()
+        self.origin = time.perf_counter()
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds an attempt may run before it is hedged, None for never"""
+        if not self.hedge:
+            return None
+        if self.policy.hedge_after is not None:
+            return self.policy.hedge_after
+        if len(self.latencies) < self.policy.hedge_min_samples:
+            return None
+        return self.latencies.quantile(self.policy.hedge_quantile)
+
+    def should_retry(self, error: BaseException) -> bool:
+        return is_retryable(error) and (self.can_retry is None or self.can_retry())
+
+    def _before_sleep(self, state) -> None:
+        logger.warning(
+            f"Retrying call to {self.model} in {state.next_action.sleep:.2f}s "
+            f"after attempt {state.attempt_number} failed: {state.outcome.exception()!r}"
+        )
+
+    async def execute(self):
+        # Imported here as tenacity is slow to import and only needed once a call is made
+        from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+        retrying = AsyncRetrying(
+            stop=stop_after_attempt(self.policy.max_attempts),
+            wait=wait_random_exponential(multiplier=self.policy.backoff_base, max=self.policy.backoff_max),
+            retry=retry_if_exception(self.should_retry),
+            before_sleep=self._before_sleep,
+            reraise=True
+        )
+        result = None
+        async for attempt in retrying:
+            with attempt:
+                result = await self._attempt(attempt.retry_state.attempt_number)
+        return result
+
+    async def _attempt(self, number: int):
+        """Send one attempt, hedging it if it runs past the hedge delay"""
+        delay = self.hedge_delay()
+        if delay is None:
+            return await self._request(number, False)
+
+        admitted = asyncio.Event()
+        primary = asyncio.ensure_future(self._request(number, False, admitted))
+        admission = asyncio.ensure_future(admitted.wait())
+        pending = {primary}
+        try:
+            # The hedge timer starts once the primary is admitted, so time
+            # queued behind the model's limits never triggers a hedge
+            await asyncio.wait({primary, admission}, return_when=asyncio.FIRST_COMPLETED)
+            if not primary.done():
+                await asyncio.wait({primary}, timeout=delay)
+            if primary.done():
+                return primary.result()
+
+            pending.add(asyncio.ensure_future(self._request(number, True)))
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            admission.cancel()
+            # The loser, or both requests if the caller was cancelled
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _request(self, number: int, hedge: bool, admitted: Optional[asyncio.Event] = None):
+        """Send one request through the model's scheduler and record it"""
+        kind = "hedge" if hedge else ("retry" if number > 1 else "primary")
+        started = time.perf_counter()
+        admitted_at = None
+
+        async def timed(limits):
+            nonlocal admitted_at
+            admitted_at = time.perf_counter()
+            if admitted is not None:
+                admitted.set()
+            if self.policy.attempt_timeout is not None and self.policy.attempt_timeout < limits.timeout:
+                limits = replace(limits, timeout=self.policy.attempt_timeout)
+            if self.stream:
+                # The call bounds each chunk with chunks_with_timeout
+                return await self.call(limits)
+            return await asyncio.wait_for(self.call(limits), limits.timeout)
+
+        record = {
+            "model": self.model,
+            "attempt": number,
+            "hedge": hedge,
+            "start_ms": round((started - self.origin) * 1000, 3)
+        }
+        outcome = "error"
+        try:
+            with span("llm_attempt", attempt=number, hedge=hedge):
+                result = await self.registry.run(
+                    self.model, timed, self.tokens, self.can_retry, provider=self.provider
+                )
+            outcome = "ok"
+            self.latencies.observe(time.perf_counter() - admitted_at)
+            return result
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        except Exception as e:
+            outcome = _error_outcome(e)
+            record["error"] = type(e).__name__
+            raise
+        finally:
+            finished = time.perf_counter()
+            record["outcome"] = outcome
+            record["duration_ms"] = round((finished - started) * 1000, 3)
+            record["queued_ms"] = round((admitted_at - started) * 1000, 3) if admitted_at else None
+            LLM_ATTEMPTS.labels(self.model, kind, outcome).inc()
+            if self.run is not None:
+                self.run.attempts.append(record)
+
+async def call_with_policy(
+    registry,
+    model: str,
+    call: Callable[[Any], Awaitable[T]],
+    policy: ResiliencePolicy,
+    tokens: float = 0,
+    can_retry: Optional[Callable[[], bool]] = None,
+    hedge: bool = True,
+    provider: Optional[str] = None,
+    stream: bool = False
+) -> T:
+    """Run ``call(limits)`` through the registry with timeouts, retries and hedging
+
+    Every request sent, including retries, hedges and cancelled losers, is
+    appended to the attempts of the run executing in this task.
+
+    Args:
+        registry: LLMClientRegistry whose schedulers admit the requests
+        model: Model the call goes to
+        call: Coroutine function making one request with the given limits
+        policy: Timeout, retry and hedging policy to apply
+        tokens: Estimated tokens of one request, as for registry.run
+        can_retry: Returns False once the call has had visible effects,
+            e.g. streamed output, and must not be repeated
+        hedge: Whether duplicate requests are safe, e.g. False when streaming
+        provider: Name of the provider the requests go through, which with
+            the model's api_key selects the rate budget they are charged to
+        stream: Whether call streams its answer; the attempt timeout then
+            isn't applied to the whole call, which must read the stream
+            through chunks_with_timeout(chunks, limits.timeout)
+
+    Raises:
+        Exception: The last attempt's error once retries are exhausted, or
+            the first non-retryable error
+    """
+    return await _PolicyCall(
+        registry, model, call, policy, tokens, can_retry, hedge, provider, stream
+    ).execute()
+
+_policies: Optional[Dict[str, ResiliencePolicy]] = None
+_default_policy: Optional[ResiliencePolicy] = None
+
+def load_policies(config: Dict[str, Any]) -> None:
+    """Set the policies from the ``resilience`` section of config.yaml
+
+    Policies under ``agent_types`` inherit unset values from ``default``.
+    """
+    global _policies, _default_policy
+    _default_policy = ResiliencePolicy.from_dict(config.get('default'))
+    _policies = {
+        agent_type: ResiliencePolicy.from_dict(policy, _default_policy)
+        for agent_type, policy in (config.get('agent_types') or {}).items()
+    }
+
+def get_policy(agent_type: str) -> ResiliencePolicy:
+    """Get the resilience policy for an agent type, configured from config.yaml"""
+    if _policies is None:
+        load_policies(get_section('resilience'))
+    return _policies.get(agent_type, _default_policy)
@@ -0,0 +1,128 @@
+# src/llm/response_cache.py
+import hashlib
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from src.core.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+class ResponseCache:
+    """Content-addressed cache of LLM completions stored in SQLite
+
+    Entries are keyed on the model, messages and sampling parameters of a
+    request. They expire ``ttl`` seconds after being stored, and the least
+    recently used entries are evicted once the cache exceeds ``max_bytes``.
+    """
+
+    # Hits only refresh last_used_at when it is older than this, so popular
+    # entries don't cost a write per hit
+    TOUCH_INTERVAL = 60.0
+    # Seconds between recounts of the stored bytes, which other worker
+    # processes sharing the database change without this one knowing
+    RECOUNT_INTERVAL = 30.0
+
+    def __init__(self, database, max_bytes: int = 64 * 1024 * 1024, ttl: float = 7 * 24 * 3600):
+        self.db = database
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._total_bytes: Optional[int] = None
+        self._counted_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+        """Hash a request into its cache key"""
+        payload = dumps({"model": model, "messages": messages, "params": params}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        """Get a cached response, or None if it is missing or expired"""
+        async with self.db.read() as conn:
+            cursor = await conn.execute(
+                "SELECT response, created_at, last_used_at FROM llm_response_cache WHERE cache_key = ?",
+                (key,)
+            )
+            row = await cursor.fetchone()
+        now = time.time()
+        if row is None or now - row["created_at"] >= self.ttl:
+            self.misses += 1
+            if row is not None:
+                await self._delete(key)
+            return None
+
+        self.hits += 1
+        if now - row["last_used_at"] >= self.TOUCH_INTERVAL:
+            async with self.db.write() as conn:
+                await conn.execute(
+                    "UPDATE llm_response_cache SET last_used_at = ? WHERE cache_key = ?",
+                    (now, key)
+                )
+        return row["response"]
+
+    async def put(self, key: str, model: str, response: str) -> None:
+        """Store a response, evicting least recently used entries if over budget"""
+        size = len(response.encode())
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        async with self.db.write() as conn:
+            if self._total_bytes is None or time.monotonic() - self._counted_at >= self.RECOUNT_INTERVAL:
+                cursor = await conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_response_cache")
+                self._total_bytes = (await cursor.fetchone())[0]
+                self._counted_at = time.monotonic()
+            cursor = await conn.execute(
+                "SELECT size FROM llm_response_cache WHERE cache_key = ?", (key,)
+            )
+            existing = await cursor.fetchone()
+            await conn.execute("""
+                INSERT OR REPLACE INTO llm_response_cache
+                (cache_key, model, response, size, created_at, last_used_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (key, model, response, size, now, now))
+            self._total_bytes += size - (existing["size"] if existing else 0)
+
+            # Drop expired entries first, then the least recently used ones
+            while self._total_bytes > self.max_bytes:
+                cursor = await conn.execute("""
+                    SELECT cache_key, size FROM llm_response_cache
+                    WHERE cache_key != ?
+                    ORDER BY created_at < ? DESC, last_used_at
+                    LIMIT 64
+                """, (key, now - self.ttl))
+                candidates = await cursor.fetchall()
+                if not candidates:
+                    break
+                victims = []
+                for candidate in candidates:
+                    if self._total_bytes <= self.max_bytes:
+                        break
+                    victims.append((candidate["cache_key"],))
+                    self._total_bytes -= candidate["size"]
+                await conn.executemany("DELETE FROM llm_response_cache WHERE cache_key = ?", victims)
+                self.evictions += len(victims)
+
+    async def _delete(self, key: str) -> None:
+        async with self.db.write() as conn:
+            cursor = await conn.execute(
+                "SELECT size FROM llm_response_cache WHERE cache_key = ?", (key,)
+            )
+            row = await cursor.fetchone()
+            await conn.execute("DELETE FROM llm_response_cache WHERE cache_key = ?", (key,))
+        if row is not None and self._total_bytes is not None:
+            self._total_bytes -= row["size"]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and the tracked cache size"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes
+        }
@@ -0,0 +1,210 @@
+# src/llm/scheduler.py
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+def classify_error(error: BaseException) -> Tuple[bool, bool, Optional[float]]:
+    """Tell whether an LLM call failed because the upstream is overloaded
+
+    Returns:
+        (overloaded, rate_limited, retry_after): overloaded for 429, 5xx and
+        timeouts; rate_limited for 429 only; retry_after in seconds when the
+        upstream sent a Retry-After header
+    """
+    status = getattr(error, "status_code", None)
+    if status is None:
+        overloaded = isinstance(error, asyncio.TimeoutError) or "Timeout" in type(error).__name__
+        return overloaded, False, None
+    retry_after = None
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        retry_after = float(headers.get("retry-after")) if headers.get("retry-after") else None
+    except (TypeError, ValueError):
+        pass
+    return status == 429 or status >= 500, status == 429, retry_after
+
+class TokenBucket:
+    """Budget refilled continuously at ``rate`` per second up to ``capacity``"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.available = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.available = min(self.capacity, self.available + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until ``amount`` can be taken; 0 when it can be taken now"""
+        self._refill(time.monotonic())
+        # A request larger than the bucket waits for a full bucket, then overdraws
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.available) / self.rate)
+
+    def take(self, amount: float) -> None:
+        """Take ``amount``; may overdraw, which delays later callers"""
+        self._refill(time.monotonic())
+        self.available -= amount
+
+class RateBudget:
+    """Per-minute request and token budgets of one API key
+
+    Shared by the schedulers of every model called with the key, so the
+    key's limits hold however its calls are spread across models. A 429
+    pauses the whole key, as the upstream counts it against all of them.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.requests = (
+            TokenBucket(requests_per_minute / 60, max(1.0, requests_per_minute / 6))
+            if requests_per_minute else None
+        )
+        self.tokens = (
+            TokenBucket(tokens_per_minute / 60, max(1.0, tokens_per_minute / 6))
+            if tokens_per_minute else None
+        )
+        self.paused_until = 0.0
+
+    def delay(self, tokens: float = 0) -> float:
+        """Seconds until a call of ``tokens`` fits the budget; 0 when it fits now"""
+        delay = max(0.0, self.paused_until - time.monotonic())
+        if self.requests is not None:
+            delay = max(delay, self.requests.delay(1))
+        if self.tokens is not None and tokens:
+            delay = max(delay, self.tokens.delay(tokens))
+        return delay
+
+    def take(self, tokens: float = 0) -> None:
+        """Charge a call of ``tokens`` to the budget"""
+        if self.requests is not None:
+            self.requests.take(1)
+        if self.tokens is not None and tokens:
+            self.tokens.take(tokens)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back calls for ``seconds``, e.g. after a 429"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the budgets and what is left of them"""
+        return {
+            "requests_per_minute": self.requests_per_minute,
+            "requests_available": (
+                round(self.requests.available, 2) if self.requests is not None else None
+            ),
+            "tokens_per_minute": self.tokens_per_minute,
+            "tokens_available": round(self.tokens.available, 2) if self.tokens is not None else None,
+            "paused_for": round(max(0.0, self.paused_until - time.monotonic()), 3)
+        }
+
+class ModelScheduler:
+    """Admission control for calls to one model
+
+    Calls queue in arrival order until the RateBudget of their API key has
+    room, the key isn't paused after a 429, and fewer than the current
+    concurrency limit are in flight. The limit follows AIMD: it grows by about
+    one per window of successful calls up to max_in_flight, and is cut by
+    ``decrease`` (at most once per window) when the upstream returns 429 or
+    5xx or times out.
+    """
+
+    def __init__(self, limits, budget: Optional[RateBudget] = None):
+        """Create a scheduler
+
+        Args:
+            limits: ModelLimits of the model
+            budget: Budget of the model's API key, shared with other models
+                on the key; defaults to one of its own from limits' rates
+        """
+        self.limits = limits
+        self.limit = float(limits.max_in_flight)
+        self.budget = budget or RateBudget(limits.requests_per_minute, limits.tokens_per_minute)
+        self.in_flight = 0
+        self.waiting = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.overloaded = 0
+        self.requeued = 0
+        self._last_decrease = 0.0
+        # Held by the caller at the head of the queue while it waits for budget
+        self._admission = asyncio.Lock()
+        self._released = asyncio.Event()
+        # Metric children, bound by the registry
+        self.wait_time = None
+        self.request_time = None
+
+    async def acquire(self, tokens: float = 0) -> float:
+        """Wait for a turn to call the model
+
+        Args:
+            tokens: Estimated prompt plus completion tokens of the call
+
+        Returns:
+            The monotonic start time, to pass to release
+        """
+        self.waiting += 1
+        try:
+            async with self._admission:
+                while True:
+                    delay = self.budget.delay(tokens)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                        continue
+                    if self.in_flight < max(1, math.floor(self.limit)):
+                        break
+                    self._released.clear()
+                    await self._released.wait()
+                self.budget.take(tokens)
+                self.in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        finally:
+            self.waiting -= 1
+        return time.monotonic()
+
+    def release(self, started: float, error: Optional[BaseException] = None) -> None:
+        """Finish a call and adapt the concurrency limit to its outcome"""
+        self.in_flight -= 1
+        self.completed += 1
+        overloaded, rate_limited, retry_after = (False, False, None)
+        if error is not None:
+            overloaded, rate_limited, retry_after = classify_error(error)
+        now = time.monotonic()
+        if overloaded:
+            self.overloaded += 1
+            # Calls started before the last cut saw the old limit; don't cut twice
+            if started >= self._last_decrease:
+                self.limit = max(float(self.limits.min_in_flight), self.limit * self.limits.decrease)
+                self._last_decrease = now
+                logger.warning(
+                    f"LLM upstream overloaded ({type(error).__name__}); "
+                    f"concurrency limit now {math.floor(self.limit)}"
+                )
+            if rate_limited:
+                self.budget.pause(retry_after or self.limits.cooldown)
+        elif error is None:
+            self.limit = min(float(self.limits.max_in_flight), self.limit + 1 / max(1.0, self.limit))
+        self._released.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the current limits, queue depth and counters"""
+        return {
+            "max_in_flight": self.limits.max_in_flight,
+            "concurrency_limit": max(1, math.floor(self.limit)),
+            "timeout": self.limits.timeout,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "peak_in_flight": self.peak_in_flight,
+            "completed": self.completed,
+            "overloaded": self.overloaded,
+            "requeued": self.requeued,
+            **self.budget.stats(),
+            "saturation": self.in_flight / self.limits.max_in_flight
+        }
@@ -1,13 +1,34 @@
-import uvicorn
-from fastapi import FastAPI
-from multiprocessing import Process
-from src.web.app import app as flask_app
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from contextlib import asynccontextmanager
+from pathlib import Path
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from flask_cors import CORS
+from fastapi.responses import ORJSONResponse
+from fastapi.staticfiles import StaticFiles
+from src.api import routes
 from src.api.routes import router  # Import router instead of app
+from src.config.app_config import BASE_DIR, get_section, load_app_config
+from src.core.metrics import REGISTRY
+from src.core.startup import STARTUP, measure_first_request, measure_imports
+from src.web.frontend import STATIC_DIR, router as frontend_router
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs in every worker process, which each get their own resources
+    routes.startup()
+    yield
+    await routes.shutdown()
 
 # Create the FastAPI application
-app = FastAPI(title="AI Agent Management System")
+app = FastAPI(
+    title="AI Agent Management System",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
+)
 
 # Update the CORS configuration for FastAPI
 origins = [
@@ -18,6 +39,15 @@ origins = [
 # Add router with /api prefix
 app.include_router(router, prefix="/api")
 
+# Serve the web dashboard from the same process
+app.include_router(frontend_router)
+app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Expose metrics in the Prometheus text format"""
+    return Response(REGISTRY.render(), media_type=REGISTRY.CONTENT_TYPE)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -26,38 +56,103 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Add CORS to Flask app
-CORS(flask_app, resources={
-    r"/*": {
-        "origins": origins,
-        "methods": ["OPTIONS", "GET", "POST", "PUT", "DELETE"],
-        "allow_headers": ["Content-Type"]
-    }
-})
+def _profile_workdir(workdir: Path) -> Path:
+    """Set up a copy of the database and config to profile startup against
+
+    The copy keeps migrations and startup reads realistic without touching
+    the real database; the config turns off archiving and span export.
+
+    Returns:
+        Path of the copied config, whose database is in workdir
+    """
+    # Imported here as only profiling needs them
+    import sqlite3
+    import yaml
+
+    db_path = workdir / "agents.db"
+    source = Path(get_section("database").get("path", "agents.db"))
+    if source.exists():
+        # The backup API copies a consistent snapshot, WAL included
+        with sqlite3.connect(source) as src, sqlite3.connect(db_path) as dst:
+            src.backup(dst)
+    config = dict(load_app_config())
+    config["database"] = {**config.get("database", {}), "path": str(db_path)}
+    config["archive"] = {**config.get("archive", {}), "enabled": False}
+    config["tracing"] = {**config.get("tracing", {}), "export_path": None}
+    config_path = workdir / "config.yaml"
+    config_path.write_text(yaml.safe_dump(config))
+    return config_path
 
-def run_fastapi():
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+async def _start_and_stop(database_path: str) -> None:
+    routes.startup(database_path=database_path, background_jobs=False)
+    await routes.shutdown()
 
-def run_flask():
-    flask_app.run(host="0.0.0.0", port=8080)
+def profile_startup(budget: float) -> int:
+    """Print where a worker's startup time goes and check it against a budget
+
+    Imports are timed in a fresh interpreter, worker initialisation in this
+    process, and time to first request by starting a real server. Both run
+    against a temporary copy of the database, with background jobs off.
+
+    Args:
+        budget: Seconds allowed from launching the server to its first response
+
+    Returns:
+        Exit status: 0 within budget, 1 over it
+    """
+    import_total, packages = measure_imports("src.main", cwd=BASE_DIR)
+    print(f"Imports: {import_total * 1000:.0f}ms")
+    for package, seconds in list(packages.items())[:15]:
+        print(f"  {package:<32} {seconds * 1000:7.1f}ms")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        workdir = Path(workdir)
+        config_path = _profile_workdir(workdir)
+        STARTUP.reset()
+        asyncio.run(_start_and_stop(str(workdir / "agents.db")))
+        print(f"Init: {STARTUP.total() * 1000:.0f}ms")
+        for stage, seconds in STARTUP.stages:
+            print(f"  {stage:<32} {seconds * 1000:7.1f}ms")
+
+        first_request = measure_first_request(
+            [sys.executable, str(BASE_DIR / "run.py"), "--workers", "1"], "/api/stats/worker",
+            cwd=workdir, env={**os.environ, "CONFIG_PATH": str(config_path)}
+        )
+    within = first_request <= budget
+    print(
+        f"Time to first request: {first_request * 1000:.0f}ms "
+        f"({'within' if within else 'OVER'} the {budget * 1000:.0f}ms budget)"
+    )
+    return 0 if within else 1
 
 def main():
-    # Create processes for both apps
-    fastapi_process = Process(target=run_fastapi)
-    flask_process = Process(target=run_flask)
+    server = get_section("server")
+    parser = argparse.ArgumentParser(description="Run the agent management API")
+    parser.add_argument("--host", default=server.get("host", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(server.get("port", 8000)))
+    parser.add_argument(
+        "--workers", type=int, default=int(server.get("workers", 1)),
+        help="Worker processes serving requests, e.g. one per core"
+    )
+    parser.add_argument(
+        "--profile-startup", action="store_true",
+        help="Print an import and init time breakdown instead of serving, "
+             "exiting non-zero if time to first request exceeds server.startup_budget"
+    )
+    args = parser.parse_args()
+    if args.profile_startup:
+        sys.exit(profile_startup(float(server.get("startup_budget", 2.0))))
 
+    # Imported here so profiling and tooling that only import the app skip it
+    import uvicorn
     try:
-        # Start both processes
-        fastapi_process.start()
-        flask_process.start()
-
-        # Wait for both processes to complete
-        fastapi_process.join()
-        flask_process.join()
+        if args.workers > 1:
+            # Workers import the app themselves, so it is passed by name
+            uvicorn.run("src.main:app", host=args.host, port=args.port, workers=args.workers)
+        else:
+            uvicorn.run(app, host=args.host, port=args.port)
     except KeyboardInterrupt:
-        print("Shutting down servers...")
-        fastapi_process.terminate()
-        flask_process.terminate()
+        print("Shutting down server...")
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,22 @@
+# src/web/frontend.py
+from pathlib import Path
+
+from fastapi import APIRouter
+from fastapi.responses import FileResponse
+
+WEB_DIR = Path(__file__).resolve().parent
+TEMPLATES_DIR = WEB_DIR / "templates"
+STATIC_DIR = WEB_DIR / "static"
+
+# Serves the dashboard from the API process; its /api calls are same-origin
+router = APIRouter(include_in_schema=False)
+
+@router.get("/")
+async def home():
+    """Serve the dashboard"""
+    return FileResponse(TEMPLATES_DIR / "index.html")
+
+@router.get("/favicon.ico")
+async def favicon():
+    """Serve the favicon"""
+    return FileResponse(STATIC_DIR / "favicon.ico", media_type="image/svg+xml")
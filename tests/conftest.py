@@ -1,6 +1,6 @@
 import warnings
 import pytest
-from unittest.mock import Mock, MagicMock
+from unittest.mock import Mock, MagicMock, AsyncMock
 from src.core.agent_manager import AgentManager
 import json
 
@@ -32,6 +32,18 @@ def mock_db():
     mock_cursor.fetchone.return_value = None
     mock_cursor.fetchall.return_value = []
     
+    # Async connection shared by db.read() and db.write()
+    mock_async_conn = AsyncMock()
+    mock_async_cursor = AsyncMock()
+    mock_async_conn.execute.return_value = mock_async_cursor
+    mock_async_cursor.fetchone.return_value = None
+    mock_async_cursor.fetchall.return_value = []
+    mock_async_ctx = MagicMock()
+    mock_async_ctx.__aenter__.return_value = mock_async_conn
+    mock_async_ctx.__aexit__.return_value = None
+    mock.read.return_value = mock_async_ctx
+    mock.write.return_value = mock_async_ctx
+    
     return mock
 
 @pytest.fixture
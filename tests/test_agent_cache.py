@@ -0,0 +1,88 @@
+import pytest
+import json
+from datetime import datetime
+from src.core.agent import Agent
+from src.core.agent_cache import AgentCache
+from src.core.agent_manager import AgentManager
+from src.agents.storyteller import StorytellerAgent
+from src.database.db_setup import Database
+
+def make_agent(agent_id):
+    return Agent(id=agent_id, name="test-agent", model_name="gpt-4", tools=[], temperature=0.5)
+
+def test_cache_counts_hits_and_misses():
+    """Test basic get/put bookkeeping"""
+    cache = AgentCache()
+    agent = make_agent("a1")
+    assert cache.get("a1") is None
+    cache.put("a1", agent)
+    assert cache.get("a1") is agent
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.5
+
+def test_cache_evicts_least_recently_used():
+    """Test the cache never grows beyond max_size"""
+    cache = AgentCache(max_size=2)
+    cache.put("a1", make_agent("a1"))
+    cache.put("a2", make_agent("a2"))
+    cache.get("a1")
+    cache.put("a3", make_agent("a3"))
+
+    assert cache.get("a2") is None
+    assert cache.get("a1") is not None
+    assert cache.stats()["evictions"] == 1
+
+def test_cache_entries_expire(mocker):
+    """Test entries are dropped once their TTL has passed"""
+    clock = mocker.patch("src.core.agent_cache.time.monotonic", return_value=100.0)
+    cache = AgentCache(ttl=10)
+    cache.put("a1", make_agent("a1"))
+    clock.return_value = 111.0
+    assert cache.get("a1") is None
+    assert cache.stats()["size"] == 0
+
+@pytest.mark.asyncio
+async def test_get_agent_reads_database_once(mock_db):
+    """Test repeated lookups are served from the cache until invalidated"""
+    manager = AgentManager(database=mock_db)
+    mock_conn = mock_db.read.return_value.__aenter__.return_value
+    mock_conn.execute.return_value.fetchone.return_value = {
+        "agent_id": "test-id",
+        "name": "test-agent",
+        "status": "inactive",
+        "type": "default",
+        "config": json.dumps({"model_name": "gpt-4"}),
+        "created_at": datetime.now().isoformat()
+    }
+
+    first = await manager.get_agent("test-id")
+    assert await manager.get_agent("test-id") is first
+    assert mock_conn.execute.call_count == 1
+
+    await manager.update_agent("test-id", {"name": "renamed", "config": {}, "type": "default"})
+    assert await manager.get_agent("test-id") is not first
+    assert mock_conn.execute.call_count == 4  # lookup, existence check, update, lookup
+
+@pytest.mark.asyncio
+async def test_config_update_invalidates_cached_agent():
+    """Test ConfigManager.update_config drops the cached storyteller"""
+    manager = AgentManager(database=Database(":memory:"))
+    manager.register_agent_class(StorytellerAgent)
+    agent_id = await manager.create_agent("teller", "storyteller", {"model_name": "gpt-4"})
+
+    agent = await manager.get_agent(agent_id)
+    assert await manager.get_agent(agent_id) is agent
+
+    await agent.config_manager.update_config({"model_name": "gpt-4o", "temperature": 0.2})
+    updated = await manager.get_agent(agent_id)
+    assert updated is not agent
+    assert updated.model_name == "gpt-4o"
+    assert updated.temperature == 0.2
+
+    await manager.delete_agent(agent_id)
+    with pytest.raises(ValueError):
+        await manager.get_agent(agent_id)
+    await manager.db.close()
@@ -25,8 +25,8 @@ async def test_create_agent(agent_manager, mock_db):
     }
     
     # Setup mock to return success
-    mock_cursor = mock_db.get_conn.return_value.__enter__.return_value
-    mock_cursor.execute.return_value.lastrowid = 1
+    mock_conn = mock_db.write.return_value.__aenter__.return_value
+    mock_conn.execute.return_value.lastrowid = 1
     
     agent_id = await agent_manager.create_agent(
         name="test_agent",
@@ -36,7 +36,7 @@ async def test_create_agent(agent_manager, mock_db):
     
     # Add this to debug the actual calls
     print("Database calls:", [
-        call.args for call in mock_cursor.execute.call_args_list
+        call.args for call in mock_conn.execute.call_args_list
     ])
     
     assert agent_id is not None
@@ -44,8 +44,8 @@ async def test_create_agent(agent_manager, mock_db):
     assert uuid.UUID(agent_id)  # Verify it's a valid UUID
     
     # Verify database calls
-    mock_db.get_conn.assert_called()
-    assert mock_cursor.execute.call_count >= 2  # Two inserts expected
+    mock_db.write.assert_called()
+    assert mock_conn.execute.call_count >= 2  # Two inserts expected
 
 @pytest.mark.asyncio
 async def test_agent_lifecycle(agent_manager, mock_db, mocker):
@@ -58,8 +58,8 @@ async def test_agent_lifecycle(agent_manager, mock_db, mocker):
     }
     
     # Setup mock database responses
-    mock_cursor = mock_db.get_conn.return_value.__enter__.return_value
-    mock_cursor.execute.return_value.fetchone.return_value = {
+    mock_conn = mock_db.read.return_value.__aenter__.return_value
+    mock_conn.execute.return_value.fetchone.return_value = {
         "agent_id": "test-id",
         "name": "test-agent",
         "status": "inactive",
@@ -92,8 +92,8 @@ async def test_run_task(agent_manager, mock_db, mocker):
     }
     
     # Setup mock to return agent data
-    mock_cursor = mock_db.get_conn.return_value.__enter__.return_value
-    mock_cursor.execute.return_value.fetchone.return_value = {
+    mock_conn = mock_db.read.return_value.__aenter__.return_value
+    mock_conn.execute.return_value.fetchone.return_value = {
         "agent_id": "test-id",
         "name": "test-agent",
         "status": "inactive",
@@ -122,7 +122,7 @@ async def test_run_task(agent_manager, mock_db, mocker):
     mock_execute.assert_called_once()
     
     # Test with invalid agent ID
-    mock_cursor.execute.return_value.fetchone.return_value = None
+    mock_conn.execute.return_value.fetchone.return_value = None
     with pytest.raises(ValueError, match="Agent invalid-id not found"):
         await agent_manager.run_task("invalid-id", {"task": "test"})
 
@@ -142,3 +142,27 @@ async def test_register_agent_class(agent_manager, mock_db):
     
     agent_manager.register_agent_class(InvalidAgent)
     assert "InvalidAgent" not in agent_manager._agent_classes
+
+@pytest.mark.asyncio
+async def test_run_task_records_through_journal(agent_manager, mock_db, mocker):
+    """Test run bookkeeping goes through the run journal when configured"""
+    agent_manager.run_journal = mocker.Mock()
+    mock_conn = mock_db.read.return_value.__aenter__.return_value
+    mock_conn.execute.return_value.fetchone.return_value = {
+        "agent_id": "test-id",
+        "name": "test-agent",
+        "status": "inactive",
+        "type": "default",
+        "config": json.dumps({"model_name": "gpt-4", "temperature": 0.5}),
+        "created_at": datetime.now().isoformat()
+    }
+    mocker.patch.object(Agent, "execute_task", mocker.AsyncMock(side_effect=RuntimeError("boom")))
+    
+    with pytest.raises(RuntimeError):
+        await agent_manager.run_task("test-id", {"task": "test_task"})
+    
+    start = agent_manager.run_journal.record_start.call_args.args
+    finish = agent_manager.run_journal.record_finish.call_args.args
+    assert start[0] == finish[0]
+    assert finish[1:4] == ("test-id", "failed", json.dumps("boom"))
+    mock_db.write.assert_not_called()
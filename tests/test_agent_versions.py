@@ -0,0 +1,94 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from fastapi.testclient import TestClient
+from src.agents.storyteller import StorytellerAgent
+from src.api import routes
+from src.core.agent_manager import AgentManager
+from src.database.db_setup import Database
+
+@pytest.fixture
+def client(monkeypatch):
+    manager = AgentManager(database=Database(":memory:"))
+    manager.register_agent_class(StorytellerAgent)
+    monkeypatch.setattr(routes, "agent_manager", manager)
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.include_router(routes.router, prefix="/api")
+    with TestClient(app) as client:
+        yield client
+
+def test_every_write_bumps_the_version_and_etag(client):
+    """Test GETs answer 304 until any write path changes the agent"""
+    agent_id = client.post("/api/agents", json={
+        "name": "teller", "type": "storyteller", "config": {"story_length": 100}
+    }).json()["agent_id"]
+    response = client.get(f"/api/agents/{agent_id}")
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "no-cache"
+    assert response.json()["config_version"] == int(etag.strip('"'))
+    assert client.get(f"/api/agents/{agent_id}", headers={"If-None-Match": etag}).status_code == 304
+
+    updated = client.put(f"/api/agents/{agent_id}/config", json={"story_length": 200})
+    assert updated.headers["etag"] != etag
+    response = client.get(f"/api/agents/{agent_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["etag"] == updated.headers["etag"]
+
+    etag = response.headers["etag"]
+    renamed = client.put(f"/api/agents/{agent_id}", json={
+        "name": "renamed", "type": "storyteller", "config": {"story_length": 200}
+    })
+    assert renamed.json()["config_version"] == int(etag.strip('"')) + 1
+    assert client.get(f"/api/agents/{agent_id}", headers={"If-None-Match": f"W/{etag}"}).status_code == 200
+
+    listing = client.get("/api/agents")
+    assert client.get("/api/agents", headers={"If-None-Match": listing.headers["etag"]}).status_code == 304
+    client.put(f"/api/agents/{agent_id}/config", json={"story_length": 300})
+    assert client.get("/api/agents", headers={"If-None-Match": listing.headers["etag"]}).status_code == 200
+
+@pytest.mark.asyncio
+async def test_typed_config_is_built_once_per_version():
+    """Test StorytellerConfig is reused until the config version changes"""
+    manager = AgentManager(database=Database(":memory:"))
+    manager.register_agent_class(StorytellerAgent)
+    agent_id = await manager.create_agent("teller", "storyteller", {"story_length": 100})
+    agent = await manager.get_agent(agent_id)
+    config = agent.get_config()
+    assert agent.get_config() is config
+
+    # Writing the same config doesn't change the version
+    version = agent.config_manager.version
+    await agent.config_manager.update_config(agent.config_manager.get_config())
+    assert agent.config_manager.version == version and agent.get_config() is config
+
+    await agent.config_manager.update_config({"story_length": 300})
+    assert agent.config_manager.version == version + 1
+    assert agent.get_config().story_length == 300
+    await manager.db.close()
+
+def test_lazily_created_agent_serves_the_version_of_its_defaults(client):
+    """Test an agent whose defaults are written on first load has a current ETag"""
+    agent_id = client.post("/api/agents", json={
+        "name": "teller", "type": "storyteller", "config": {}
+    }).json()["agent_id"]
+    response = client.get(f"/api/agents/{agent_id}")
+    etag = response.headers["etag"]
+    # Loading the agent wrote its default config, bumping the version
+    assert response.json()["config_version"] == int(etag.strip('"')) == 2
+
+    agent = routes.agent_manager.agent_cache.get(agent_id)
+    assert agent.config_version == agent.config_manager.version == 2
+    assert client.get(f"/api/agents/{agent_id}", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(f"/api/agents/{agent_id}", headers={"If-None-Match": '"1"'}).status_code == 200
+
+@pytest.mark.asyncio
+async def test_agents_load_their_config_through_the_async_pool(mocker):
+    """Test agents read their config while loading and never touch the sync connection"""
+    db = Database(":memory:")
+    manager = AgentManager(database=db)
+    manager.register_agent_class(StorytellerAgent)
+    agent_id = await manager.create_agent("teller", "storyteller", {"story_length": 100})
+    mocker.patch.object(db, "get_conn", side_effect=AssertionError("sync connection used"))
+    agent = await manager.get_agent(agent_id)
+    async with db.write():
+        assert agent.get_config().story_length == 100
+    await db.close()
@@ -0,0 +1,46 @@
+import sqlite3
+from fastapi.testclient import TestClient
+from benchmarks.fake_llm import FakeLLMSettings, create_app
+from benchmarks.load import percentile, summarize
+from benchmarks.run import compare
+from benchmarks.seed import seed
+
+def test_fake_llm_completes_streams_and_fails():
+    """Test the stub answers in OpenAI's format and honours the error rate"""
+    settings = FakeLLMSettings(latency=0, jitter=0, tokens_per_second=10_000, completion_tokens=5)
+    client = TestClient(create_app(settings))
+    request = {"model": "m", "messages": [{"role": "user", "content": "hi there"}]}
+
+    body = client.post("/v1/chat/completions", json=request).json()
+    assert len(body["choices"][0]["message"]["content"].split()) == 5
+    assert body["usage"] == {"prompt_tokens": 2, "completion_tokens": 5, "total_tokens": 7}
+
+    events = client.post("/v1/chat/completions", json={**request, "stream": True}).text.split("\n\n")
+    assert events[-2] == "data: [DONE]"
+    assert len([event for event in events if event.startswith("data: {")]) == 6
+
+    settings.error_rate = 1.0
+    assert client.post("/v1/chat/completions", json=request).status_code in (429, 500, 503)
+
+def test_seed_creates_agents_and_runs(tmp_path):
+    """Test seeding spreads runs over storyteller agents"""
+    db_path = tmp_path / "agents.db"
+    result = seed(str(db_path), agents=3, runs=10)
+    assert len(result["agent_ids"]) == 3
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM agents WHERE type = 'storyteller'").fetchone()[0] == 3
+        counts = conn.execute("SELECT COUNT(*) FROM agent_runs GROUP BY agent_id").fetchall()
+        assert sorted(count for count, in counts) == [3, 3, 4]
+
+def test_summaries_and_comparison():
+    """Test percentiles use nearest rank and compare flags regressions"""
+    latencies = [i / 1000 for i in range(1, 101)]
+    assert percentile(latencies, 50) == 0.05
+    assert percentile(latencies, 99) == 0.099
+    summary = summarize(latencies, errors=2, elapsed=10)
+    assert (summary["rps"], summary["p95_ms"], summary["errors"]) == (10.0, 95.0, 2)
+
+    before = {"endpoints": {"GET /agents": {"rps": 100, "p95_ms": 10, "p99_ms": 20}}}
+    after = {"endpoints": {"GET /agents": {"rps": 98, "p95_ms": 15, "p99_ms": 20}}}
+    assert compare(before, after)[0].startswith("REGRESSION GET /agents")
+    assert not compare(before, before)[0].startswith("REGRESSION")
@@ -0,0 +1,89 @@
+import pytest
+from src.core.agent_manager import AgentManager
+from src.core.conversation_memory import ConversationMemory, estimate_tokens
+from src.database.db_setup import Database
+from src.llm import client_registry
+from src.llm.client_registry import LLMClientRegistry
+
+async def _count_turns(db, agent_id):
+    async with db.read() as conn:
+        cursor = await conn.execute("SELECT COUNT(*) FROM conversations WHERE agent_id = ?", (agent_id,))
+        return (await cursor.fetchone())[0]
+
+@pytest.mark.asyncio
+async def test_memory_stays_within_budget_as_turns_are_summarized():
+    """Test older turns are folded into the summary and prompts stay under max_tokens"""
+    db = Database(":memory:")
+    manager = AgentManager(database=db)
+    agent_id = await manager.create_agent("bot", "default", {})
+    memory = ConversationMemory(db, max_tokens=200, summary_tokens=50)
+
+    for i in range(40):
+        await memory.append(agent_id, f"Question number {i} about dragons?", f"Answer number {i}: they fly.")
+        await memory.close()
+        assert (await memory.load(agent_id))["tokens"] <= 200
+
+    loaded = await memory.load(agent_id)
+    assert loaded["turns"][-1]["user_message"] == "Question number 39 about dragons?"
+    assert "Answer number" in loaded["summary"] and estimate_tokens(loaded["summary"]) <= 50
+    first = loaded["turns"][0]["id"]
+    assert all(turn["id"] == first + n for n, turn in enumerate(loaded["turns"]))
+    # Turns are kept; only what is sent to the model is bounded
+    assert await _count_turns(db, agent_id) == 40
+
+    messages = await memory.messages(agent_id, "Be brief.", "And now?")
+    assert [m["role"] for m in messages[:2]] == ["system", "system"]
+    assert messages[-1] == {"role": "user", "content": "And now?"}
+    assert len(messages) == 3 + 2 * len(loaded["turns"])
+
+    async def broken(summary, turns, max_tokens):
+        raise RuntimeError("model down")
+
+    for i in range(10):
+        await memory.append(agent_id, f"More {i}", "Sure.", summarize=broken)
+    await memory.close()
+    assert (await memory.load(agent_id))["summary"] == loaded["summary"]
+    await db.close()
+
+@pytest.mark.asyncio
+async def test_chat_agent_remembers_turns_with_its_model(mocker):
+    """Test chat runs send remembered turns and summarize with the agent's model"""
+    registry = LLMClientRegistry(
+        provider_settings={"simulated": {"latency": 0, "tokens_per_second": 0, "completion_tokens": 5}}
+    )
+    mocker.patch.object(client_registry, "_registry", registry)
+    db = Database(":memory:")
+    memory = ConversationMemory(db, max_tokens=120, summary_tokens=40)
+    manager = AgentManager(database=db, memory=memory)
+    manager.register_agent_type("chat", "src.agents.chat:ChatAgent")
+    agent_id = await manager.create_agent("bot", "chat", {"provider": "simulated", "temperature": 0.5})
+    agent = await manager.get_agent(agent_id)
+    summarize = mocker.spy(agent, "summarize")
+
+    first = await manager.run_task(agent_id, {"task": "chat", "params": {"message": "Hi, I'm Ada."}})
+    messages = await memory.messages(agent_id, "system", "next")
+    assert messages[1:3] == [
+        {"role": "user", "content": "Hi, I'm Ada."},
+        {"role": "assistant", "content": first["result"]}
+    ]
+
+    for i in range(20):
+        await manager.run_task(agent_id, {"task": "chat", "params": {"message": f"Tell me fact {i}."}})
+    await memory.close()
+    assert summarize.call_count >= 1
+    loaded = await memory.load(agent_id)
+    assert loaded["summary"] and loaded["tokens"] <= 120
+    await db.close()
+
+@pytest.mark.asyncio
+async def test_chat_tasks_without_a_message_are_rejected():
+    """Test a chat task missing params.message fails with a ValueError"""
+    db = Database(":memory:")
+    manager = AgentManager(database=db, memory=ConversationMemory(db))
+    manager.register_agent_type("chat", "src.agents.chat:ChatAgent")
+    agent_id = await manager.create_agent("bot", "chat", {"provider": "simulated"})
+
+    for task in ({"task": "chat"}, {"task": "chat", "params": {}}, {"task": "chat", "params": {"message": 3}}):
+        with pytest.raises(ValueError, match="Chat tasks require params.message"):
+            await manager.run_task(agent_id, task)
+    await db.close()
@@ -0,0 +1,70 @@
+import pytest
+import asyncio
+import multiprocessing
+import sqlite3
+from src.core.agent_manager import AgentManager
+from src.database.coordination import InvalidationChannel, Lease
+from src.database.db_setup import Database
+from src.database.migrations import SCHEMA_VERSION
+
+def _open_database(path):
+    Database(path).conn.close()
+
+def test_workers_starting_together_migrate_once(tmp_path):
+    """Test concurrent processes opening a new database all succeed"""
+    path = str(tmp_path / "agents.db")
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_open_database, args=(path,)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+    assert [worker.exitcode for worker in workers] == [0] * 4
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+
+@pytest.mark.asyncio
+async def test_agent_changes_reach_other_workers(tmp_path):
+    """Test an update in one worker drops the agent cached by another"""
+    path = str(tmp_path / "agents.db")
+    managers = []
+    for _ in range(2):
+        db = Database(path)
+        channel = InvalidationChannel(db)
+        managers.append(AgentManager(database=db, invalidations=channel))
+    first, second = managers
+    agent_id = await first.create_agent("teller", "default", {"temperature": 0.5})
+    for manager in managers:
+        await manager.invalidations.poll()
+        await manager.get_agent(agent_id)
+
+    with second.event_hub.subscribe() as subscription:
+        await first.update_agent(agent_id, {"name": "teller", "type": "default", "config": {"temperature": 0.9}})
+        assert await first.invalidations.poll() == 0
+        assert await second.invalidations.poll() == 1
+        assert (await second.get_agent(agent_id)).temperature == 0.9
+        event = await subscription.next(timeout=1)
+        assert (event["type"], event["agent_id"]) == ("agent.updated", agent_id)
+
+    await second.delete_agent(agent_id)
+    assert await first.invalidations.poll() == 1
+    with pytest.raises(ValueError):
+        await first.get_agent(agent_id)
+    for manager in managers:
+        await manager.db.close()
+
+@pytest.mark.asyncio
+async def test_lease_has_one_holder_until_it_expires(tmp_path):
+    """Test a lease is renewed by its holder and taken over only after expiry"""
+    db = Database(str(tmp_path / "agents.db"))
+    first = Lease(db, "run_archive", ttl=0.1)
+    second = Lease(db, "run_archive", ttl=0.1)
+    assert await first.acquire()
+    assert not await second.acquire()
+    assert await first.acquire()
+    await asyncio.sleep(0.15)
+    assert await second.acquire()
+    assert not await first.acquire()
+    await second.release()
+    assert await first.acquire()
+    await db.close()
@@ -3,6 +3,7 @@ from datetime import datetime
 from src.database.db_setup import Database
 import json
 import sqlite3
+from src.database.migrations import SCHEMA_VERSION
 
 @pytest.fixture
 def setup_database():
@@ -92,3 +93,151 @@ def test_foreign_key_constraints(setup_database):
                 INSERT INTO agent_states (agent_id, memory)
                 VALUES (?, ?)
             """, ("nonexistent-id", "{}"))
+
+
+@pytest.mark.asyncio
+async def test_async_write_visible_to_readers():
+    """Test rows committed through db.write() are visible through db.read()"""
+    db = Database(":memory:")
+    async with db.write() as conn:
+        await conn.execute("""
+            INSERT INTO agents (agent_id, name, config, status)
+            VALUES (?, ?, ?, ?)
+        """, ("test-id", "test-agent", "{}", "inactive"))
+
+    async with db.read() as conn:
+        cursor = await conn.execute("SELECT name FROM agents WHERE agent_id = ?", ("test-id",))
+        row = await cursor.fetchone()
+    assert row["name"] == "test-agent"
+
+    # The sync connection shares the same in-memory database
+    with db.get_conn() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM agents").fetchone()[0] == 1
+    await db.close()
+
+@pytest.mark.asyncio
+async def test_async_write_rolls_back_on_error():
+    """Test a failing db.write() block leaves no partial writes"""
+    db = Database(":memory:")
+    with pytest.raises(sqlite3.IntegrityError):
+        async with db.write() as conn:
+            await conn.execute("""
+                INSERT INTO agents (agent_id, name, config, status)
+                VALUES (?, ?, ?, ?)
+            """, ("test-id", "test-agent", "{}", "inactive"))
+            await conn.execute("""
+                INSERT INTO agent_states (agent_id, memory)
+                VALUES (?, ?)
+            """, ("nonexistent-id", "{}"))
+
+    async with db.read() as conn:
+        cursor = await conn.execute("SELECT COUNT(*) FROM agents")
+        assert (await cursor.fetchone())[0] == 0
+    await db.close()
+
+@pytest.mark.asyncio
+async def test_reader_pool_is_bounded_and_read_only(tmp_path):
+    """Test readers are reused, capped at pool_size and reject writes"""
+    db = Database(str(tmp_path / "agents.db"), pool_size=2)
+
+    async with db.read() as first, db.read() as second:
+        assert first is not second
+        with pytest.raises(sqlite3.OperationalError):
+            await first.execute("DELETE FROM agents")
+
+    async with db.read() as conn:
+        assert conn in (first, second)
+    assert db._reader_count == 2
+    await db.close()
+
+
+LEGACY_SCHEMA = """
+    CREATE TABLE agents (
+        agent_id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        config TEXT NOT NULL,
+        status TEXT NOT NULL,
+        type TEXT NOT NULL DEFAULT 'default',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE agent_states (
+        agent_id TEXT PRIMARY KEY,
+        memory TEXT NOT NULL,
+        FOREIGN KEY (agent_id) REFERENCES agents (agent_id)
+    );
+    CREATE TABLE agent_runs (
+        run_id TEXT PRIMARY KEY,
+        agent_id TEXT NOT NULL,
+        task TEXT NOT NULL,
+        status TEXT NOT NULL,
+        result TEXT,
+        started_at TIMESTAMP NOT NULL,
+        completed_at TIMESTAMP,
+        FOREIGN KEY (agent_id) REFERENCES agents (agent_id)
+    );
+    CREATE TABLE conversations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        agent_id TEXT NOT NULL,
+        user_message TEXT NOT NULL,
+        agent_response TEXT NOT NULL,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (agent_id) REFERENCES agents (agent_id)
+    );
+    INSERT INTO agents (agent_id, name, config, status) VALUES ('a1', 'legacy', '{}', 'inactive');
+    INSERT INTO agent_states (agent_id, memory) VALUES ('a1', '{}');
+    INSERT INTO agent_runs (run_id, agent_id, task, status, started_at)
+        VALUES ('r1', 'a1', '{}', 'completed', '2024-01-01 00:00:00');
+"""
+
+def test_fresh_database_is_at_latest_version():
+    """Test a new database is created at the current schema version"""
+    db = Database(":memory:")
+    with db.get_conn() as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        indexes = {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'"
+        )}
+    assert "idx_agent_runs_agent_started" in indexes
+    assert "idx_conversations_agent_timestamp" in indexes
+
+def test_legacy_database_upgrades_in_place(tmp_path):
+    """Test an unversioned agents.db keeps its data and gains the new schema"""
+    path = str(tmp_path / "agents.db")
+    legacy = sqlite3.connect(path)
+    legacy.executescript(LEGACY_SCHEMA)
+    legacy.close()
+
+    db = Database(path)
+    with db.get_conn() as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        assert conn.execute("SELECT run_id FROM agent_runs").fetchone()[0] == "r1"
+        plan = " ".join(row[3] for row in conn.execute("""
+            EXPLAIN QUERY PLAN
+            SELECT * FROM agent_runs WHERE agent_id = ? ORDER BY started_at DESC LIMIT 1
+        """, ("a1",)))
+    assert "idx_agent_runs_agent_started" in plan
+    assert "TEMP B-TREE" not in plan
+
+    # Re-opening an up-to-date database is a no-op
+    Database(path)
+
+def test_deleting_agent_cascades():
+    """Test related rows are removed with their agent"""
+    db = Database(":memory:")
+    with db.get_conn() as conn:
+        conn.execute("INSERT INTO agents (agent_id, name, config, status) VALUES ('a1', 'n', '{}', 'inactive')")
+        conn.execute("INSERT INTO agent_states (agent_id, memory) VALUES ('a1', '{}')")
+        conn.execute("""
+            INSERT INTO agent_runs (run_id, agent_id, task, status, started_at)
+            VALUES ('r1', 'a1', '{}', 'running', '2024-01-01 00:00:00')
+        """)
+        conn.execute("""
+            INSERT INTO conversations (agent_id, user_message, agent_response)
+            VALUES ('a1', 'hi', 'hello')
+        """)
+
+    db.delete_agent("a1")
+
+    with db.get_conn() as conn:
+        for table in ("agent_states", "agent_runs", "conversations"):
+            assert conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] == 0
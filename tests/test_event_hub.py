@@ -0,0 +1,59 @@
+import pytest
+from unittest.mock import AsyncMock
+from src.core.agent import Agent
+from src.core.agent_manager import AgentManager
+from src.core.event_hub import EventHub
+from src.database.db_setup import Database
+
+@pytest.mark.asyncio
+async def test_subscribers_filter_by_agent():
+    """Test events reach every subscriber unless filtered to another agent"""
+    hub = EventHub()
+    everything = hub.subscribe()
+    with hub.subscribe("agent-1") as one_agent:
+        hub.publish("run.created", agent_id="agent-2", run_id="run-1")
+        hub.publish("run.created", agent_id="agent-1", run_id="run-2")
+
+        assert (await everything.next(timeout=0.1))["run_id"] == "run-1"
+        assert (await everything.next(timeout=0.1))["run_id"] == "run-2"
+        assert (await one_agent.next(timeout=0.1))["run_id"] == "run-2"
+        assert await one_agent.next(timeout=0.01) is None
+    assert hub.stats()["subscribers"] == 1
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_gets_resync():
+    """Test a subscriber that falls behind gets one resync instead of a backlog"""
+    hub = EventHub(max_queue=2)
+    subscription = hub.subscribe()
+    for i in range(3):
+        hub.publish("run.status", agent_id="agent-1", run_id=f"run-{i}")
+
+    assert await subscription.next(timeout=0.1) == {"type": "resync", "seq": 3}
+    assert await subscription.next(timeout=0.01) is None
+    assert hub.stats()["overflows"] == 1
+
+@pytest.mark.asyncio
+async def test_manager_publishes_run_and_agent_changes():
+    """Test AgentManager publishes run lifecycle and agent changes"""
+    manager = AgentManager(database=Database(":memory:"))
+    manager.register_agent_class(type("EchoAgent", (Agent,), {
+        "AGENT_TYPE": "echo",
+        "execute_task": AsyncMock(return_value={"result": "done"})
+    }))
+    subscription = manager.event_hub.subscribe()
+
+    agent_id = await manager.create_agent("echo", "echo", {})
+    await manager.run_task(agent_id, {"task": "say"})
+    await manager.update_agent(agent_id, {"name": "echo 2", "type": "echo", "config": {}})
+    await manager.delete_agent(agent_id)
+
+    events = []
+    while (event := await subscription.next(timeout=0.01)) is not None:
+        events.append(event)
+    assert [event["type"] for event in events] == [
+        "agent.created", "run.created", "run.status", "agent.updated", "agent.deleted"
+    ]
+    assert events[1]["task"] == {"task": "say"}
+    assert events[2]["status"] == "completed"
+    assert events[2]["result"] == {"result": "done"}
+    assert all(event["agent_id"] == agent_id for event in events)
@@ -0,0 +1,73 @@
+import pytest
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+from src.llm import client_registry
+from src.llm.client_registry import LLMClientRegistry, ModelLimits
+
+def test_from_config_inherits_defaults():
+    """Test per-model limits fall back to the default section"""
+    registry = LLMClientRegistry.from_config({
+        "max_connections": 10,
+        "default": {"max_in_flight": 4, "timeout": 5},
+        "models": {"gpt-4": {"max_in_flight": 2}}
+    })
+    assert registry.max_connections == 10
+    assert registry.limits_for("gpt-4") == ModelLimits(max_in_flight=2, timeout=5.0)
+    assert registry.limits_for("other") == ModelLimits(max_in_flight=4, timeout=5.0)
+
+def test_client_is_shared():
+    """Test the client is created once and reused"""
+    factory = MagicMock()
+    registry = LLMClientRegistry(client_factory=factory)
+    assert registry.get_client() is registry.get_client()
+    factory.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_slot_bounds_in_flight_requests():
+    """Test no more than max_in_flight calls run at once per model"""
+    registry = LLMClientRegistry(model_limits={"gpt-4": ModelLimits(max_in_flight=2)})
+    release = asyncio.Event()
+
+    async def call():
+        async with registry.slot("gpt-4"):
+            await release.wait()
+
+    tasks = [asyncio.create_task(call()) for _ in range(5)]
+    await asyncio.sleep(0)
+    stats = registry.stats()["models"]["gpt-4"]
+    assert stats["in_flight"] == 2
+    assert stats["waiting"] == 3
+    assert stats["saturation"] == 1.0
+
+    release.set()
+    await asyncio.gather(*tasks)
+    stats = registry.stats()["models"]["gpt-4"]
+    assert stats["in_flight"] == 0
+    assert stats["peak_in_flight"] == 2
+    assert stats["completed"] == 5
+
+@pytest.mark.asyncio
+async def test_storyteller_uses_shared_client(mocker):
+    """Test generate_story calls the registry client with the model timeout"""
+    from src.agents.storyteller import StorytellerAgent
+
+    client = MagicMock()
+    response = MagicMock()
+    response.choices[0].message.content = "Once upon a time"
+    client.chat.completions.create = AsyncMock(return_value=response)
+    registry = LLMClientRegistry(
+        model_limits={"gpt-4": ModelLimits(timeout=12)},
+        client_factory=lambda: client
+    )
+    mocker.patch.object(client_registry, "_registry", registry)
+
+    agent = StorytellerAgent(
+        id="test-id", name="teller", model_name="gpt-4", tools=[],
+        temperature=0.5, database=MagicMock()
+    )
+    mocker.patch.object(agent.config_manager, "get_config", return_value=StorytellerAgent.DEFAULT_CONFIG)
+
+    assert await agent.generate_story("dragons") == "Once upon a time"
+    assert await agent.generate_story() == "Once upon a time"
+    assert client.chat.completions.create.call_args.kwargs["timeout"] == 12.0
+    assert registry.stats()["models"]["gpt-4"]["completed"] == 2
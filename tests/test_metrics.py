@@ -0,0 +1,60 @@
+import pytest
+from unittest.mock import AsyncMock
+from src.core.agent import Agent
+from src.core.agent_manager import AgentManager, RUNS_TOTAL
+from src.core.metrics import MetricsRegistry
+from src.database.db_setup import Database
+
+def test_render_text_exposition_format():
+    """Test counters, histograms and gauges render in the Prometheus text format"""
+    registry = MetricsRegistry()
+    registry.counter("jobs", "Finished jobs", ("status",)).labels("ok").inc(2)
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+    registry.gauge("depth", "Queue depth", ("queue",)).set_function(lambda: {("a",): 3})
+
+    assert registry.render().splitlines() == [
+        "# HELP jobs Finished jobs",
+        "# TYPE jobs counter",
+        'jobs_total{status="ok"} 2',
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 3.65",
+        "latency_seconds_count 4",
+        "# HELP depth Queue depth",
+        "# TYPE depth gauge",
+        'depth{queue="a"} 3',
+    ]
+
+def test_registry_returns_existing_metric():
+    """Test registering a name twice returns the same metric unless it conflicts"""
+    registry = MetricsRegistry()
+    counter = registry.counter("jobs", "Finished jobs", ("status",))
+    assert registry.counter("jobs", "Finished jobs", ("status",)) is counter
+    with pytest.raises(ValueError):
+        registry.gauge("jobs", "Finished jobs")
+    with pytest.raises(ValueError):
+        counter.labels("ok", "extra")
+
+@pytest.mark.asyncio
+async def test_manager_counts_runs_by_status_and_type():
+    """Test finished runs are counted per agent type and status"""
+    manager = AgentManager(database=Database(":memory:"))
+    manager.register_agent_class(type("MeteredAgent", (Agent,), {
+        "AGENT_TYPE": "metered",
+        "execute_task": AsyncMock(side_effect=[{"result": "done"}, RuntimeError("boom")])
+    }))
+    completed = RUNS_TOTAL.labels("metered", "completed").value
+    failed = RUNS_TOTAL.labels("metered", "failed").value
+
+    agent_id = await manager.create_agent("metered", "metered", {})
+    await manager.run_task(agent_id, {"task": "one"})
+    with pytest.raises(RuntimeError):
+        await manager.run_task(agent_id, {"task": "two"})
+
+    assert RUNS_TOTAL.labels("metered", "completed").value == completed + 1
+    assert RUNS_TOTAL.labels("metered", "failed").value == failed + 1
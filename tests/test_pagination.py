@@ -0,0 +1,110 @@
+import pytest
+import json
+from src.core.agent_manager import AgentManager
+from src.core.pagination import decode_cursor, encode_cursor, normalize_timestamp
+from src.database.db_setup import Database
+from src.database.run_journal import RunJournal
+
+@pytest.fixture
+def manager():
+    """Provide an AgentManager over an in-memory database with three agents and five runs"""
+    db = Database(":memory:")
+    with db.get_conn() as conn:
+        for i, agent_type in enumerate(["storyteller", "default", "storyteller"]):
+            conn.execute("""
+                INSERT INTO agents (agent_id, name, config, status, type)
+                VALUES (?, ?, ?, ?, ?)
+            """, (f"agent-{i}", f"agent {i}", json.dumps({"model_name": "gpt-4"}), "inactive", agent_type))
+        for i in range(5):
+            conn.execute("""
+                INSERT INTO agent_runs (run_id, agent_id, task, status, result, started_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (
+                f"run-{i}", "agent-0", json.dumps({"task": i}),
+                "failed" if i == 2 else "completed", json.dumps(f"result {i}"),
+                f"2024-01-01 00:00:0{i}"
+            ))
+    return AgentManager(database=db)
+
+def test_cursor_round_trip():
+    """Test cursors decode to the values they were built from"""
+    assert decode_cursor(encode_cursor("2024-01-01 00:00:00", "run-1"), 2) == ["2024-01-01 00:00:00", "run-1"]
+    with pytest.raises(ValueError):
+        decode_cursor("not a cursor", 2)
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(1), 2)
+
+def test_normalize_timestamp():
+    """Test ISO timestamps are converted to the stored naive UTC form"""
+    assert normalize_timestamp("2024-01-01T01:00:00+01:00") == "2024-01-01 00:00:00"
+    assert normalize_timestamp("2024-01-01") == "2024-01-01 00:00:00"
+    with pytest.raises(ValueError):
+        normalize_timestamp("yesterday")
+
+@pytest.mark.asyncio
+async def test_list_agents_pages_in_creation_order(manager):
+    """Test keyset pagination over agents"""
+    page, cursor = await manager.list_agents(limit=2)
+    assert [agent["id"] for agent in page] == ["agent-0", "agent-1"]
+    assert cursor is not None
+
+    page, cursor = await manager.list_agents(limit=2, after=cursor)
+    assert [agent["id"] for agent in page] == ["agent-2"]
+    assert cursor is None
+
+@pytest.mark.asyncio
+async def test_list_agents_projection_and_filters(manager):
+    """Test field projection and type filter on agents"""
+    agents, _ = await manager.list_agents(fields="id,name", agent_type="storyteller")
+    assert agents == [
+        {"id": "agent-0", "name": "agent 0"},
+        {"id": "agent-2", "name": "agent 2"}
+    ]
+    with pytest.raises(ValueError):
+        await manager.list_agents(fields="id,secret")
+
+@pytest.mark.asyncio
+async def test_get_all_agents_keeps_full_shape(manager):
+    """Test the unpaginated listing still returns every field"""
+    agents = await manager.get_all_agents()
+    assert len(agents) == 3
+    assert agents[0]["config"] == {"model_name": "gpt-4"}
+    assert set(agents[0]) == {"id", "name", "type", "status", "config", "created_at"}
+
+@pytest.mark.asyncio
+async def test_list_runs_pages_newest_first(manager):
+    """Test keyset pagination over runs"""
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = await manager.list_runs("agent-0", limit=2, after=cursor, fields="run_id")
+        seen.extend(run["run_id"] for run in page)
+        if cursor is None:
+            break
+    assert seen == ["run-4", "run-3", "run-2", "run-1", "run-0"]
+
+@pytest.mark.asyncio
+async def test_list_runs_filters_and_projection(manager):
+    """Test status and time-range filters with projection"""
+    runs, _ = await manager.list_runs("agent-0", status="completed", fields="run_id,result",
+                                      started_after="2024-01-01T00:00:01",
+                                      started_before="2024-01-01T00:00:04")
+    assert runs == [
+        {"run_id": "run-3", "result": "result 3"},
+        {"run_id": "run-1", "result": "result 1"}
+    ]
+
+@pytest.mark.asyncio
+async def test_list_runs_includes_queued_runs(manager):
+    """Test runs still in the run journal show up on the first page"""
+    manager.run_journal = RunJournal(manager.db, flush_interval=60)
+    manager.run_journal.record_start("run-9", "agent-0", "{}", "2024-01-01 00:00:09")
+
+    runs, cursor = await manager.list_runs("agent-0", limit=2, fields="run_id,status")
+    assert runs == [
+        {"run_id": "run-9", "status": "running"},
+        {"run_id": "run-4", "status": "completed"}
+    ]
+    runs, _ = await manager.list_runs("agent-0", limit=2, after=cursor, fields="run_id")
+    assert [run["run_id"] for run in runs] == ["run-3", "run-2"]
+    await manager.run_journal.close()
@@ -0,0 +1,68 @@
+import pytest
+import time
+from unittest.mock import MagicMock
+from src.llm import client_registry
+from src.llm.client_registry import LLMClientRegistry
+from src.llm.providers import CompletionRequest, LLMProviderError, SimulatedProvider
+
+REQUEST = CompletionRequest(model="sim-1", messages=[{"role": "user", "content": "a fox story"}])
+
+@pytest.mark.asyncio
+async def test_simulated_provider_is_deterministic():
+    """Test identical requests get identical text, streamed or not"""
+    provider = SimulatedProvider(tokens_per_second=0, latency=0, distribution="fixed", completion_tokens=12)
+    first = await provider.complete(REQUEST)
+    assert first.completion_tokens == 12
+    assert (await provider.complete(REQUEST)).text == first.text
+    assert "".join([delta async for delta in provider.stream(REQUEST)]) == first.text
+
+    other = CompletionRequest(model="sim-1", messages=[{"role": "user", "content": "a bird story"}])
+    assert (await provider.complete(other)).text != first.text
+
+@pytest.mark.asyncio
+async def test_simulated_provider_paces_and_fails():
+    """Test latency plus token rate set the duration, and errors and timeouts are raised"""
+    provider = SimulatedProvider(
+        tokens_per_second=200, latency=0.05, distribution="fixed", completion_tokens=10
+    )
+    start = time.perf_counter()
+    await provider.complete(REQUEST)
+    assert time.perf_counter() - start >= 0.1
+
+    slow = CompletionRequest(model="sim-1", messages=REQUEST.messages, timeout=0.01)
+    with pytest.raises(TimeoutError):
+        await provider.complete(slow)
+
+    provider.error_rate = 1.0
+    results = await provider.batch([REQUEST, REQUEST])
+    assert all(isinstance(result, LLMProviderError) for result in results)
+
+    with pytest.raises(ValueError):
+        SimulatedProvider(distribution="uniform")
+
+@pytest.mark.asyncio
+async def test_agent_config_selects_provider(mocker):
+    """Test agents use the provider named in their config, created once from settings"""
+    from src.agents.storyteller import StorytellerAgent
+
+    client = MagicMock()
+    registry = LLMClientRegistry(
+        client_factory=lambda: client,
+        provider_settings={"simulated": {"latency": 0, "tokens_per_second": 0, "completion_tokens": 7}}
+    )
+    mocker.patch.object(client_registry, "_registry", registry)
+    assert registry.get_provider("simulated") is registry.get_provider("simulated")
+    assert registry.get_provider().name == "openai"
+    with pytest.raises(ValueError):
+        registry.get_provider("missing")
+
+    agent = StorytellerAgent(
+        id="test-id", name="teller", model_name="sim-1", tools=[],
+        temperature=0.5, database=MagicMock(), provider="simulated"
+    )
+    mocker.patch.object(agent.config_manager, "get_config", return_value=StorytellerAgent.DEFAULT_CONFIG)
+    story = await agent.generate_story("dragons")
+    assert len(story.split()) == 7
+    assert await agent.generate_story("dragons") == story
+    client.chat.completions.create.assert_not_called()
+    assert registry.stats()["providers"] == ["openai", "simulated"]
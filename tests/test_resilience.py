@@ -0,0 +1,159 @@
+import pytest
+import asyncio
+import time
+from src.core.agent import Agent
+from src.core.agent_manager import AgentManager
+from src.database.db_setup import Database
+from src.database.run_journal import RunJournal
+from src.llm.client_registry import LLMClientRegistry
+from src.llm.providers import LLMProviderError
+from src.llm.resilience import (
+    LatencyTracker, ResiliencePolicy, call_with_policy, chunks_with_timeout, is_retryable
+)
+
+RETRYING = ResiliencePolicy(max_attempts=3, backoff_base=0.01, backoff_max=0.02)
+
+def test_policy_from_config_and_latency_quantile():
+    """Test agent type policies inherit defaults and quantiles use nearest rank"""
+    default = ResiliencePolicy.from_dict({"max_attempts": 4, "attempt_timeout": 20})
+    policy = ResiliencePolicy.from_dict({"hedge": True, "unknown": 1}, default)
+    assert (policy.max_attempts, policy.attempt_timeout, policy.hedge) == (4, 20.0, True)
+
+    tracker = LatencyTracker()
+    assert tracker.quantile(0.95) is None
+    for i in range(1, 101):
+        tracker.observe(i / 100)
+    assert tracker.quantile(0.95) == 0.95
+    assert is_retryable(LLMProviderError("down", status_code=503))
+    assert not is_retryable(LLMProviderError("bad request", status_code=400))
+
+@pytest.mark.asyncio
+async def test_retries_retryable_errors_only():
+    """Test 5xx and timeouts are retried with backoff and other errors raised at once"""
+    registry = LLMClientRegistry()
+    failures = [LLMProviderError("down", status_code=503), asyncio.TimeoutError()]
+
+    async def flaky(limits):
+        if failures:
+            raise failures.pop(0)
+        return "story"
+
+    assert await call_with_policy(registry, "m", flaky, RETRYING) == "story"
+
+    calls = []
+
+    async def invalid(limits):
+        calls.append(limits)
+        raise LLMProviderError("bad request", status_code=400)
+
+    with pytest.raises(LLMProviderError):
+        await call_with_policy(registry, "m", invalid, RETRYING)
+    assert len(calls) == 1
+
+    # Never repeated once the call has had visible effects
+    failures = [LLMProviderError("down", status_code=503)]
+    with pytest.raises(LLMProviderError):
+        await call_with_policy(registry, "m", flaky, RETRYING, can_retry=lambda: False)
+
+@pytest.mark.asyncio
+async def test_stream_timeout_bounds_each_chunk_not_the_whole_stream():
+    """Test a slow stream outlasting the timeout succeeds while tokens keep coming"""
+    registry = LLMClientRegistry()
+    policy = ResiliencePolicy(attempt_timeout=0.1, max_attempts=2, backoff_base=0.01)
+    gaps = [[0.04] * 8, [0.3], [0.04] * 3]
+
+    async def chunks(delays):
+        for delay in delays:
+            await asyncio.sleep(delay)
+            yield "word "
+
+    async def call(limits):
+        pieces = []
+        async for piece in chunks_with_timeout(chunks(gaps.pop(0)), limits.timeout):
+            pieces.append(piece)
+        return "".join(pieces)
+
+    start = time.perf_counter()
+    assert await call_with_policy(registry, "m", call, policy, stream=True) == "word " * 8
+    assert time.perf_counter() - start > 0.3
+
+    # A stalled stream times out at the next chunk and is retried
+    start = time.perf_counter()
+    assert await call_with_policy(registry, "m", call, policy, stream=True) == "word " * 3
+    assert time.perf_counter() - start < 0.3
+
+@pytest.mark.asyncio
+async def test_attempt_timeout_and_hedging():
+    """Test slow attempts are cut off, and a hedge wins over a slow primary, which is cancelled"""
+    registry = LLMClientRegistry()
+    delays = [1.0, 0.01]
+
+    async def slow_then_fast(limits):
+        await asyncio.sleep(delays.pop(0))
+        return "story"
+
+    timed_out = ResiliencePolicy(attempt_timeout=0.05, max_attempts=2, backoff_base=0.01)
+    start = time.perf_counter()
+    assert await call_with_policy(registry, "m", slow_then_fast, timed_out) == "story"
+    assert time.perf_counter() - start < 0.5
+
+    cancelled = []
+
+    async def primary_hangs(limits):
+        try:
+            await asyncio.sleep(delays.pop(0))
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return "story"
+
+    delays = [1.0, 0.01]
+    hedged = ResiliencePolicy(hedge=True, hedge_after=0.05)
+    start = time.perf_counter()
+    assert await call_with_policy(registry, "m", primary_hangs, hedged) == "story"
+    assert time.perf_counter() - start < 0.5
+    assert cancelled == [True]
+    assert registry.scheduler_for("m").in_flight == 0
+
+    # Without hedge_after, hedging waits for enough latency samples
+    delays = [0.01]
+    observed = ResiliencePolicy(hedge=True, hedge_min_samples=1000)
+    assert await call_with_policy(registry, "m", primary_hangs, observed) == "story"
+    assert delays == []
+
+class FlakyAgent(Agent):
+    AGENT_TYPE = "flaky"
+
+    registry = None
+    failures = 0
+
+    async def execute_task(self, task):
+        async def call(limits):
+            if FlakyAgent.failures:
+                FlakyAgent.failures -= 1
+                raise LLMProviderError("down", status_code=503)
+            return "story"
+        return {"result": await call_with_policy(self.registry, "m", call, RETRYING)}
+
+@pytest.mark.asyncio
+async def test_attempts_are_recorded_on_the_run():
+    """Test every request a run sent is saved with its outcome"""
+    db = Database(":memory:")
+    journal = RunJournal(db)
+    manager = AgentManager(database=db, run_journal=journal)
+    manager.register_agent_class(FlakyAgent)
+    FlakyAgent.registry = LLMClientRegistry()
+    FlakyAgent.failures = 2
+    agent_id = await manager.create_agent("flaky", "flaky", {})
+
+    await manager.run_task(agent_id, {"task": "story"})
+    await journal.flush()
+    runs, _ = await manager.list_runs(agent_id, fields="run_id,attempts")
+    attempts = runs[0]["attempts"]
+    assert [(a["attempt"], a["outcome"], a["hedge"]) for a in attempts] == [
+        (1, "error", False), (2, "error", False), (3, "ok", False)
+    ]
+    assert attempts[0]["error"] == "LLMProviderError"
+    assert attempts[2]["start_ms"] >= attempts[1]["start_ms"] + attempts[1]["duration_ms"]
+    assert (await manager.get_run(runs[0]["run_id"]))["attempts"] == attempts
+    await journal.close()
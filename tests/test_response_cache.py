@@ -0,0 +1,85 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from src.agents.storyteller import StorytellerAgent
+from src.core.agent_manager import AgentManager
+from src.database.db_setup import Database
+from src.llm import client_registry
+from src.llm.client_registry import LLMClientRegistry
+from src.llm.response_cache import ResponseCache
+
+MESSAGES = [{"role": "user", "content": "Tell me a story"}]
+
+def test_make_key_is_deterministic():
+    """Test keys depend on model, messages and params only"""
+    key = ResponseCache.make_key("gpt-4", MESSAGES, {"temperature": 0})
+    assert key == ResponseCache.make_key("gpt-4", list(MESSAGES), {"temperature": 0})
+    assert key != ResponseCache.make_key("gpt-3.5-turbo", MESSAGES, {"temperature": 0})
+    assert key != ResponseCache.make_key("gpt-4", MESSAGES, {"temperature": 0.5})
+    # Encoded like stored JSON, with keys sorted
+    params = {"temperature": 0, "max_tokens": 100}
+    assert ResponseCache.make_key("gpt-4", MESSAGES, params) == ResponseCache.make_key(
+        "gpt-4", MESSAGES, dict(reversed(params.items()))
+    )
+
+@pytest.mark.asyncio
+async def test_get_put_and_ttl(mocker):
+    """Test stored responses are returned until they expire"""
+    cache = ResponseCache(Database(":memory:"), ttl=100)
+    now = mocker.patch("src.llm.response_cache.time.time", return_value=1000.0)
+
+    assert await cache.get("k") is None
+    await cache.put("k", "gpt-4", "Once upon a time")
+    assert await cache.get("k") == "Once upon a time"
+
+    now.return_value = 1100.0
+    assert await cache.get("k") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+    assert cache.stats()["bytes"] == 0
+
+@pytest.mark.asyncio
+async def test_evicts_least_recently_used_over_budget(mocker):
+    """Test the byte budget evicts entries in least recently used order"""
+    cache = ResponseCache(Database(":memory:"), max_bytes=25)
+    now = mocker.patch("src.llm.response_cache.time.time", return_value=1000.0)
+
+    await cache.put("a", "gpt-4", "a" * 10)
+    now.return_value = 1100.0
+    await cache.put("b", "gpt-4", "b" * 10)
+    now.return_value = 1200.0
+    assert await cache.get("a") == "a" * 10
+    await cache.put("c", "gpt-4", "c" * 10)
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == "a" * 10
+    assert await cache.get("c") == "c" * 10
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 20
+
+@pytest.mark.asyncio
+async def test_storyteller_run_records_cache_hit(mocker):
+    """Test a repeated temperature-0 story is served from cache and marked on the run"""
+    db = Database(":memory:")
+    client = MagicMock()
+    response = MagicMock()
+    response.choices[0].message.content = "Once upon a time"
+    client.chat.completions.create = AsyncMock(return_value=response)
+    registry = LLMClientRegistry(client_factory=lambda: client)
+    registry.response_cache = ResponseCache(db)
+    mocker.patch.object(client_registry, "_registry", registry)
+
+    manager = AgentManager(database=db)
+    manager.register_agent_class(StorytellerAgent)
+    agent_id = await manager.create_agent(
+        "teller", "storyteller", {"model_name": "gpt-4", "temperature": 0}
+    )
+    task = {"task": "generate_story", "params": {"theme": "dragons"}}
+
+    first = await manager.run_task(agent_id, task)
+    second = await manager.run_task(agent_id, task)
+
+    assert first["result"] == second["result"] == "Once upon a time"
+    client.chat.completions.create.assert_awaited_once()
+    runs, _ = await manager.list_runs(agent_id, fields="run_id,cache_hit")
+    assert [run["cache_hit"] for run in runs] == [True, False]
+    assert (await manager.get_run(runs[0]["run_id"]))["cache_hit"] is True
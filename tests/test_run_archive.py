@@ -0,0 +1,118 @@
+import pytest
+import json
+from datetime import datetime, timedelta
+from src.core.agent_manager import AgentManager
+from src.database.db_setup import Database
+from src.database.run_archive import RunArchive, TraceNotArchivedError
+
+OLD = datetime.utcnow() - timedelta(days=60)
+
+@pytest.fixture
+def manager(tmp_path):
+    """Provide an AgentManager with six old runs, one still running, and one recent run"""
+    db = Database(":memory:")
+    with db.get_conn() as conn:
+        conn.execute("""
+            INSERT INTO agents (agent_id, name, config, status, type)
+            VALUES ('agent-0', 'agent 0', '{}', 'inactive', 'default')
+        """)
+        runs = [
+            (f"run-{i}", "completed", (OLD + timedelta(minutes=i)).isoformat(" "))
+            for i in range(6)
+        ]
+        runs.append(("run-6", "running", (OLD + timedelta(minutes=6)).isoformat(" ")))
+        runs.append(("run-7", "completed", datetime.utcnow().isoformat(" ")))
+        for run_id, status, started_at in runs:
+            conn.execute("""
+                INSERT INTO agent_runs (run_id, agent_id, task, status, result, started_at)
+                VALUES (?, 'agent-0', ?, ?, ?, ?)
+            """, (run_id, json.dumps({"task": run_id}), status, json.dumps(f"result {run_id}"), started_at))
+    archive = RunArchive(db, tmp_path / "archive", retention=30 * 24 * 3600, batch_size=4)
+    return AgentManager(database=db, run_archive=archive)
+
+async def hot_run_ids(manager):
+    runs, _ = await manager.list_runs("agent-0", fields="run_id")
+    return [run["run_id"] for run in runs]
+
+@pytest.mark.asyncio
+async def test_archive_moves_old_finished_runs(manager):
+    """Test only finished runs past retention leave agent_runs, in batches"""
+    archive = manager.run_archive
+    assert await archive.archive_once() == 4
+    assert await archive.archive_once() == 2
+    assert await archive.archive_once() == 0
+
+    assert await hot_run_ids(manager) == ["run-7", "run-6"]
+    archived = await archive.read_runs("agent-0")
+    assert [run["run_id"] for run in archived] == [f"run-{i}" for i in range(5, -1, -1)]
+    assert archived[0]["result"] == json.dumps("result run-5")
+
+@pytest.mark.asyncio
+async def test_list_runs_pages_across_tiers(manager):
+    """Test include_archived merges both tiers under one keyset order"""
+    while await manager.run_archive.archive_once():
+        pass
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = await manager.list_runs(
+            "agent-0", limit=3, after=cursor, fields="run_id,result", include_archived=True
+        )
+        seen.extend(page)
+        if cursor is None:
+            break
+    assert [run["run_id"] for run in seen] == [f"run-{i}" for i in range(7, -1, -1)]
+    assert seen[-1]["result"] == "result run-0"
+
+    runs, _ = await manager.list_runs(
+        "agent-0", fields="run_id", status="completed", include_archived=True,
+        started_before=(OLD + timedelta(minutes=2)).isoformat()
+    )
+    assert [run["run_id"] for run in runs] == ["run-1", "run-0"]
+
+@pytest.mark.asyncio
+async def test_segments_rotate_and_index_follows_agent(manager):
+    """Test full segments are rotated and deleting an agent drops its index"""
+    manager.run_archive.segment_max_bytes = 1
+    while await manager.run_archive.archive_once():
+        pass
+    segments = sorted(path.name for path in manager.run_archive.directory.iterdir())
+    assert segments == ["runs-000001.seg", "runs-000002.seg"]
+
+    await manager.delete_agent("agent-0")
+    assert await manager.run_archive.read_runs("agent-0") == []
+
+@pytest.mark.asyncio
+async def test_archived_runs_keep_their_trace(manager):
+    """Test a run's spans are archived with it and its trace is still served"""
+    with manager.db.get_conn() as conn:
+        conn.executemany("""
+            INSERT INTO run_spans (run_id, span_id, parent_id, name, start_offset, duration, attributes)
+            VALUES ('run-5', ?, ?, ?, ?, ?, '{}')
+        """, [(1, None, "execute_task", 0.0, 0.5), (2, 1, "llm.generate", 0.1, 0.3)])
+    while await manager.run_archive.archive_once():
+        pass
+
+    trace = await manager.get_run_trace("run-5", agent_id="agent-0")
+    assert trace["archived"] is True
+    assert trace["agent_id"] == "agent-0"
+    assert [(s["name"], s["depth"]) for s in trace["spans"]] == [("execute_task", 0), ("llm.generate", 1)]
+    assert trace["duration_ms"] == 500.0
+    assert (await manager.get_run_trace("run-4", agent_id="agent-0"))["spans"] == []
+    with pytest.raises(ValueError):
+        await manager.get_run_trace("run-5")
+
+@pytest.mark.asyncio
+async def test_runs_archived_without_spans_report_missing_trace(manager):
+    """Test runs archived before spans were kept raise TraceNotArchivedError"""
+    archive = manager.run_archive
+    legacy = {"run_id": "run-old", "task": "{}", "status": "completed", "started_at": OLD.isoformat(" ")}
+    index_rows = archive._append_blocks({"agent-0": [legacy]})
+    with manager.db.get_conn() as conn:
+        conn.executemany("""
+            INSERT INTO archived_run_blocks
+            (agent_id, segment, byte_offset, byte_length, run_count, min_started_at, max_started_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, index_rows)
+    with pytest.raises(TraceNotArchivedError):
+        await manager.get_run_trace("run-old", agent_id="agent-0")
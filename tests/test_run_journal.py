@@ -0,0 +1,156 @@
+import pytest
+import asyncio
+import json
+import sqlite3
+from src.core.agent_manager import AgentManager
+from src.database.db_setup import Database
+from src.database.run_journal import RunJournal
+
+@pytest.fixture
+def database():
+    """Provide an in-memory database with one agent"""
+    db = Database(":memory:")
+    with db.get_conn() as conn:
+        conn.execute("""
+            INSERT INTO agents (agent_id, name, config, status)
+            VALUES (?, ?, ?, ?)
+        """, ("agent-1", "test-agent", "{}", "inactive"))
+    return db
+
+async def fetch_runs(db):
+    async with db.read() as conn:
+        cursor = await conn.execute("SELECT * FROM agent_runs ORDER BY started_at")
+        return [dict(row) for row in await cursor.fetchall()]
+
+@pytest.mark.asyncio
+async def test_start_and_finish_collapse_into_one_insert(database):
+    """Test a run started and finished in one window is written once"""
+    journal = RunJournal(database, flush_interval=60)
+    journal.record_start("run-1", "agent-1", json.dumps({"task": "t"}), "2024-01-01 00:00:00")
+    journal.record_finish("run-1", "agent-1", "completed", json.dumps("done"), "2024-01-01 00:00:01")
+
+    assert await fetch_runs(database) == []
+    await journal.flush()
+
+    runs = await fetch_runs(database)
+    assert len(runs) == 1
+    assert runs[0]["status"] == "completed"
+    assert json.loads(runs[0]["result"]) == "done"
+    await journal.close()
+    await database.close()
+
+@pytest.mark.asyncio
+async def test_finish_after_flush_updates_row(database):
+    """Test a status transition queued after the insert committed"""
+    journal = RunJournal(database, flush_interval=60)
+    journal.record_start("run-1", "agent-1", "{}", "2024-01-01 00:00:00")
+    await journal.flush()
+    journal.record_finish("run-1", "agent-1", "failed", json.dumps("boom"), "2024-01-01 00:00:01")
+    await journal.close()
+
+    runs = await fetch_runs(database)
+    assert runs[0]["status"] == "failed"
+    assert runs[0]["completed_at"] == "2024-01-01 00:00:01"
+    await database.close()
+
+@pytest.mark.asyncio
+async def test_queued_runs_are_visible_before_commit(database):
+    """Test read-your-writes through pending_runs/merge_runs"""
+    journal = RunJournal(database, flush_interval=60)
+    journal.record_start("run-1", "agent-1", "{}", "2024-01-01 00:00:00")
+    await journal.flush()
+    journal.record_start("run-2", "agent-1", "{}", "2024-01-01 00:00:02")
+    journal.record_finish("run-1", "agent-1", "completed", "1", "2024-01-01 00:00:03")
+
+    pending = journal.pending_runs("agent-1")
+    runs = journal.merge_runs(await fetch_runs(database), pending)
+
+    assert [run["run_id"] for run in runs] == ["run-2", "run-1"]
+    assert runs[1]["status"] == "completed"
+    assert journal.pending_runs("other-agent") == []
+    await journal.close()
+    await database.close()
+
+@pytest.mark.asyncio
+async def test_full_batch_flushes_early(database):
+    """Test reaching max_batch wakes the flusher before the interval"""
+    journal = RunJournal(database, flush_interval=60, max_batch=2)
+    journal.record_start("run-1", "agent-1", "{}", "2024-01-01 00:00:00")
+    journal.record_start("run-2", "agent-1", "{}", "2024-01-01 00:00:01")
+
+    # Give the flusher a moment; the 60s interval would never elapse
+    for _ in range(50):
+        if len(await fetch_runs(database)) == 2:
+            break
+        await asyncio.sleep(0.01)
+    assert len(await fetch_runs(database)) == 2
+    await journal.close()
+    await database.close()
+
+@pytest.mark.asyncio
+async def test_close_flushes_and_rejects_new_records(database):
+    """Test close() writes queued records and refuses new ones"""
+    journal = RunJournal(database, flush_interval=60)
+    journal.record_start("run-1", "agent-1", "{}", "2024-01-01 00:00:00")
+    await journal.close()
+
+    assert len(await fetch_runs(database)) == 1
+    with pytest.raises(RuntimeError):
+        journal.record_start("run-2", "agent-1", "{}", "2024-01-01 00:00:01")
+    await database.close()
+
+@pytest.mark.asyncio
+async def test_failed_flush_requeues_batch(database, mocker):
+    """Test records from a failed transaction are retried later"""
+    journal = RunJournal(database, flush_interval=60)
+    journal.record_start("run-1", "agent-1", "{}", "2024-01-01 00:00:00")
+    mocker.patch.object(database, "write", side_effect=sqlite3.OperationalError("database is locked"))
+    with pytest.raises(sqlite3.OperationalError):
+        await journal.flush()
+    assert [run["run_id"] for run in journal.pending_runs("agent-1")] == ["run-1"]
+
+    mocker.stopall()
+    await journal.close()
+    assert [run["run_id"] for run in await fetch_runs(database)] == ["run-1"]
+    await database.close()
+
+@pytest.mark.asyncio
+async def test_runs_of_deleted_agents_do_not_block_the_journal(database):
+    """Test records and spans whose agent was deleted are dropped, not retried"""
+    journal = RunJournal(database, flush_interval=60)
+    manager = AgentManager(database=database, run_journal=journal)
+    other = await manager.create_agent("other", "default", {})
+    journal.record_start("run-1", "agent-1", "{}", "2024-01-01 00:00:00")
+    await journal.flush()
+
+    # Deleted while run-1 finishes and run-2 is queued, both mid-flush
+    journal.record_start("run-2", "agent-1", "{}", "2024-01-01 00:00:01")
+    journal.record_finish("run-1", "agent-1", "completed", "{}", "2024-01-01 00:00:02")
+    journal.record_spans("run-1", [("s1", None, "run", 0.0, 1.0, "{}")])
+    journal.record_start("run-3", other, "{}", "2024-01-01 00:00:03")
+    async with database.write() as conn:
+        await conn.execute("DELETE FROM agents WHERE agent_id = ?", ("agent-1",))
+    await journal.flush()
+    assert [run["run_id"] for run in await fetch_runs(database)] == ["run-3"]
+    assert journal.pending_runs(other) == []
+
+    # Deleting through the manager discards what is still queued
+    journal.record_start("run-4", other, "{}", "2024-01-01 00:00:04")
+    await manager.delete_agent(other)
+    assert journal.pending_runs(other) == []
+    await journal.close()
+    assert await fetch_runs(database) == []
+    await database.close()
+
+@pytest.mark.asyncio
+async def test_manager_lists_runs_before_commit(database):
+    """Test list_runs returns every field for runs still queued in the journal"""
+    journal = RunJournal(database, flush_interval=60)
+    manager = AgentManager(database=database, run_journal=journal)
+    journal.record_start("run-1", "agent-1", json.dumps({"task": "t"}), "2024-01-01 00:00:00")
+
+    runs, _ = await manager.list_runs("agent-1")
+    assert runs[0]["run_id"] == "run-1"
+    assert runs[0]["output"] is None
+    await journal.close()
+    await database.close()
@@ -0,0 +1,130 @@
+import pytest
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+from src.core.agent import Agent
+from src.core.agent_manager import AgentManager
+from src.core.run_stream import RunStream
+from src.database.db_setup import Database
+from src.database.run_journal import RunJournal
+
+class ChattyAgent(Agent):
+    """Agent that streams a fixed list of deltas, pausing between them"""
+    AGENT_TYPE = "chatty"
+    deltas = ["Once ", "upon ", "a time"]
+
+    async def execute_task(self, task):
+        return {"result": "".join(self.deltas)}
+
+    async def stream_task(self, task, emit):
+        for delta in self.deltas:
+            await asyncio.sleep(0)
+            await emit(delta)
+        return {"result": "".join(self.deltas)}
+
+async def collect(events):
+    return [event async for event in events]
+
+@pytest.mark.asyncio
+async def test_follow_replays_from_offset_and_coalesces():
+    """Test late subscribers get buffered text in one delta from their offset"""
+    stream = RunStream("run-1", "agent-1")
+    stream.append("Once ")
+    stream.append("upon ")
+    follower = asyncio.create_task(collect(stream.follow(offset=2)))
+    await asyncio.sleep(0)
+    stream.append("a time")
+    stream.finish("completed", {"result": "Once upon a time"})
+
+    events = await follower
+    assert "".join(event["text"] for event in events[:-1]) == "ce upon a time"
+    assert events[0] == {"event": "delta", "offset": 10, "text": "ce upon "}
+    assert events[-1]["event"] == "done"
+    assert events[-1]["result"] == {"result": "Once upon a time"}
+
+@pytest.fixture
+def manager():
+    """Provide an AgentManager with one streaming agent"""
+    manager = AgentManager(database=Database(":memory:"))
+    manager.register_agent_class(ChattyAgent)
+    return manager
+
+@pytest.mark.asyncio
+async def test_stream_run_saves_output_and_resumes(manager):
+    """Test a streamed run is followed live, saved, and resumable after it ends"""
+    agent_id = await manager.create_agent("chatty", "chatty", {})
+    manager.STREAM_SAVE_INTERVAL = 0
+
+    run_id = await manager.start_stream(agent_id, {"task": "story"})
+    events = await collect(manager.follow_run(run_id))
+    assert "".join(event["text"] for event in events if event["event"] == "delta") == "Once upon a time"
+    assert events[-1]["status"] == "completed"
+
+    await manager.close()
+    run = await manager.get_run(run_id)
+    assert run["output"] == "Once upon a time"
+    assert run["result"] == {"result": "Once upon a time"}
+
+    events = await collect(manager.follow_run(run_id, offset=10))
+    assert events[0] == {"event": "delta", "offset": 16, "text": "a time"}
+    assert events[-1]["event"] == "done"
+
+@pytest.mark.asyncio
+async def test_stream_run_through_journal(manager):
+    """Test partial output queued in the run journal is visible before flushing"""
+    manager.run_journal = RunJournal(manager.db, flush_interval=60)
+    agent_id = await manager.create_agent("chatty", "chatty", {})
+
+    run_id = await manager.start_stream(agent_id, {"task": "story"})
+    await manager.close()
+    assert (await manager.get_run(run_id))["output"] == "Once upon a time"
+
+    await manager.run_journal.close()
+    assert (await manager.get_run(run_id))["status"] == "completed"
+
+@pytest.mark.asyncio
+async def test_non_streaming_agent_finishes_with_result(manager):
+    """Test agents without streaming support still complete through the stream"""
+    manager.register_agent_class(type("QuietAgent", (Agent,), {
+        "AGENT_TYPE": "quiet",
+        "execute_task": AsyncMock(return_value={"result": "done"})
+    }))
+    agent_id = await manager.create_agent("quiet", "quiet", {})
+
+    run_id = await manager.start_stream(agent_id, {"task": "anything"})
+    events = await collect(manager.follow_run(run_id))
+    assert events == [{"event": "done", "run_id": run_id, "status": "completed", "result": {"result": "done"}}]
+
+@pytest.mark.asyncio
+async def test_storyteller_streams_deltas(mocker):
+    """Test generate_story forwards chunks from a streamed completion"""
+    from src.agents.storyteller import StorytellerAgent
+    from src.llm import client_registry
+    from src.llm.client_registry import LLMClientRegistry
+
+    def chunk(text):
+        chunk = MagicMock()
+        chunk.choices[0].delta.content = text
+        return chunk
+
+    async def completion():
+        for text in ["Once ", None, "upon a time"]:
+            yield chunk(text)
+
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock(return_value=completion())
+    mocker.patch.object(client_registry, "_registry", LLMClientRegistry(client_factory=lambda: client))
+
+    agent = StorytellerAgent(
+        id="test-id", name="teller", model_name="gpt-4", tools=[],
+        temperature=0.5, database=MagicMock()
+    )
+    mocker.patch.object(agent.config_manager, "get_config", return_value=StorytellerAgent.DEFAULT_CONFIG)
+    deltas = []
+
+    async def emit(delta):
+        deltas.append(delta)
+
+    result = await agent.stream_task({"task": "generate_story", "params": {"theme": "owls"}}, emit)
+    assert deltas == ["Once ", "upon a time"]
+    assert result["result"] == "Once upon a time"
+    assert client.chat.completions.create.call_args.kwargs["stream"] is True
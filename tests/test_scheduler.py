@@ -0,0 +1,104 @@
+import pytest
+import asyncio
+import time
+from src.llm.client_registry import LLMClientRegistry, ModelLimits
+from src.llm.providers import LLMProviderError
+from src.llm.scheduler import ModelScheduler, TokenBucket, classify_error
+
+def test_classify_error():
+    """Test 429, 5xx and timeouts count as overload and only 429 as rate limiting"""
+    assert classify_error(LLMProviderError("slow down", status_code=429)) == (True, True, None)
+    assert classify_error(LLMProviderError("down", status_code=503)) == (True, False, None)
+    assert classify_error(LLMProviderError("bad", status_code=400)) == (False, False, None)
+    assert classify_error(asyncio.TimeoutError()) == (True, False, None)
+    assert classify_error(ValueError()) == (False, False, None)
+
+def test_token_bucket_delays_when_empty():
+    """Test taking past the budget delays the next caller by the refill time"""
+    bucket = TokenBucket(rate=100, capacity=2)
+    assert bucket.delay(2) == 0
+    bucket.take(2)
+    assert 0.005 < bucket.delay(1) <= 0.01
+
+@pytest.mark.asyncio
+async def test_aimd_limit_backs_off_and_recovers():
+    """Test overload halves the limit once per window and successes grow it back"""
+    scheduler = ModelScheduler(ModelLimits(max_in_flight=8, min_in_flight=2))
+    starts = [await scheduler.acquire() for _ in range(3)]
+    for started in starts:
+        scheduler.release(started, LLMProviderError("overloaded", status_code=503))
+    assert scheduler.stats()["concurrency_limit"] == 4
+    assert scheduler.overloaded == 3
+
+    for _ in range(30):
+        scheduler.release(await scheduler.acquire())
+    assert scheduler.stats()["concurrency_limit"] == 8
+
+    scheduler.limit = 1
+    scheduler.release(await scheduler.acquire(), LLMProviderError("overloaded", status_code=500))
+    assert scheduler.stats()["concurrency_limit"] == 2
+
+@pytest.mark.asyncio
+async def test_calls_queue_for_the_adaptive_limit():
+    """Test calls over the current limit wait in order instead of failing"""
+    scheduler = ModelScheduler(ModelLimits(max_in_flight=4))
+    scheduler.limit = 1
+    first = await scheduler.acquire()
+    second = asyncio.create_task(scheduler.acquire())
+    await asyncio.sleep(0.01)
+    assert not second.done()
+    assert scheduler.stats()["waiting"] == 1
+    scheduler.release(first)
+    scheduler.release(await second)
+    assert scheduler.stats()["in_flight"] == 0
+
+@pytest.mark.asyncio
+async def test_rate_limited_calls_are_requeued():
+    """Test a 429 pauses the model and the call is queued again until it succeeds"""
+    registry = LLMClientRegistry(default_limits=ModelLimits(cooldown=0.05, max_requeues=3))
+    attempts = []
+
+    async def call(limits):
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            raise LLMProviderError("slow down", status_code=429)
+        return "story"
+
+    assert await registry.run("gpt-4", call) == "story"
+    assert attempts[1] - attempts[0] >= 0.04
+    stats = registry.stats()["models"]["gpt-4"]
+    assert (stats["requeued"], stats["overloaded"]) == (2, 2)
+
+    async def always_limited(limits):
+        raise LLMProviderError("slow down", status_code=429)
+
+    with pytest.raises(LLMProviderError):
+        await registry.run("gpt-4", always_limited, can_requeue=lambda: False)
+
+@pytest.mark.asyncio
+async def test_models_on_one_api_key_share_its_budget():
+    """Test two models on a key draw from one token bucket and a 429 pauses both"""
+    registry = LLMClientRegistry.from_config({
+        "default": {"cooldown": 0.05},
+        "models": {"gpt-4": {"api_key": "team"}, "gpt-4o": {"api_key": "team"}},
+        "api_keys": {"team": {"tokens_per_minute": 6000}}
+    })
+    assert registry.scheduler_for("gpt-4").budget is registry.scheduler_for("gpt-4o").budget
+    assert registry.scheduler_for("other").budget is not registry.scheduler_for("gpt-4").budget
+    assert registry.scheduler_for("gpt-4", "simulated").budget is not registry.scheduler_for("gpt-4").budget
+
+    async def call(limits):
+        return "ok"
+
+    # The bucket holds 1000 tokens and refills 100 per second
+    await registry.run("gpt-4", call, tokens=1000)
+    start = time.monotonic()
+    await registry.run("gpt-4o", call, tokens=20)
+    assert time.monotonic() - start >= 0.15
+    assert registry.stats()["api_keys"]["openai:team"]["tokens_per_minute"] == 6000
+
+    registry.scheduler_for("gpt-4").release(
+        await registry.scheduler_for("gpt-4").acquire(),
+        LLMProviderError("slow down", status_code=429)
+    )
+    assert registry.stats()["models"]["gpt-4o"]["paused_for"] > 0
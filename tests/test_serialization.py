@@ -0,0 +1,78 @@
+import pytest
+import json
+import orjson
+from src.core import serialization
+from src.core.agent_manager import AgentManager
+from src.core.serialization import checked_column, decode_column, dumps, raw_column
+from src.database.db_setup import Database
+from src.database.migrations import migrate
+
+def test_dumps_is_compact_and_round_trips():
+    """Test stored JSON is compact text that decodes to the same value"""
+    value = {"task": "generate_story", "params": {"theme": "dragons"}, 1: [1.5, None]}
+    assert dumps(value) == '{"task":"generate_story","params":{"theme":"dragons"},"1":[1.5,null]}'
+    assert json.loads(dumps(value)) == json.loads(json.dumps(value))
+
+def test_decode_column_handles_empty_and_invalid():
+    """Test empty columns decode to {} and invalid JSON is wrapped"""
+    assert decode_column(None) == {}
+    assert decode_column('"story"') == "story"
+    assert decode_column("not json") == {"raw": "not json"}
+
+def test_raw_column_embeds_stored_json(mocker):
+    """Test raw columns are emitted verbatim, or decoded without Fragment support"""
+    class Fragment:
+        def __init__(self, value):
+            self.value = value
+
+    mocker.patch.object(serialization, "_Fragment", None)
+    assert raw_column('{"result":"story"}') == {"result": "story"}
+    assert raw_column(None) == {}
+
+    mocker.patch.object(serialization, "_Fragment", Fragment)
+    fragment = raw_column('{"result":"story"}')
+    assert isinstance(fragment, Fragment)
+    assert fragment.value == '{"result":"story"}'
+
+@pytest.mark.skipif(not hasattr(orjson, "Fragment"), reason="orjson.Fragment not available")
+def test_raw_columns_encode_like_decoded_ones():
+    """Test a response built from raw columns matches one built from decoded values"""
+    stored = dumps({"result": "Once upon a time"})
+    assert orjson.loads(orjson.dumps({"result": raw_column(stored)})) == {
+        "result": decode_column(stored)
+    }
+
+def test_checked_column_wraps_invalid_json():
+    """Test columns archived before migration 13 are made safe to embed"""
+    assert checked_column('{"a":1}') == '{"a":1}'
+    assert checked_column(None) is None
+    assert orjson.loads(checked_column('{"a": NaN}')) == {"raw": '{"a": NaN}'}
+
+@pytest.mark.skipif(not hasattr(orjson, "Fragment"), reason="orjson.Fragment not available")
+@pytest.mark.asyncio
+async def test_legacy_rows_are_served_as_valid_json():
+    """Test rows stored by stdlib json or as plain text encode to valid responses after migrating"""
+    db = Database(":memory:")
+    legacy_config = json.dumps({"temperature": float("nan")})
+    with db.get_conn() as conn:
+        conn.execute(
+            "INSERT INTO agents (agent_id, name, config, status) VALUES ('a1', 'legacy', ?, 'inactive')",
+            (legacy_config,)
+        )
+        conn.execute("""
+            INSERT INTO agent_runs (run_id, agent_id, task, status, result, started_at)
+            VALUES ('r1', 'a1', '{"task": "t"}', 'completed', 'plain text', '2024-01-01 00:00:00')
+        """)
+        conn.execute("PRAGMA user_version = 12")
+        migrate(conn)
+
+    manager = AgentManager(database=db)
+    run = await manager.get_run("r1", raw=True)
+    assert isinstance(run["result"], orjson.Fragment)
+    assert orjson.loads(orjson.dumps(run)) == {
+        **orjson.loads(orjson.dumps(await manager.get_run("r1"))),
+        "result": {"raw": "plain text"}
+    }
+    agents, _ = await manager.list_agents(raw=True)
+    assert orjson.loads(orjson.dumps(agents))[0]["config"] == {"raw": legacy_config}
+    await db.close()
@@ -0,0 +1,111 @@
+import pytest
+import asyncio
+from src.core.agent import Agent
+from src.core.agent_manager import AgentManager
+from src.core.single_flight import SingleFlight, normalize_task, task_key
+from src.database.db_setup import Database
+from src.database.run_journal import RunJournal
+
+def test_task_keys_ignore_key_order_and_whitespace():
+    """Test normalized duplicates share a key and other differences don't"""
+    task = {"task": "generate_story", "params": {"theme": "dragons", "cache": None}}
+    same = {"params": {"cache": None, "theme": "  dragons "}, "task": "generate_story"}
+    assert normalize_task(same) == normalize_task(task)
+    assert task_key("a", "v1", same) == task_key("a", "v1", task)
+    assert task_key("a", "v2", task) != task_key("a", "v1", task)
+    assert task_key("b", "v1", task) != task_key("a", "v1", task)
+    assert task_key("a", "v1", {**task, "params": {"theme": "Dragons"}}) != task_key("a", "v1", task)
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_results_and_errors():
+    """Test concurrent callers share one execution and later callers run again"""
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    results = await asyncio.gather(*(flight.do("k", f"run-{i}", work) for i in range(3)))
+    assert results == [(1, "run-0")] * 3
+    assert (await flight.do("k", "run-3", work)) == (2, "run-3")
+    assert len(flight) == 0
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    results = await asyncio.gather(*(flight.do("k", str(i), fail) for i in range(2)), return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+
+    # A joiner giving up leaves the shared execution running
+    leader = asyncio.create_task(flight.do("k", "leader", work))
+    await asyncio.sleep(0)
+    joiner = asyncio.create_task(flight.do("k", "joiner", work))
+    await asyncio.sleep(0)
+    joiner.cancel()
+    assert (await leader) == (3, "leader")
+
+class SlowAgent(Agent):
+    AGENT_TYPE = "slow"
+
+    executions = 0
+
+    async def execute_task(self, task):
+        SlowAgent.executions += 1
+        await asyncio.sleep(0.02)
+        return {"result": f"story {SlowAgent.executions}"}
+
+@pytest.mark.asyncio
+async def test_manager_coalesces_duplicate_runs():
+    """Test duplicates get the leader's result and their own run marked coalesced"""
+    db = Database(":memory:")
+    journal = RunJournal(db)
+    manager = AgentManager(database=db, run_journal=journal, coalesce_agent_types=["slow"])
+    manager.register_agent_class(SlowAgent)
+    agent_id = await manager.create_agent("slow", "slow", {})
+    task = {"task": "generate_story", "params": {"theme": "dragons"}}
+
+    results = await asyncio.gather(*(manager.run_task(agent_id, task) for _ in range(3)))
+    assert results == [{"result": "story 1"}] * 3
+    assert SlowAgent.executions == 1
+
+    await journal.flush()
+    runs, _ = await manager.list_runs(agent_id, fields="run_id,status,coalesced_from")
+    assert len(runs) == 3 and all(run["status"] == "completed" for run in runs)
+    leaders = [run for run in runs if run["coalesced_from"] is None]
+    assert len(leaders) == 1
+    assert all(run["coalesced_from"] == leaders[0]["run_id"] for run in runs if run not in leaders)
+
+    # Different tasks, and agent types that haven't opted in, run separately
+    other = {"task": "generate_story", "params": {"theme": "robots"}}
+    await asyncio.gather(manager.run_task(agent_id, task), manager.run_task(agent_id, other))
+    assert SlowAgent.executions == 3
+    manager.coalesce_agent_types.clear()
+    await asyncio.gather(*(manager.run_task(agent_id, task) for _ in range(2)))
+    assert SlowAgent.executions == 5
+    await journal.close()
+
+@pytest.mark.asyncio
+async def test_cancelled_joiner_records_its_leader():
+    """Test a duplicate cancelled while waiting still records the run it joined"""
+    db = Database(":memory:")
+    manager = AgentManager(database=db, coalesce_agent_types=["slow"])
+    manager.register_agent_class(SlowAgent)
+    agent_id = await manager.create_agent("slow", "slow", {})
+    task = {"task": "generate_story", "params": {"theme": "ghosts"}}
+
+    leader = asyncio.create_task(manager.run_task(agent_id, task))
+    await asyncio.sleep(0.005)
+    joiner = asyncio.create_task(manager.run_task(agent_id, task))
+    await asyncio.sleep(0.005)
+    joiner.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await joiner
+    await leader
+
+    runs, _ = await manager.list_runs(agent_id, fields="run_id,status,coalesced_from")
+    cancelled = [run for run in runs if run["status"] == "failed"]
+    assert len(cancelled) == 1
+    assert cancelled[0]["coalesced_from"] in {run["run_id"] for run in runs if run["status"] == "completed"}
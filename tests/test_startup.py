@@ -0,0 +1,59 @@
+import pytest
+import subprocess
+import sys
+from src.config.app_config import BASE_DIR
+from src.core.agent import Agent
+from src.core.agent_manager import AgentManager
+from src.core.startup import StartupTimer, measure_imports
+from src.database.db_setup import Database
+
+def test_importing_the_app_skips_heavy_optional_modules():
+    """Test agent classes, uvicorn and tenacity aren't imported until needed"""
+    deferred = ["src.agents.storyteller", "uvicorn", "tenacity", "openai"]
+    result = subprocess.run(
+        [sys.executable, "-c", f"import sys, src.main; print([m for m in {deferred!r} if m in sys.modules])"],
+        cwd=BASE_DIR, capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
+
+def test_startup_timer_and_import_breakdown():
+    """Test stages are recorded in order and imports are summed per package"""
+    timer = StartupTimer()
+    with timer.stage("database"):
+        pass
+    with pytest.raises(ValueError):
+        with timer.stage("services"):
+            raise ValueError("bad config")
+    assert [name for name, _ in timer.stages] == ["database", "services"]
+    assert timer.total() >= 0
+
+    total, packages = measure_imports("src.core.serialization", cwd=BASE_DIR)
+    assert "src.core" in packages and "src.core.serialization" not in packages
+    assert total >= packages["src.core"] > 0
+
+@pytest.mark.asyncio
+async def test_agent_types_are_imported_on_first_use():
+    """Test a type registered by path resolves to its class when an agent is loaded"""
+    db = Database(":memory:")
+    manager = AgentManager(database=db)
+    manager.register_agent_type("storyteller", "src.agents.storyteller:StorytellerAgent")
+    agent_id = await manager.create_agent("teller", "storyteller", {})
+    agent = await manager.get_agent(agent_id)
+
+    from src.agents.storyteller import StorytellerAgent
+    assert type(agent) is StorytellerAgent
+    assert manager._agent_classes["storyteller"] is StorytellerAgent
+    manager.register_agent_type("other", "src.core.agent:Agent")
+    assert manager._agent_class("other") is Agent
+    await db.close()
+
+@pytest.mark.asyncio
+async def test_startup_can_skip_background_jobs_on_another_database(tmp_path):
+    """Test profiling startup opens the given database and starts no background jobs"""
+    from src.api import routes
+    routes.startup(database_path=str(tmp_path / "copy.db"), background_jobs=False)
+    try:
+        assert routes.db.db_path == str(tmp_path / "copy.db")
+        assert routes.invalidations._task is None
+    finally:
+        await routes.shutdown()
@@ -0,0 +1,159 @@
+import pytest
+import pytest_asyncio
+import asyncio
+from src.core.agent import Agent
+from src.core.agent_manager import AgentManager
+from src.core.task_queue import TaskQueue, TaskQueueFullError
+from src.database.db_setup import Database
+from src.database.run_journal import RunJournal
+
+class EchoAgent(Agent):
+    """Agent that echoes its task after an optional delay"""
+    AGENT_TYPE = "echo"
+
+    async def execute_task(self, task):
+        await asyncio.sleep(task.get("delay", 0))
+        if task.get("fail"):
+            raise RuntimeError("boom")
+        return {"echo": task.get("input")}
+
+@pytest_asyncio.fixture
+async def manager():
+    """Provide a manager with a run journal and a two-worker task queue"""
+    db = Database(":memory:")
+    journal = RunJournal(db, flush_interval=0.01)
+    manager = AgentManager(database=db, run_journal=journal, task_queue=TaskQueue(workers=2, max_queue=10))
+    manager.register_agent_class(EchoAgent)
+    yield manager
+    await manager.close()
+    await journal.close()
+    await db.close()
+
+@pytest.mark.asyncio
+async def test_queue_runs_jobs_with_bounded_concurrency():
+    """Test no more than `workers` jobs run at once"""
+    queue = TaskQueue(workers=2)
+    running = []
+    peak = []
+
+    async def job():
+        running.append(1)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+
+    for i in range(6):
+        queue.submit(i, job)
+    assert await queue.close() == []
+    assert len(peak) == 6
+    assert max(peak) == 2
+
+@pytest.mark.asyncio
+async def test_queue_rejects_when_full():
+    """Test submissions beyond max_queue fail fast"""
+    queue = TaskQueue(workers=1, max_queue=1)
+    release = asyncio.Event()
+    queue.submit("a", release.wait)
+    await asyncio.sleep(0)
+    queue.submit("b", release.wait)
+    with pytest.raises(TaskQueueFullError):
+        queue.submit("c", release.wait)
+    release.set()
+    await queue.close()
+    with pytest.raises(RuntimeError):
+        queue.submit("d", release.wait)
+
+@pytest.mark.asyncio
+async def test_close_returns_jobs_that_never_started():
+    """Test jobs still queued after the drain timeout are reported"""
+    queue = TaskQueue(workers=1)
+    queue.submit("slow", lambda: asyncio.sleep(10))
+    queue.submit("never", lambda: asyncio.sleep(0))
+    await asyncio.sleep(0)
+    assert await queue.close(timeout=0.01) == ["never"]
+
+@pytest.mark.asyncio
+async def test_submitted_task_completes_in_background(manager):
+    """Test a queued run moves from queued to completed"""
+    agent_id = await manager.create_agent("echo", "echo", {"model_name": "gpt-4"})
+    run_id = await manager.submit_task(agent_id, {"input": "hi", "delay": 0.05})
+
+    run = await manager.get_run(run_id)
+    assert run["status"] in ("queued", "running")
+
+    run = await manager.wait_for_run(run_id, timeout=5)
+    assert run["status"] == "completed"
+    assert run["result"] == {"echo": "hi"}
+    assert run["agent_id"] == agent_id
+
+@pytest.mark.asyncio
+async def test_waiting_on_runs_leaves_no_waiters_behind(manager):
+    """Test lookups of finished runs, timeouts and shared waits all clean up"""
+    agent_id = await manager.create_agent("echo", "echo", {"model_name": "gpt-4"})
+    run_id = await manager.submit_task(agent_id, {"input": "hi", "delay": 0.05})
+
+    assert (await manager.wait_for_run(run_id, timeout=0))["status"] in ("queued", "running")
+    assert (await manager.wait_for_run(run_id, timeout=0.001))["status"] in ("queued", "running")
+    assert manager._run_waiters == {}
+
+    runs = await asyncio.gather(*(manager.wait_for_run(run_id, timeout=5) for _ in range(3)))
+    assert [run["status"] for run in runs] == ["completed"] * 3
+    await manager.wait_for_run(run_id, timeout=5)
+    assert manager._run_waiters == {}
+
+@pytest.mark.asyncio
+async def test_submitted_task_failure_is_recorded(manager):
+    """Test a failing background run ends up failed with the error"""
+    agent_id = await manager.create_agent("echo", "echo", {"model_name": "gpt-4"})
+    run_id = await manager.submit_task(agent_id, {"fail": True})
+
+    run = await manager.wait_for_run(run_id, timeout=5)
+    assert run["status"] == "failed"
+    assert run["result"] == "boom"
+
+@pytest.mark.asyncio
+async def test_submit_task_rejects_unknown_agent(manager):
+    """Test unknown agents fail before anything is queued"""
+    with pytest.raises(ValueError):
+        await manager.submit_task("missing", {})
+    with pytest.raises(ValueError):
+        await manager.get_run("missing")
+
+@pytest.mark.asyncio
+async def test_run_batch_reports_partial_failures(manager):
+    """Test each batch item reports its own outcome"""
+    agent_id = await manager.create_agent("echo", "echo", {"model_name": "gpt-4"})
+    results = await manager.run_batch([
+        (agent_id, {"input": "a"}),
+        (agent_id, {"fail": True}),
+        ("missing", {"input": "c"})
+    ])
+
+    assert [item["status"] for item in results] == ["completed", "failed", "failed"]
+    assert results[0]["result"] == {"echo": "a"}
+    assert results[1]["error"] == "boom"
+    assert results[2]["run_id"] is None
+    assert "not found" in results[2]["error"]
+
+    await manager.run_journal.flush()
+    runs, _ = await manager.list_runs(agent_id, fields="run_id,status")
+    assert sorted(run["status"] for run in runs) == ["completed", "failed"]
+
+@pytest.mark.asyncio
+async def test_run_batch_honours_concurrency(manager, mocker):
+    """Test no more than `concurrency` batch items execute at once"""
+    agent_id = await manager.create_agent("echo", "echo", {"model_name": "gpt-4"})
+    running = []
+    peak = []
+
+    async def execute_task(self, task):
+        running.append(1)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+        return {}
+
+    mocker.patch.object(EchoAgent, "execute_task", execute_task)
+    results = await manager.run_batch([(agent_id, {}) for _ in range(6)], concurrency=3)
+    assert all(item["status"] == "completed" for item in results)
+    assert max(peak) == 3
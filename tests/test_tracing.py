@@ -0,0 +1,63 @@
+import pytest
+import json
+from src.core.agent import Agent
+from src.core.agent_manager import AgentManager
+from src.core.tracing import SpanFileExporter, span
+from src.database.db_setup import Database
+from src.database.run_journal import RunJournal
+
+class TracedAgent(Agent):
+    AGENT_TYPE = "traced"
+
+    async def execute_task(self, task):
+        with span("llm_call", model="test-model"):
+            with span("llm_slot_wait"):
+                pass
+        return {"result": "done"}
+
+@pytest.mark.asyncio
+async def test_run_trace_waterfall(tmp_path):
+    """Test run_task records nested spans that the trace waterfall returns"""
+    db = Database(":memory:")
+    journal = RunJournal(db)
+    exporter = SpanFileExporter(tmp_path / "spans.jsonl")
+    manager = AgentManager(database=db, run_journal=journal, span_exporter=exporter)
+    manager.register_agent_class(TracedAgent)
+    agent_id = await manager.create_agent("traced", "traced", {})
+
+    await manager.run_task(agent_id, {"task": "one"})
+    run_id = (await manager.list_runs(agent_id, fields="run_id"))[0][0]["run_id"]
+
+    # Served from the journal before the flush, and from run_spans after it
+    for _ in range(2):
+        trace = await manager.get_run_trace(run_id)
+        assert [(s["name"], s["depth"]) for s in trace["spans"]] == [
+            ("get_agent", 0), ("select_agent", 1), ("row_to_agent", 1),
+            ("record_start", 0), ("execute_task", 0), ("llm_call", 1),
+            ("llm_slot_wait", 2), ("record_finish", 0)
+        ]
+        assert trace["spans"][5]["attributes"] == {"model": "test-model"}
+        assert trace["duration_ms"] >= max(s["duration_ms"] for s in trace["spans"])
+        await journal.flush()
+
+    lines = [json.loads(line) for line in (tmp_path / "spans.jsonl").read_text().splitlines()]
+    assert len(lines) == 8
+    assert lines[0]["traceId"] == run_id.replace("-", "")
+    assert lines[6]["parentSpanId"] == lines[5]["spanId"]
+    await journal.close()
+
+@pytest.mark.asyncio
+async def test_tracing_disabled_and_unknown_agent():
+    """Test nothing is recorded with tracing off or when the run never starts"""
+    db = Database(":memory:")
+    manager = AgentManager(database=db, tracing=False)
+    manager.register_agent_class(TracedAgent)
+    agent_id = await manager.create_agent("traced", "traced", {})
+    await manager.run_task(agent_id, {"task": "one"})
+
+    manager.tracing = True
+    with pytest.raises(ValueError):
+        await manager.run_task("missing", {"task": "one"})
+
+    with db.get_conn() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM run_spans").fetchone()[0] == 0